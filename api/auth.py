@@ -0,0 +1,222 @@
+"""Local verification of Supabase access tokens.
+
+``TokenVerifier`` checks a token's signature and claims in process instead of
+asking the auth server on every request:
+
+* HS256 tokens (Supabase's shared JWT secret, ``SUPABASE_JWT_SECRET``) are
+  verified with ``hmac``.
+* RS256/ES256 tokens are verified against the project's JWKS
+  (``<SUPABASE_URL>/auth/v1/.well-known/jwks.json``) when PyJWT is installed;
+  the signing keys are fetched once and cached by PyJWT's key client.
+* Anything else falls back to the ``remote`` callable (``supabase.auth.get_user``).
+
+Verified principals are cached by token hash for ``AUTH_CACHE_TTL`` seconds,
+never past the token's expiry. A revoked session therefore stays usable for
+at most the TTL on other instances; ``revoke`` (called on logout) verifies
+the token, drops it here immediately and refuses it until it expires. Revoked
+tokens are kept in a bounded LRU cache (``AUTH_REVOKED_SIZE``), so under heavy
+churn the oldest revocations fall back to the other instances' behaviour.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from dataclasses import dataclass, field
+
+from cache import LRUCache
+
+try:
+    import jwt
+    JWT_AVAILABLE = True
+except ImportError:
+    JWT_AVAILABLE = False
+
+AUTH_CACHE_TTL = float(os.environ.get('AUTH_CACHE_TTL', 60))
+
+AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', 4096))
+
+AUTH_REVOKED_SIZE = int(os.environ.get('AUTH_REVOKED_SIZE', 4096))
+
+JWT_AUDIENCE = os.environ.get('SUPABASE_JWT_AUDIENCE', 'authenticated')
+
+# Seconds of clock skew tolerated on exp/nbf
+JWT_LEEWAY = 30
+
+ASYMMETRIC_ALGORITHMS = ('RS256', 'ES256')
+
+
+class AuthError(Exception):
+    """Raised when a token is malformed, badly signed, expired or revoked."""
+
+
+@dataclass
+class AuthUser:
+    id: str
+    email: str = None
+    role: str = None
+    app_metadata: dict = field(default_factory=dict)
+    user_metadata: dict = field(default_factory=dict)
+
+
+@dataclass
+class Principal:
+    """A verified caller; ``principal.user.id`` matches Supabase's UserResponse."""
+
+    user: AuthUser
+    claims: dict
+    expires_at: float = None
+    source: str = 'local'
+
+    @classmethod
+    def from_claims(cls, claims):
+        user = AuthUser(
+            id=claims['sub'],
+            email=claims.get('email'),
+            role=claims.get('role'),
+            app_metadata=claims.get('app_metadata') or {},
+            user_metadata=claims.get('user_metadata') or {},
+        )
+        return cls(user=user, claims=claims, expires_at=claims.get('exp'))
+
+    @classmethod
+    def from_user_response(cls, response, claims=None):
+        user = response.user
+        return cls(
+            user=AuthUser(
+                id=user.id,
+                email=getattr(user, 'email', None),
+                role=getattr(user, 'role', None),
+                app_metadata=getattr(user, 'app_metadata', None) or {},
+                user_metadata=getattr(user, 'user_metadata', None) or {},
+            ),
+            claims=claims or {},
+            expires_at=(claims or {}).get('exp'),
+            source='remote',
+        )
+
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+def token_hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def split_token(token):
+    """``(header, claims, signing_input, signature)`` of a compact JWT, unverified."""
+    try:
+        header_segment, claims_segment, signature_segment = token.split('.')
+        header = json.loads(_b64decode(header_segment))
+        claims = json.loads(_b64decode(claims_segment))
+        signature = _b64decode(signature_segment)
+    except (ValueError, TypeError):
+        raise AuthError('Malformed token')
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise AuthError('Malformed token')
+    return header, claims, f'{header_segment}.{claims_segment}'.encode(), signature
+
+
+def check_claims(claims, audience=None, now=None):
+    now = time.time() if now is None else now
+    if not claims.get('sub'):
+        raise AuthError('Token has no subject')
+    exp = claims.get('exp')
+    if not isinstance(exp, (int, float)) or exp + JWT_LEEWAY < now:
+        raise AuthError('Token expired')
+    nbf = claims.get('nbf')
+    if isinstance(nbf, (int, float)) and nbf - JWT_LEEWAY > now:
+        raise AuthError('Token not yet valid')
+    if audience:
+        token_audience = claims.get('aud')
+        audiences = token_audience if isinstance(token_audience, list) else [token_audience]
+        if audience not in audiences:
+            raise AuthError('Token audience mismatch')
+
+
+class TokenVerifier:
+    """Verify bearer tokens locally and cache the resulting principals."""
+
+    def __init__(self, jwt_secret=None, jwks_url=None, remote=None, ttl=None, maxsize=None, audience=JWT_AUDIENCE):
+        self.jwt_secret = jwt_secret.encode() if jwt_secret else None
+        self.remote = remote
+        self.audience = audience
+        self.ttl = AUTH_CACHE_TTL if ttl is None else ttl
+        self.cache = LRUCache(maxsize=maxsize or AUTH_CACHE_SIZE, ttl=self.ttl)
+        self.jwks_client = jwt.PyJWKClient(jwks_url, cache_keys=True) if jwks_url and JWT_AVAILABLE else None
+        # Each entry expires with its token
+        self.revoked = LRUCache(maxsize=AUTH_REVOKED_SIZE)
+
+    def _verify_hs256(self, signing_input, signature):
+        expected = hmac.new(self.jwt_secret, signing_input, hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, signature):
+            raise AuthError('Invalid token signature')
+
+    def _verify_jwks(self, token, algorithm):
+        try:
+            signing_key = self.jwks_client.get_signing_key_from_jwt(token)
+            # Claims are checked by check_claims, the same way for every path
+            jwt.decode(token, signing_key.key, algorithms=[algorithm], options={'verify_exp': False, 'verify_aud': False})
+        except jwt.PyJWTError as e:
+            raise AuthError(f'Invalid token: {e}')
+
+    def _verify(self, token):
+        header, claims, signing_input, signature = split_token(token)
+        algorithm = header.get('alg')
+        if algorithm == 'HS256' and self.jwt_secret:
+            self._verify_hs256(signing_input, signature)
+        elif algorithm in ASYMMETRIC_ALGORITHMS and self.jwks_client:
+            self._verify_jwks(token, algorithm)
+        elif self.remote:
+            check_claims(claims)
+            try:
+                return Principal.from_user_response(self.remote(token), claims)
+            except Exception:
+                raise AuthError('Invalid token')
+        else:
+            raise AuthError(f'No key available to verify {algorithm} tokens')
+        check_claims(claims, self.audience)
+        return Principal.from_claims(claims)
+
+    def verify(self, token):
+        """The ``Principal`` for ``token``; raises ``AuthError`` if it isn't valid."""
+        key = token_hash(token)
+        if self.is_revoked(key):
+            raise AuthError('Token revoked')
+        principal = self.cache.get(key)
+        if principal is not None:
+            if principal.expires_at is None or principal.expires_at + JWT_LEEWAY >= time.time():
+                return principal
+            self.cache.pop(key)
+
+        principal = self._verify(token)
+        ttl = self.ttl
+        if principal.expires_at is not None:
+            ttl = min(ttl, principal.expires_at + JWT_LEEWAY - time.time())
+        if ttl > 0:
+            self.cache.set(key, principal, ttl=ttl)
+        return principal
+
+    def is_revoked(self, key):
+        return self.revoked.get(key) is not None
+
+    def revoke(self, token):
+        """Purge ``token`` from the cache and refuse it until it expires.
+
+        Only a valid token can be revoked, so callers can't fill the revoked
+        set with made-up ones; raises ``AuthError`` otherwise.
+        """
+        principal = self.verify(token)
+        key = token_hash(token)
+        self.cache.pop(key)
+        ttl = self.ttl
+        if principal.expires_at is not None:
+            ttl = principal.expires_at + JWT_LEEWAY - time.time()
+        if ttl > 0:
+            self.revoked.set(key, True, ttl=ttl)
+        return principal
+
+    def stats(self):
+        return {**self.cache.stats(), 'revoked': len(self.revoked), 'jwks': self.jwks_client is not None, 'local_secret': self.jwt_secret is not None}
@@ -0,0 +1,204 @@
+"""Row validation and chunked multi-row writes for bulk imports.
+
+The ``*_row`` builders turn a request payload into the row that gets inserted
+and raise ``RowError`` for anything that would be rejected. The single-row
+create routes and the bulk endpoints share them. The single-row routes pass
+``strict=False``, which keeps their original leniency: share adjustments may
+be zero or negative and the email is not checked.
+"""
+import math
+import os
+from datetime import date, datetime
+
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', 500))
+
+MAX_BULK_ROWS = int(os.environ.get('MAX_BULK_ROWS', 10000))
+
+
+class RowError(ValueError):
+    """Raised when a row fails validation."""
+
+
+def _required(data, fields):
+    for field in fields:
+        if field not in data or data[field] is None or data[field] == '':
+            raise RowError(f'{field} is required')
+
+
+def _number(data, field, minimum=0, allow_equal=True):
+    value = data[field]
+    if isinstance(value, bool):
+        raise RowError(f'{field} must be a number')
+    if isinstance(value, str):
+        try:
+            value = float(value.replace(',', '').strip())
+        except ValueError:
+            raise RowError(f'{field} must be a number')
+    if not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise RowError(f'{field} must be a number')
+    if minimum is not None and (value < minimum or (value == minimum and not allow_equal)):
+        raise RowError(f'{field} must be {"at least" if allow_equal else "greater than"} {minimum}')
+    if isinstance(value, float) and value.is_integer() and field == 'shares':
+        value = int(value)
+    return value
+
+
+def _iso_date(data, field):
+    value = data[field]
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    try:
+        return date.fromisoformat(str(value)[:10]).isoformat()
+    except ValueError:
+        raise RowError(f'{field} must be an ISO date (YYYY-MM-DD)')
+
+
+def shareholder_row(data, strict=True):
+    """The ``shareholders`` row for a create payload."""
+    if not isinstance(data, dict):
+        raise RowError('Row must be an object')
+    _required(data, ['company_id', 'name', 'email'])
+    if strict and '@' not in str(data['email']):
+        raise RowError('email is invalid')
+    return {
+        'company_id': data['company_id'],
+        'name': data['name'],
+        'email': data['email'],
+        'type': data.get('type'),
+        'created_at': datetime.now().isoformat()
+    }
+
+
+def issuance_row(data, strict=True):
+    """The ``share_issuances`` row for a create payload."""
+    if not isinstance(data, dict):
+        raise RowError('Row must be an object')
+    _required(data, ['company_id', 'shares', 'price_per_share', 'issue_date'])
+    return {
+        'company_id': data['company_id'],
+        'shareholder_id': data.get('shareholder_id'),
+        'share_class_id': data.get('share_class_id'),
+        'shares': _number(data, 'shares', minimum=0 if strict else None, allow_equal=False),
+        'price_per_share': _number(data, 'price_per_share'),
+        'issue_date': _iso_date(data, 'issue_date'),
+        'round': data.get('round'),
+        'round_description': data.get('round_description'),
+        'payment_status': data.get('payment_status'),
+        'created_at': datetime.now().isoformat()
+    }
+
+
+def parse_bulk_payload(payload):
+    """Split a bulk request into its rows, applying a top-level ``company_id``.
+
+    Accepts either a list of rows or ``{"company_id": ..., "rows": [...]}``.
+    """
+    if isinstance(payload, list):
+        rows, company_id = payload, None
+    elif isinstance(payload, dict):
+        rows, company_id = payload.get('rows'), payload.get('company_id')
+    else:
+        raise RowError('Expected a list of rows or an object with rows')
+    if not isinstance(rows, list) or not rows:
+        raise RowError('rows must be a non-empty list')
+    if len(rows) > MAX_BULK_ROWS:
+        raise RowError(f'At most {MAX_BULK_ROWS} rows can be imported per request')
+    if company_id:
+        rows = [{'company_id': company_id, **row} if isinstance(row, dict) else row for row in rows]
+    return rows
+
+
+def parse_id_list(payload):
+    """The IDs of a bulk delete, ``{"ids": [...]}`` or a bare list, de-duplicated."""
+    ids = payload.get('ids') if isinstance(payload, dict) else payload
+    if not isinstance(ids, list) or not ids:
+        raise RowError('ids must be a non-empty list')
+    if len(ids) > MAX_BULK_ROWS:
+        raise RowError(f'At most {MAX_BULK_ROWS} IDs can be deleted per request')
+    if not all(isinstance(row_id, str) and row_id for row_id in ids):
+        raise RowError('ids must be non-empty strings')
+    return list(dict.fromkeys(ids))
+
+
+def validate_rows(rows, build_row):
+    """Validate every row before anything is written.
+
+    Returns ``(valid, results)``: the built rows paired with their position in
+    the batch, and a results list with an ``invalid`` entry per rejected row.
+    """
+    valid = []
+    results = [None] * len(rows)
+    for index, data in enumerate(rows):
+        try:
+            valid.append((index, build_row(data)))
+        except RowError as e:
+            results[index] = {'index': index, 'status': 'invalid', 'error': str(e)}
+    return valid, results
+
+
+def check_issuance_references(db, indexed_rows, results):
+    """Reject issuances whose shareholder or share class belongs to another company.
+
+    Looks up every referenced company's IDs in two queries rather than one per
+    row. Returns the rows that passed.
+    """
+    company_ids = sorted({row['company_id'] for _, row in indexed_rows})
+    if not company_ids:
+        return indexed_rows
+    shareholders = {
+        (row['company_id'], row['id'])
+        for row in db.select('shareholders', 'id, company_id', filters={'company_id': company_ids}).data
+    }
+    share_classes = {
+        (row['company_id'], row['id'])
+        for row in db.select('share_classes', 'id, company_id', filters={'company_id': company_ids}).data
+    }
+    passed = []
+    for index, row in indexed_rows:
+        if row['shareholder_id'] and (row['company_id'], row['shareholder_id']) not in shareholders:
+            results[index] = {'index': index, 'status': 'invalid', 'error': 'shareholder_id not found for this company'}
+        elif row['share_class_id'] and (row['company_id'], row['share_class_id']) not in share_classes:
+            results[index] = {'index': index, 'status': 'invalid', 'error': 'share_class_id not found for this company'}
+        else:
+            passed.append((index, row))
+    return passed
+
+
+def insert_in_chunks(db, table, indexed_rows, results, chunk_size=None):
+    """Insert ``(index, row)`` pairs in multi-row writes, filling in ``results``.
+
+    When a chunk is rejected its rows are retried one at a time so a single
+    bad row only fails itself.
+    """
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    for start in range(0, len(indexed_rows), chunk_size):
+        chunk = indexed_rows[start:start + chunk_size]
+        try:
+            inserted = db.insert(table, [row for _, row in chunk]).data
+        except Exception:
+            for index, row in chunk:
+                try:
+                    created = db.insert(table, row).data
+                    results[index] = {'index': index, 'status': 'created', 'id': created[0].get('id') if created else None}
+                except Exception as e:
+                    results[index] = {'index': index, 'status': 'failed', 'error': str(e)}
+            continue
+        inserted = inserted or []
+        if len(inserted) != len(chunk):
+            # The write went through but the returned rows can't be matched to the chunk
+            for index, _ in chunk:
+                results[index] = {'index': index, 'status': 'created', 'id': None}
+            continue
+        for (index, _), created in zip(chunk, inserted):
+            results[index] = {'index': index, 'status': 'created', 'id': created.get('id')}
+    return results
+
+
+def summarize(results):
+    """Counts per status; rows that never got a result are reported as failed."""
+    counts = {'created': 0, 'invalid': 0, 'failed': 0}
+    for index, result in enumerate(results):
+        if result is None:
+            result = results[index] = {'index': index, 'status': 'failed', 'error': 'Row was not processed'}
+        counts[result['status']] += 1
+    return {**counts, 'results': results}
@@ -0,0 +1,89 @@
+"""Everything a company's pages need, in one response.
+
+``GET /api/companies/<id>/bundle`` replaces the three separate reads the app
+used to make (shareholders, share classes, issuances) and the totals it then
+recomputed in the browser. The three tables are read concurrently and the
+cap-table summary is aggregated here, once per data version.
+
+The bundle is compact: issuances are returned as stored, without the
+shareholder and class names the client can look up from the other two lists,
+and the summary carries per-holder totals rather than a second copy of the
+issuance rows.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from cap_table import build_cap_table
+from repository import iter_keyset
+
+BUNDLE_PAGE_SIZE = int(os.environ.get('BUNDLE_PAGE_SIZE', 1000))
+
+# Stable row order, so an unchanged company always serializes to the same bytes
+BUNDLE_ORDER = [('created_at', False), ('id', False)]
+
+BUNDLE_TABLES = ('shareholders', 'share_classes', 'share_issuances')
+
+
+def _read_table(db, table, company_id, page_size):
+    return list(iter_keyset(db, table, filters={'company_id': company_id}, page_size=page_size, order=BUNDLE_ORDER))
+
+
+def load_company_data(db, company_id, page_size=None):
+    """``(company, {table: rows})`` for ``BUNDLE_TABLES``, read concurrently.
+
+    ``company`` is None when the company doesn't exist.
+    """
+    page_size = page_size or BUNDLE_PAGE_SIZE
+    with ThreadPoolExecutor(max_workers=len(BUNDLE_TABLES) + 1) as pool:
+        company = pool.submit(db.get, 'companies', company_id)
+        tables = {table: pool.submit(_read_table, db, table, company_id, page_size) for table in BUNDLE_TABLES}
+        return company.result(), {table: future.result() for table, future in tables.items()}
+
+
+def summarize(company_id, shareholders, share_classes, issuances):
+    """Cap-table totals, per share class and per holder, without the rows."""
+    cap_table = build_cap_table(company_id, issuances, share_classes, keep_issuances=False)
+    return cap_table_summary(cap_table, len(shareholders), len(issuances))
+
+
+def cap_table_summary(cap_table, shareholder_count, issuance_count):
+    """The summary fields of a cap table built without issuance rows."""
+    holdings = {
+        shareholder_id: {
+            'total_shares': entry['total_shares'],
+            'outstanding_shares': entry['outstanding_shares'],
+            'invested': entry['invested'],
+            'value': entry['value'],
+            'ownership_percentage': entry['ownership_percentage'],
+            'fully_diluted_percentage': entry['fully_diluted_percentage'],
+        }
+        for shareholder_id, entry in cap_table['shareholders'].items()
+    }
+    return {
+        'shareholder_count': shareholder_count,
+        'issuance_count': issuance_count,
+        'total_shares': cap_table['total_shares'],
+        'outstanding_shares': cap_table['outstanding_shares'],
+        'total_invested': cap_table['total_invested'],
+        'price_per_share': cap_table['price_per_share'],
+        'valuation': cap_table['valuation'],
+        'by_share_class': cap_table['by_share_class'],
+        'holdings': holdings,
+    }
+
+
+def build_bundle(db, company_id, page_size=None):
+    """The bundle dict for ``company_id``, or None when the company doesn't exist."""
+    company, tables = load_company_data(db, company_id, page_size)
+    if company is None:
+        return None
+    shareholders = tables['shareholders']
+    share_classes = tables['share_classes']
+    issuances = tables['share_issuances']
+    return {
+        'company': company,
+        'shareholders': shareholders,
+        'share_classes': share_classes,
+        'issuances': issuances,
+        'summary': summarize(company_id, shareholders, share_classes, issuances),
+    }
@@ -0,0 +1,136 @@
+"""In-process caches for computed API responses.
+
+These live for the lifetime of a (warm) function instance. Writes made through
+another instance can't invalidate them, so entries also carry an optional TTL
+that bounds how stale a cached value can get.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with optional per-entry expiry."""
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._entries.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._entries.pop(key, _MISSING)
+            if item is _MISSING:
+                return default
+            self.invalidations += 1
+            return item[0]
+
+    def discard_where(self, predicate):
+        """Remove every entry whose key matches ``predicate``."""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+class CompanyVersions:
+    """Per-company data version counters, bumped on every write."""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, company_id):
+        return self._versions.get(company_id, 0)
+
+    def bump(self, company_id):
+        with self._lock:
+            version = self._versions.get(company_id, 0) + 1
+            self._versions[company_id] = version
+            return version
+
+
+class CompanyCache(LRUCache):
+    """LRU cache of per-company results keyed by ``(company_id, version, variant)``.
+
+    Bumping a company's version makes every cached entry for it unreachable;
+    ``invalidate`` also drops those entries so they don't wait for eviction.
+    Several caches can share one ``CompanyVersions``, so a single bump covers
+    all of them.
+    """
+
+    def __init__(self, versions, maxsize=256, ttl=None):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.versions = versions
+
+    def key(self, company_id, variant=None):
+        return (company_id, self.versions.get(company_id), variant)
+
+    def discard_company(self, company_id):
+        return self.discard_where(lambda key: key[0] == company_id)
+
+    def invalidate(self, company_id):
+        self.versions.bump(company_id)
+        return self.discard_company(company_id)
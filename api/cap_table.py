@@ -0,0 +1,255 @@
+"""Cap-table aggregation engine.
+
+Aggregates a company's share issuances by shareholder and by share class in a
+single pass over the rows and computes ownership percentages once, after the
+totals are known.
+
+Percentages are reported on two bases:
+
+* ``fully_diluted_percentage`` (also ``percentage``): share of every issued
+  share, including options, warrants and convertibles.
+* ``ownership_percentage``: share of outstanding shares, i.e. excluding the
+  dilutive classes above.
+"""
+import os
+import re
+
+UNASSIGNED_CLASS = 'unassigned'
+
+# Holder of shares issued without a shareholder, where they need a key of their own
+UNASSIGNED_HOLDER = 'unassigned'
+
+# Only consulted for share classes without an explicit ``is_dilutive`` flag
+DILUTIVE_CLASS_KEYWORDS = ('option', 'warrant', 'convertible', 'safe')
+_DILUTIVE_NAME = re.compile(r'\b(?:' + '|'.join(DILUTIVE_CLASS_KEYWORDS) + r')s?\b')
+
+# Set to false to count every class without ``is_dilutive`` as outstanding
+DILUTIVE_NAME_MATCH = os.environ.get('DILUTIVE_NAME_MATCH', 'true').lower() in ('1', 'true', 'yes', 'on')
+
+def is_dilutive_class(share_class, match_names=None):
+    """Whether a share class only counts on a fully diluted basis.
+
+    The class's ``is_dilutive`` column decides. Classes without one fall back
+    to a whole-word match of their name against ``DILUTIVE_CLASS_KEYWORDS``
+    ("Employee Options" but not "Safeguard Ordinary"), unless ``match_names``
+    (default ``DILUTIVE_NAME_MATCH``) is off.
+    """
+    if share_class.get('is_dilutive') is not None:
+        return bool(share_class['is_dilutive'])
+    if not (DILUTIVE_NAME_MATCH if match_names is None else match_names):
+        return False
+    return _DILUTIVE_NAME.search((share_class.get('name') or '').lower()) is not None
+
+
+class CapTableBuilder:
+    """Incrementally aggregate issuances into a cap table.
+
+    Rows can be fed one at a time with ``add`` (e.g. while paging through
+    ``share_issuances``) or all at once with ``add_many``; ``build`` produces
+    the response dict.
+
+    In compact mode each shareholder lists the IDs of its issuances instead of
+    embedding a second copy of every issuance row. With ``keep_issuances``
+    off, neither the top-level rows nor the per-shareholder lists are kept,
+    so memory grows with the number of shareholders only.
+    """
+
+    def __init__(self, company_id, share_classes=None, shareholders=None, compact=False, keep_issuances=True, price=None, match_names=None):
+        self.company_id = company_id
+        self.share_classes = list(share_classes or [])
+        self.shareholder_lookup = shareholders or {}
+        self.compact = compact
+        self.keep_issuances = keep_issuances
+        self.price = price
+        self.dilutive_class_ids = {sc.get('id') for sc in self.share_classes if is_dilutive_class(sc, match_names)}
+        self.total_shares = 0
+        self.outstanding_shares = 0
+        self.total_invested = 0
+        self.latest_date = None
+        self.latest_price = None
+        self.issuances = []
+        self.shareholders = {}
+        self.class_totals = {}
+
+    def _new_entry(self, shareholder_id, details):
+        details = details or self.shareholder_lookup.get(shareholder_id) or {}
+        entry = {
+            'name': details.get('name'),
+            'email': details.get('email'),
+            'total_shares': 0,
+            'outstanding_shares': 0,
+            'percentage': 0,
+            'ownership_percentage': 0,
+            'fully_diluted_percentage': 0,
+            'invested': 0,
+            'value': None,
+        }
+        if self.keep_issuances:
+            entry['issuance_ids' if self.compact else 'issuances'] = []
+        self.shareholders[shareholder_id] = entry
+        return entry
+
+    def add(self, issuance):
+        shares = issuance.get('shares') or 0
+        price = issuance.get('price_per_share')
+        invested = shares * (price or 0)
+        class_id = issuance.get('share_class_id') or UNASSIGNED_CLASS
+        outstanding = 0 if class_id in self.dilutive_class_ids else shares
+
+        self.total_shares += shares
+        self.outstanding_shares += outstanding
+        self.total_invested += invested
+        if self.keep_issuances:
+            self.issuances.append(issuance)
+
+        issue_date = issuance.get('issue_date')
+        if issue_date is not None and price is not None and (self.latest_date is None or issue_date >= self.latest_date):
+            self.latest_date = issue_date
+            self.latest_price = price
+
+        class_totals = self.class_totals.get(class_id)
+        if class_totals is None:
+            class_totals = self.class_totals[class_id] = [0, 0]
+        class_totals[0] += shares
+        class_totals[1] += invested
+
+        shareholder_id = issuance.get('shareholder_id')
+        if not shareholder_id:
+            return
+
+        entry = self.shareholders.get(shareholder_id)
+        if entry is None:
+            entry = self._new_entry(shareholder_id, issuance.get('shareholders'))
+
+        entry['total_shares'] += shares
+        entry['outstanding_shares'] += outstanding
+        entry['invested'] += invested
+        if self.keep_issuances:
+            if self.compact:
+                entry['issuance_ids'].append(issuance.get('id'))
+            else:
+                entry['issuances'].append(issuance)
+
+    def add_many(self, issuances):
+        """``add`` every row, with the per-row work kept in local variables.
+
+        Running totals per shareholder live in ``[entry, shares, outstanding,
+        invested, rows]`` lists during the loop and are written back to the
+        entries once at the end, instead of a handful of dict updates per row.
+        """
+        dilutive = self.dilutive_class_ids
+        class_totals = self.class_totals
+        keep = self.keep_issuances
+        compact = self.compact
+        list_key = 'issuance_ids' if compact else 'issuances'
+        unassigned = UNASSIGNED_CLASS
+        holders = {}
+        total_shares = outstanding_shares = total_invested = 0
+        latest_date = self.latest_date
+        latest_price = self.latest_price
+        if keep and not isinstance(issuances, list):
+            issuances = list(issuances)
+
+        for issuance in issuances:
+            get = issuance.get
+            shares = get('shares') or 0
+            price = get('price_per_share')
+            invested = shares * (price or 0)
+            class_id = get('share_class_id') or unassigned
+            outstanding = 0 if class_id in dilutive else shares
+
+            total_shares += shares
+            outstanding_shares += outstanding
+            total_invested += invested
+
+            if price is not None:
+                issue_date = get('issue_date')
+                if issue_date is not None and (latest_date is None or issue_date >= latest_date):
+                    latest_date = issue_date
+                    latest_price = price
+
+            totals = class_totals.get(class_id)
+            if totals is None:
+                class_totals[class_id] = [shares, invested]
+            else:
+                totals[0] += shares
+                totals[1] += invested
+
+            shareholder_id = get('shareholder_id')
+            if not shareholder_id:
+                continue
+
+            holder = holders.get(shareholder_id)
+            if holder is None:
+                entry = self.shareholders.get(shareholder_id) or self._new_entry(shareholder_id, get('shareholders'))
+                holder = holders[shareholder_id] = [entry, 0, 0, 0, entry[list_key].append if keep else None]
+            holder[1] += shares
+            holder[2] += outstanding
+            holder[3] += invested
+            if keep:
+                holder[4](get('id') if compact else issuance)
+
+        for entry, shares, outstanding, invested, _ in holders.values():
+            entry['total_shares'] += shares
+            entry['outstanding_shares'] += outstanding
+            entry['invested'] += invested
+        self.total_shares += total_shares
+        self.outstanding_shares += outstanding_shares
+        self.total_invested += total_invested
+        self.latest_date = latest_date
+        self.latest_price = latest_price
+        if keep:
+            self.issuances.extend(issuances)
+        return self
+
+    def build(self, backend='python'):
+        price = self.price if self.price is not None else self.latest_price
+        fd_scale = 100 / self.total_shares if self.total_shares > 0 else 0
+        basic_scale = 100 / self.outstanding_shares if self.outstanding_shares > 0 else 0
+
+        for entry in self.shareholders.values():
+            entry['percentage'] = entry['fully_diluted_percentage'] = entry['total_shares'] * fd_scale
+            entry['ownership_percentage'] = entry['outstanding_shares'] * basic_scale
+            entry['value'] = entry['total_shares'] * price if price is not None else None
+
+        class_names = {sc.get('id'): sc.get('name') for sc in self.share_classes}
+        by_share_class = {
+            class_id: {
+                'name': class_names.get(class_id),
+                'dilutive': class_id in self.dilutive_class_ids,
+                'total_shares': class_shares,
+                'percentage': class_shares * fd_scale,
+                'invested': class_invested,
+            }
+            for class_id, (class_shares, class_invested) in self.class_totals.items()
+        }
+
+        cap_table = {
+            'company_id': self.company_id,
+            'total_shares': self.total_shares,
+            'fully_diluted_shares': self.total_shares,
+            'outstanding_shares': self.outstanding_shares,
+            'total_invested': self.total_invested,
+            'price_per_share': price,
+            'valuation': self.total_shares * price if price is not None else None,
+            'share_classes': self.share_classes,
+            'shareholders': self.shareholders,
+            'by_share_class': by_share_class,
+            'backend': backend,
+        }
+        if self.keep_issuances:
+            cap_table['issuances'] = self.issuances
+        return cap_table
+
+
+def build_cap_table(company_id, issuances, share_classes=None, shareholders=None, compact=False, price=None, keep_issuances=True, match_names=None):
+    """Aggregate ``issuances`` into a cap table.
+
+    ``shareholders`` is an optional ``{id: row}`` lookup used for names and
+    emails when the issuance rows don't embed a ``shareholders`` join.
+    ``price`` values holdings at a given price per share; by default the
+    price of the latest issuance is used. With ``keep_issuances`` off only
+    the totals are returned.
+    """
+    builder = CapTableBuilder(company_id, share_classes, shareholders, compact=compact, keep_issuances=keep_issuances, price=price, match_names=match_names)
+    return builder.add_many(issuances).build()
@@ -0,0 +1,203 @@
+"""Lazily built, memoized clients for the external services.
+
+The Supabase and Brevo SDKs take longer to import than the rest of an API
+function put together, and serverless hosts pay that on every cold start,
+including for requests such as ``/api/health`` that never touch either.
+Nothing here imports an SDK or builds a client until a request first needs
+it; the client is then kept for the life of the warm instance.
+
+Whether a client *can* be built (credentials set, package installed) is
+answered without importing anything, so routes can still report
+``Database connection not available`` up front.
+
+Clients share one HTTP tuning, so a warm instance reuses its TLS connections
+instead of handshaking per query:
+
+* ``HTTP_POOL_SIZE`` connections per client, kept alive for
+  ``HTTP_KEEPALIVE_SECONDS`` between requests;
+* ``HTTP_CONNECT_TIMEOUT_SECONDS`` / ``HTTP_TIMEOUT_SECONDS`` per request;
+* failed connects are retried by the transport, and ``with_retries`` retries
+  idempotent calls that hit a transient error (connection errors, 429, 5xx)
+  ``HTTP_RETRIES`` more times with jittered exponential backoff.
+"""
+import importlib.util
+import os
+import random
+import sys
+import threading
+import time
+import weakref
+
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 20))
+
+HTTP_KEEPALIVE_SECONDS = float(os.environ.get('HTTP_KEEPALIVE_SECONDS', 60))
+
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('HTTP_CONNECT_TIMEOUT_SECONDS', 5))
+
+HTTP_TIMEOUT_SECONDS = float(os.environ.get('HTTP_TIMEOUT_SECONDS', 20))
+
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 2))
+
+# First retry delay; doubles per attempt up to the cap
+HTTP_RETRY_BACKOFF_SECONDS = float(os.environ.get('HTTP_RETRY_BACKOFF_SECONDS', 0.25))
+HTTP_RETRY_BACKOFF_CAP_SECONDS = float(os.environ.get('HTTP_RETRY_BACKOFF_CAP_SECONDS', 4))
+
+# (connect, read) timeout for SDKs that take a tuple per request
+REQUEST_TIMEOUT = (HTTP_CONNECT_TIMEOUT_SECONDS, HTTP_TIMEOUT_SECONDS)
+
+_clients = {}
+_clients_lock = threading.Lock()
+_env_loaded = False
+
+# PostgREST clients already moved onto the tuned pool
+_pooled_postgrest = weakref.WeakSet()
+
+
+def load_env():
+    """Load ``.env`` for local runs; hosted deployments set the environment directly."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    if os.environ.get('VERCEL'):
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def package_available(name):
+    return importlib.util.find_spec(name) is not None
+
+
+def _status_code(exc):
+    status = getattr(exc, 'status', None)
+    if status is None:
+        # postgrest's APIError carries the HTTP status as its code for non-JSON error bodies
+        status = getattr(exc, 'code', None)
+    if isinstance(status, str) and status.isdigit():
+        status = int(status)
+    # Anything else numeric is a Postgres SQLSTATE, not an HTTP status
+    return status if isinstance(status, int) and 100 <= status <= 599 else None
+
+
+def is_transient(exc):
+    """Whether a failed call may succeed if simply tried again."""
+    status = _status_code(exc)
+    if status is not None:
+        return status == 429 or status >= 500
+    # Only check the HTTP libraries that are already loaded; importing them here would defeat lazy loading
+    httpx = sys.modules.get('httpx')
+    if httpx is not None and isinstance(exc, httpx.TransportError):
+        return True
+    urllib3 = sys.modules.get('urllib3')
+    return urllib3 is not None and isinstance(exc, urllib3.exceptions.HTTPError)
+
+
+def backoff_delay(attempts, base, cap):
+    """Delay before retry number ``attempts``: exponential from ``base``, capped, with jitter."""
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    # Up to 10% jitter so retries from one failed batch don't land together
+    return delay * (1 + random.random() * 0.1)
+
+
+def with_retries(call, retries=None, retryable=is_transient):
+    """``call()``, retried with backoff while it fails with a ``retryable`` error.
+
+    Only for idempotent calls: a timed-out write may have been applied.
+    """
+    retries = HTTP_RETRIES if retries is None else retries
+    attempt = 0
+    while True:
+        try:
+            return call()
+        except Exception as e:
+            attempt += 1
+            if attempt > retries or not retryable(e):
+                raise
+            time.sleep(backoff_delay(attempt, HTTP_RETRY_BACKOFF_SECONDS, HTTP_RETRY_BACKOFF_CAP_SECONDS))
+
+
+def _memoized(key, build):
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = build()
+    return client
+
+
+def supabase_configured(key_env='SUPABASE_ANON_KEY'):
+    """Whether ``supabase_client(key_env)`` can build a client."""
+    return bool(os.environ.get('SUPABASE_URL') and os.environ.get(key_env)) and package_available('supabase')
+
+
+def supabase_client(key_env='SUPABASE_ANON_KEY'):
+    """The shared Supabase client for the key in ``key_env``, or None if it isn't configured."""
+    if not supabase_configured(key_env):
+        return None
+
+    def build():
+        from supabase import create_client
+        return create_client(os.environ['SUPABASE_URL'], os.environ[key_env])
+
+    client = _memoized(('supabase', key_env), build)
+    # The SDK rebuilds its PostgREST client on auth events, so check on every use
+    _use_pooled_session(client.postgrest)
+    return client
+
+
+def _use_pooled_session(postgrest):
+    """Swap a PostgREST client's HTTP session for one on the tuned pool."""
+    if postgrest in _pooled_postgrest:
+        return
+    with _clients_lock:
+        if postgrest in _pooled_postgrest:
+            return
+        import httpx
+        from postgrest.utils import SyncClient
+
+        session = postgrest.session
+        transport = httpx.HTTPTransport(
+            # HTTP/2 needs the h2 package; without it httpx would refuse to build the transport
+            http2=package_available('h2'),
+            retries=HTTP_RETRIES,
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_SIZE,
+                max_keepalive_connections=HTTP_POOL_SIZE,
+                keepalive_expiry=HTTP_KEEPALIVE_SECONDS
+            )
+        )
+        postgrest.session = SyncClient(
+            base_url=session.base_url,
+            headers=session.headers,
+            timeout=httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS),
+            follow_redirects=True,
+            transport=transport
+        )
+        session.close()
+        _pooled_postgrest.add(postgrest)
+
+
+def brevo_configured():
+    return bool(os.environ.get('BREVO_API_KEY')) and package_available('sib_api_v3_sdk')
+
+
+def brevo_transactional_api(pool_size=None):
+    """The shared Brevo ``TransactionalEmailsApi``, or None if it isn't configured."""
+    if not brevo_configured():
+        return None
+
+    def build():
+        import sib_api_v3_sdk
+        configuration = sib_api_v3_sdk.Configuration()
+        configuration.api_key['api-key'] = os.environ['BREVO_API_KEY']
+        # urllib3 keeps these connections alive between sends
+        configuration.connection_pool_maxsize = pool_size or HTTP_POOL_SIZE
+        return sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
+
+    return _memoized(('brevo', pool_size), build)
@@ -0,0 +1,126 @@
+"""Negotiated gzip/brotli compression of API responses.
+
+The encoding is picked from the request's ``Accept-Encoding``: brotli when
+the client accepts it and the ``brotli`` package is installed, else gzip.
+Only text-like bodies (JSON, CSV, PDF) are compressed:
+
+* buffered bodies at least ``COMPRESS_MIN_BYTES`` long are compressed in one
+  go, and sent as is when compression doesn't make them smaller;
+* streamed bodies (exports, reports) have unknown length, so they are always
+  compressed, chunk by chunk as the route yields them, without buffering.
+
+A compressed response's ``ETag`` is made weak: the bytes differ per encoding,
+but the representation is the same, and ``If-None-Match`` compares weakly.
+"""
+import os
+import zlib
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+
+COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+
+# Brotli's higher qualities cost far more CPU than they save on JSON
+COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/csv', 'text/plain', 'text/html', 'application/pdf')
+
+
+class GzipCompressor:
+    def __init__(self, level=None):
+        # wbits 31 writes a gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(COMPRESS_GZIP_LEVEL if level is None else level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality=None):
+        self._compressor = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY if quality is None else quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def encodings():
+    return ('br', 'gzip') if BROTLI_AVAILABLE else ('gzip',)
+
+
+def new_compressor(encoding):
+    return BrotliCompressor() if encoding == 'br' else GzipCompressor()
+
+
+def negotiate(request):
+    """The best encoding the client accepts, or None."""
+    return request.accept_encodings.best_match(encodings())
+
+
+def compress_bytes(data, encoding):
+    compressor = new_compressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_stream(chunks, encoding):
+    """Compress an iterable of chunks lazily, yielding whatever is ready."""
+    compressor = new_compressor(encoding)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def compress_response(request, response, min_bytes=None):
+    """Compress ``response`` for ``request`` in place when worthwhile."""
+    min_bytes = COMPRESS_MIN_BYTES if min_bytes is None else min_bytes
+    if (
+        request.method == 'HEAD'
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    # Caches must keep a copy per encoding even when this one goes out uncompressed
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+        compressed = compress_bytes(data, encoding)
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+    return response
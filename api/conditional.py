@@ -0,0 +1,125 @@
+"""Conditional GETs for the API's read routes.
+
+Every successful, non-streamed ``GET`` response gets a strong ``ETag``
+computed from its body, and a request whose ``If-None-Match`` already names
+it is answered with ``304 Not Modified`` and no body. Routes that know their
+validator up front (e.g. the company bundle) set their own ``ETag``, which
+is kept.
+
+For company-scoped reads (a ``company_id`` in the URL or the query string)
+the ETag is also remembered under the company's data version. A repeated
+anonymous request with that ETag is then answered with 304 before the route
+runs, without reading or serializing anything; a write to the company bumps
+the version and retires the remembered ETag. Like the other per-company
+caches, entries expire after a TTL so writes made through another instance
+are picked up. Requests carrying credentials always run the route, so
+authentication is never skipped.
+
+``Cache-Control`` is chosen per response:
+
+* authenticated requests and admin, auth and profile routes are ``private``;
+* health checks are ``no-store``;
+* other reads may be served from the CDN for ``EDGE_CACHE_SECONDS`` (0, the
+  default, has every request revalidated), with
+  ``EDGE_STALE_WHILE_REVALIDATE`` seconds of background refresh on Vercel.
+"""
+import hashlib
+import os
+
+from cache import CompanyCache
+
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+ETAG_CACHE_SIZE = int(os.environ.get('ETAG_CACHE_SIZE', 2048))
+
+ETAG_CACHE_TTL = float(os.environ.get('ETAG_CACHE_TTL', 60))
+
+EDGE_CACHE_SECONDS = int(os.environ.get('EDGE_CACHE_SECONDS', 0))
+
+EDGE_STALE_WHILE_REVALIDATE = int(os.environ.get('EDGE_STALE_WHILE_REVALIDATE', 60))
+
+# Responses from these paths depend on who is asking
+PRIVATE_PREFIXES = ('/api/admin', '/api/auth', '/api/profile')
+
+NO_STORE_PATHS = ('/api/health',)
+
+
+def content_etag(body):
+    """A strong ETag for a serialized response body."""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def has_credentials(request):
+    return 'Authorization' in request.headers
+
+
+def request_company_id(request):
+    view_args = request.view_args or {}
+    return view_args.get('company_id') or request.args.get('company_id')
+
+
+def cache_control(request):
+    if request.path in NO_STORE_PATHS:
+        return 'no-store'
+    if has_credentials(request) or request.path.startswith(PRIVATE_PREFIXES):
+        return 'private, no-cache'
+    if EDGE_CACHE_SECONDS > 0:
+        return f'public, max-age=0, s-maxage={EDGE_CACHE_SECONDS}, stale-while-revalidate={EDGE_STALE_WHILE_REVALIDATE}'
+    return 'public, no-cache'
+
+
+class ConditionalResponses:
+    """``before``/``after`` request hooks adding ETags, 304s and Cache-Control."""
+
+    def __init__(self, versions, maxsize=None, ttl=None):
+        self.etags = CompanyCache(
+            versions,
+            maxsize=maxsize or ETAG_CACHE_SIZE,
+            ttl=ETAG_CACHE_TTL if ttl is None else ttl
+        )
+
+    def _key(self, request):
+        company_id = request_company_id(request)
+        if not company_id or has_credentials(request) or request.method not in CONDITIONAL_METHODS:
+            return None
+        return self.etags.key(company_id, (request.path, request.query_string))
+
+    def before(self, request, response_class):
+        """A 304 for a request whose remembered ETag the client already has, else None."""
+        # Keyed on the version before the route reads anything, so a concurrent write can't be remembered as current
+        key = self._key(request)
+        request.etag_key = key
+        if key is None or not request.if_none_match:
+            return None
+        etag = self.etags.get(key)
+        if etag is None or not request.if_none_match.contains_weak(etag):
+            return None
+        response = response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control(request)
+        return response
+
+    def after(self, request, response):
+        if request.method not in CONDITIONAL_METHODS or response.status_code != 200 or response.is_streamed:
+            return response
+        etag, _ = response.get_etag()
+        if etag is None:
+            etag = content_etag(response.get_data())
+            response.set_etag(etag)
+        if 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = cache_control(request)
+        response.vary.add('Authorization')
+
+        key = getattr(request, 'etag_key', None)
+        if key is not None:
+            self.etags.set(key, etag)
+        return response.make_conditional(request)
+
+    def discard_company(self, company_id):
+        return self.etags.discard_company(company_id)
+
+    def clear(self):
+        self.etags.clear()
+
+    def stats(self):
+        return self.etags.stats()
@@ -0,0 +1,94 @@
+"""Streaming CSV export of a company's shareholders and holdings.
+
+The export is a generator: the header goes out as soon as the share classes
+are known, ``share_issuances`` is paged through in keyset order and folded
+into the cap-table builder, and the CSV rows are then written out in small
+chunks. Memory grows with the number of shareholders, never with the number
+of issuances.
+"""
+import csv
+import io
+import os
+
+from cap_table import UNASSIGNED_CLASS, CapTableBuilder
+from repository import iter_keyset
+
+EXPORT_PAGE_SIZE = int(os.environ.get('EXPORT_PAGE_SIZE', 1000))
+
+# Rows written to the buffer before it is flushed to the client
+CHUNK_ROWS = 200
+
+# Spreadsheet apps evaluate cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def safe_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Chunks:
+    """A csv.writer target that hands back what was written since the last take."""
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def take(self):
+        text = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return text
+
+
+def iter_shareholder_csv(db, company_id, page_size=None):
+    """Yield the shareholder export for ``company_id`` as CSV text chunks."""
+    page_size = page_size or EXPORT_PAGE_SIZE
+    share_classes = db.select('share_classes', filters={'company_id': company_id}, order=[('priority', False)]).data
+    class_ids = [sc['id'] for sc in share_classes]
+
+    out = _Chunks()
+    out.writer.writerow(
+        ['Shareholder ID', 'Name', 'Email', 'Type']
+        + [f'Shares: {sc.get("name") or sc["id"]}' for sc in share_classes]
+        + ['Shares: Unassigned', 'Total Shares', 'Ownership %', 'Fully Diluted %', 'Invested']
+    )
+    yield out.take()
+
+    shareholders = {
+        row['id']: row
+        for row in iter_keyset(db, 'shareholders', 'id, name, email, type', {'company_id': company_id}, page_size)
+    }
+
+    builder = CapTableBuilder(company_id, share_classes, shareholders, keep_issuances=False)
+    holdings = {}
+    for issuance in iter_keyset(db, 'share_issuances', 'id, shareholder_id, share_class_id, shares, price_per_share, issue_date', {'company_id': company_id}, page_size):
+        builder.add(issuance)
+        shareholder_id = issuance.get('shareholder_id')
+        if shareholder_id:
+            key = (shareholder_id, issuance.get('share_class_id') or UNASSIGNED_CLASS)
+            holdings[key] = holdings.get(key, 0) + (issuance.get('shares') or 0)
+    cap_table = builder.build()
+
+    written = 0
+    # Shareholders with no issuances are listed too, after those with holdings
+    for shareholder_id in list(cap_table['shareholders']) + [sid for sid in shareholders if sid not in cap_table['shareholders']]:
+        details = shareholders.get(shareholder_id) or {}
+        entry = cap_table['shareholders'].get(shareholder_id) or {}
+        out.writer.writerow(
+            [shareholder_id, safe_cell(details.get('name', entry.get('name'))), safe_cell(details.get('email', entry.get('email'))), safe_cell(details.get('type'))]
+            + [holdings.get((shareholder_id, class_id), 0) for class_id in class_ids]
+            + [
+                holdings.get((shareholder_id, UNASSIGNED_CLASS), 0),
+                entry.get('total_shares', 0),
+                round(entry.get('ownership_percentage', 0), 4),
+                round(entry.get('fully_diluted_percentage', 0), 4),
+                round(entry.get('invested', 0), 2),
+            ]
+        )
+        written += 1
+        if written % CHUNK_ROWS == 0:
+            yield out.take()
+
+    yield out.take()
@@ -0,0 +1,192 @@
+"""Streaming CSV import of shareholders and share issuances.
+
+Rows are parsed one at a time from the upload stream, resolved against
+lookup indexes built once per company, validated with the bulk row builders
+and written in chunked multi-row inserts. Only the current batch, the
+indexes and a capped list of errors are held in memory, so memory use doesn't
+grow with file size.
+
+Shareholder files need ``name`` and ``email`` columns (``type`` optional).
+Issuance files identify the holder by ``shareholder_id``,
+``shareholder_email`` or ``shareholder_name`` and the class by
+``share_class_id`` or ``share_class_name``, plus the issuance columns
+accepted by ``POST /api/share-issuances``.
+"""
+import codecs
+import csv
+
+from bulk import BULK_CHUNK_SIZE, RowError, insert_in_chunks, issuance_row, shareholder_row
+
+IMPORT_KINDS = {
+    'shareholders': 'shareholders',
+    'share-issuances': 'share_issuances',
+}
+
+MAX_REPORTED_ERRORS = 100
+
+HEADER_ALIASES = {
+    'shareholder': 'shareholder_name',
+    'holder': 'shareholder_name',
+    'share_class': 'share_class_name',
+    'class': 'share_class_name',
+    'price': 'price_per_share',
+    'date': 'issue_date',
+    'shareholder_type': 'type',
+}
+
+
+def normalize_header(header):
+    key = (header or '').strip().lower().replace(' ', '_').replace('-', '_')
+    return HEADER_ALIASES.get(key, key)
+
+
+def decode_lines(stream, encoding='utf-8-sig'):
+    """Decode a binary stream line by line, without reading it all in."""
+    return codecs.iterdecode(stream, encoding)
+
+
+class CompanyIndex:
+    """In-memory lookups from names and emails to IDs for one company."""
+
+    def __init__(self, db, company_id):
+        self.shareholder_ids = set()
+        self.shareholders_by_email = {}
+        self.shareholders_by_name = {}
+        self.share_class_ids = set()
+        self.share_classes_by_name = {}
+
+        for row in db.select('shareholders', 'id, name, email', filters={'company_id': company_id}).data:
+            self.add_shareholder(row)
+        for row in db.select('share_classes', 'id, name', filters={'company_id': company_id}).data:
+            self.share_class_ids.add(row['id'])
+            if row.get('name'):
+                self.share_classes_by_name.setdefault(row['name'].strip().lower(), row['id'])
+
+    def add_shareholder(self, row):
+        if row.get('id'):
+            self.shareholder_ids.add(row['id'])
+        if row.get('email'):
+            self.shareholders_by_email.setdefault(row['email'].strip().lower(), row.get('id'))
+        if row.get('name'):
+            self.shareholders_by_name.setdefault(row['name'].strip().lower(), row.get('id'))
+
+    def resolve_shareholder(self, row):
+        shareholder_id = row.get('shareholder_id')
+        if shareholder_id:
+            if shareholder_id not in self.shareholder_ids:
+                raise RowError(f'Unknown shareholder_id {shareholder_id}')
+            return shareholder_id
+        email = row.get('shareholder_email') or row.get('email')
+        if email:
+            shareholder_id = self.shareholders_by_email.get(email.lower())
+            if shareholder_id is None:
+                raise RowError(f'No shareholder with email {email}')
+            return shareholder_id
+        name = row.get('shareholder_name')
+        if name:
+            shareholder_id = self.shareholders_by_name.get(name.lower())
+            if shareholder_id is None:
+                raise RowError(f'No shareholder named {name}')
+            return shareholder_id
+        return None
+
+    def resolve_share_class(self, row):
+        share_class_id = row.get('share_class_id')
+        if share_class_id:
+            if share_class_id not in self.share_class_ids:
+                raise RowError(f'Unknown share_class_id {share_class_id}')
+            return share_class_id
+        name = row.get('share_class_name')
+        if name:
+            share_class_id = self.share_classes_by_name.get(name.lower())
+            if share_class_id is None:
+                raise RowError(f'No share class named {name}')
+            return share_class_id
+        return None
+
+
+class CSVImporter:
+    """Import one CSV stream into ``shareholders`` or ``share_issuances``."""
+
+    def __init__(self, db, company_id, kind, batch_size=None):
+        if kind not in IMPORT_KINDS:
+            raise ValueError(f'Unknown import kind: {kind}')
+        self.db = db
+        self.company_id = company_id
+        self.kind = kind
+        self.table = IMPORT_KINDS[kind]
+        self.batch_size = batch_size or BULK_CHUNK_SIZE
+        self.index = CompanyIndex(db, company_id)
+        self.batch = []
+        self.pending_emails = set()
+        self.counts = {'rows': 0, 'created': 0, 'invalid': 0, 'failed': 0, 'skipped': 0}
+        self.errors = []
+
+    def _record_error(self, line, status, message):
+        self.counts[status] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'status': status, 'error': message})
+
+    def _build(self, row):
+        row['company_id'] = self.company_id
+        if self.kind == 'shareholders':
+            built = shareholder_row(row)
+            email = built['email'].strip().lower()
+            if email in self.index.shareholders_by_email or email in self.pending_emails:
+                return None
+            self.pending_emails.add(email)
+            return built
+        row['shareholder_id'] = self.index.resolve_shareholder(row)
+        row['share_class_id'] = self.index.resolve_share_class(row)
+        return issuance_row(row)
+
+    def _flush(self):
+        if not self.batch:
+            return
+        results = {}
+        insert_in_chunks(self.db, self.table, self.batch, results, chunk_size=self.batch_size)
+        for line, row in self.batch:
+            result = results[line]
+            if result['status'] == 'created':
+                self.counts['created'] += 1
+                if self.kind == 'shareholders':
+                    # Only a written shareholder makes a later row with the same email a duplicate
+                    self.index.add_shareholder({**row, 'id': result['id']})
+            else:
+                self._record_error(line, 'failed', result['error'])
+        self.batch = []
+        self.pending_emails.clear()
+
+    def run(self, lines):
+        reader = csv.DictReader(lines)
+        if not reader.fieldnames:
+            raise RowError('CSV file is empty')
+        reader.fieldnames = [normalize_header(header) for header in reader.fieldnames]
+
+        for raw in reader:
+            self.counts['rows'] += 1
+            line = reader.line_num
+            row = {
+                key: value.strip() if value and value.strip() else None
+                for key, value in raw.items()
+                if key and isinstance(value, str)
+            }
+            try:
+                built = self._build(row)
+            except RowError as e:
+                self._record_error(line, 'invalid', str(e))
+                continue
+            if built is None:
+                self._record_error(line, 'skipped', 'Duplicate shareholder email')
+                continue
+            self.batch.append((line, built))
+            if len(self.batch) >= self.batch_size:
+                self._flush()
+
+        self._flush()
+        return {
+            'kind': self.kind,
+            **self.counts,
+            'errors': self.errors,
+            'errors_truncated': len(self.errors) < self.counts['invalid'] + self.counts['failed'] + self.counts['skipped'],
+        }
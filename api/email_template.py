@@ -0,0 +1,158 @@
+"""Precompiled HTML templates for notification emails.
+
+A ``Template`` is parsed once, at import, into its literal text segments and
+the ``{{name}}`` slots between them. Rendering a recipient fills the slots
+and joins the segments once, instead of one ``str.replace`` pass over the
+whole document per placeholder.
+
+Values are HTML-escaped unless the slot is marked ``{{name|raw}}``, which is
+only used for fragments rendered by another template. A slot can carry a
+numeric format spec, ``{{shares:,}}`` or ``{{price:.2f}}``; those only accept
+numbers, so their output needs no escaping. Escaped values are memoized,
+since class names, round names and dates repeat across a campaign.
+"""
+import html
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# {{name}}, {{name|raw}} or {{name:<numeric format spec>}}
+_SLOT = re.compile(
+    r'\{\{\s*(\w+)\s*(?:(\|\s*raw)|:((?=[^}]*[,_deEfFgGn%])[,_]?(?:\.\d+)?[deEfFgGn%]?))?\s*\}\}'
+)
+
+
+@lru_cache(maxsize=4096)
+def _escape_text(text):
+    return html.escape(text)
+
+
+def escape(value):
+    # Memoized on the text, since 1, 1.0 and True would share a cache entry
+    return _escape_text(str(value))
+
+
+class Template:
+    """An HTML template split into literal text and the value slots between it."""
+
+    def __init__(self, source):
+        self.names = []
+        # Literal text, with a placeholder at each slot's position
+        self.parts = []
+        # (position in parts, index into names, converter) per slot
+        self.slots = []
+        position = 0
+        for match in _SLOT.finditer(source):
+            name, raw, spec = match.groups()
+            if name not in self.names:
+                self.names.append(name)
+            if spec:
+                convert = ('{:%s}' % spec).format
+            elif raw:
+                convert = str
+            else:
+                convert = escape
+            self.parts += (source[position:match.start()], None)
+            self.slots.append((len(self.parts) - 1, self.names.index(name), convert))
+            position = match.end()
+        self.parts.append(source[position:])
+
+    def render_args(self, *values):
+        """Render with one positional value per name, in the order of ``names``."""
+        parts = self.parts.copy()
+        for position, index, convert in self.slots:
+            parts[position] = convert(values[index])
+        return ''.join(parts)
+
+    def render(self, values):
+        """Fill every slot from ``values``; a missing value raises KeyError."""
+        return self.render_args(*[values[name] for name in self.names])
+
+
+SHAREHOLDER_SUMMARY = Template('''
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+            body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+            .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+            .header { background-color: #1a73e8; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }
+            .content { padding: 20px; background-color: #f9f9f9; }
+            .issuance { background-color: white; margin: 10px 0; padding: 15px; border-left: 3px solid #34a853; border-radius: 4px; }
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h2>Kapitalized Equity Management</h2>
+            </div>
+            <div class="content">
+                <p>Dear {{shareholder_name}},</p>
+                <p>This email provides a summary of your current shareholdings in <strong>{{company_name}}</strong>.</p>
+
+                <h3>Your Share Issuances:</h3>
+                {{issuances_list_html|raw}}
+
+                <p>If you have any questions regarding your shareholdings, please contact us at {{contact_email}}.</p>
+                <p>Sincerely,<br>The Kapitalized Team</p>
+            </div>
+            <div style="text-align: center; color: #777; margin-top: 20px;">
+                <p>&copy; {{current_year}} Kapitalized. All rights reserved.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    ''')
+
+ISSUANCE_ITEM = Template('''
+        <div class="issuance">
+            <strong>Share Class:</strong> {{share_class_name}}<br>
+            <strong>Shares:</strong> {{shares:,}}<br>
+            <strong>Price per Share:</strong> ${{price_per_share:.2f}}<br>
+            <strong>Total Value:</strong> ${{total_value:,.2f}}<br>
+            <strong>Issue Date:</strong> {{issue_date}}<br>
+            <strong>Round:</strong> {{round}} ({{round_description}})
+        </div>
+        ''')
+
+NO_ISSUANCES_HTML = "<p>No share issuances found.</p>"
+
+
+def _value(issuance, field, default):
+    """The field's value, or ``default`` only when it's missing or null."""
+    value = issuance.get(field)
+    return default if value is None else value
+
+
+def render_issuances(issuances):
+    """The issuance list fragment for the summary email"""
+    if not issuances:
+        return NO_ISSUANCES_HTML
+
+    # Positional rendering skips building a dict per issuance
+    render = ISSUANCE_ITEM.render_args
+    parts = []
+    for issuance in issuances:
+        shares = _value(issuance, 'shares', 0)
+        price = _value(issuance, 'price_per_share', 0)
+        parts.append(render(
+            _value(issuance, 'share_class_name', 'Unknown'),
+            shares,
+            price,
+            shares * price,
+            _value(issuance, 'issue_date', 'Unknown'),
+            _value(issuance, 'round', 'N/A'),
+            _value(issuance, 'round_description', 'N/A'),
+        ))
+    return ''.join(parts)
+
+
+def render_shareholder_email(shareholder_name, company_name, issuances, contact_email, current_year=None):
+    """The full HTML body of a shareholding summary email"""
+    return SHAREHOLDER_SUMMARY.render({
+        'shareholder_name': shareholder_name,
+        'company_name': company_name,
+        'issuances_list_html': render_issuances(issuances),
+        'contact_email': contact_email,
+        'current_year': current_year or datetime.now().year,
+    })
@@ -0,0 +1,254 @@
+"""Per-company holdings kept current by issuance writes instead of re-aggregated.
+
+``CompanyHoldings`` holds the totals per (shareholder, share class), per
+shareholder, per share class and overall, plus each issuance's contribution
+to them. An issuance write is applied as a delta: its old contribution is
+taken out and its new one put in, so creating, updating or deleting an
+issuance costs the same however many issuances the company has, and reading
+the holdings is a lookup rather than a scan.
+
+``HoldingsStore`` loads a company's holdings from the raw issuances on first
+read and keeps them for the life of the warm instance, bounded by a TTL since
+writes through other instances never reach it. ``verify`` reconciles stored
+holdings with a fresh aggregation of the raw rows.
+"""
+import math
+import threading
+
+from bundle import cap_table_summary
+from cache import LRUCache
+from cap_table import UNASSIGNED_CLASS, UNASSIGNED_HOLDER, CapTableBuilder, is_dilutive_class
+
+
+def _close(a, b):
+    # Sums of prices drift by rounding as deltas are added and taken out
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+
+def _add_to(totals, key, values):
+    current = totals.get(key)
+    if current is None:
+        current = totals[key] = [0] * len(values)
+    for i, value in enumerate(values):
+        current[i] += value
+
+
+def _take_from(totals, key, values):
+    current = totals[key]
+    for i, value in enumerate(values):
+        current[i] -= value
+    # The last slot counts issuances; drop the key once none are left
+    if current[-1] == 0:
+        del totals[key]
+
+
+class CompanyHoldings:
+    """A company's holdings, updated one issuance at a time."""
+
+    def __init__(self, company_id, issuances=(), share_classes=None, shareholders=None):
+        self.company_id = company_id
+        self.share_classes = list(share_classes or [])
+        self.shareholder_lookup = shareholders or {}
+        self.dilutive_class_ids = {sc.get('id') for sc in self.share_classes if is_dilutive_class(sc)}
+        self.contributions = {}
+        # Each list ends with the number of issuances behind it
+        self.positions = {}
+        self.holders = {}
+        self.classes = {}
+        self.totals = [0, 0, 0, 0]
+        self._latest = None
+        self._latest_stale = False
+        self._lock = threading.Lock()
+        for issuance in issuances:
+            self._put(issuance)
+
+    def _put(self, issuance):
+        issuance_id = issuance.get('id')
+        if issuance_id in self.contributions:
+            self._remove(issuance_id)
+
+        shares = issuance.get('shares') or 0
+        price = issuance.get('price_per_share')
+        invested = shares * (price or 0)
+        class_id = issuance.get('share_class_id') or UNASSIGNED_CLASS
+        outstanding = 0 if class_id in self.dilutive_class_ids else shares
+        shareholder_id = issuance.get('shareholder_id')
+        issue_date = issuance.get('issue_date')
+
+        self.contributions[issuance_id] = (shareholder_id, class_id, shares, outstanding, invested, issue_date, price)
+        _add_to(self.classes, class_id, (shares, invested, 1))
+        if shareholder_id:
+            _add_to(self.positions, (shareholder_id, class_id), (shares, invested, 1))
+            _add_to(self.holders, shareholder_id, (shares, outstanding, invested, 1))
+        for i, value in enumerate((shares, outstanding, invested, 1)):
+            self.totals[i] += value
+
+        if issue_date is not None and price is not None and not self._latest_stale:
+            if self._latest is None or issue_date >= self._latest[0]:
+                self._latest = (issue_date, price)
+
+    def _remove(self, issuance_id):
+        contribution = self.contributions.pop(issuance_id, None)
+        if contribution is None:
+            return
+        shareholder_id, class_id, shares, outstanding, invested, issue_date, price = contribution
+        _take_from(self.classes, class_id, (shares, invested, 1))
+        if shareholder_id:
+            _take_from(self.positions, (shareholder_id, class_id), (shares, invested, 1))
+            _take_from(self.holders, shareholder_id, (shares, outstanding, invested, 1))
+        for i, value in enumerate((shares, outstanding, invested, 1)):
+            self.totals[i] -= value
+
+        if self._latest is not None and issue_date == self._latest[0]:
+            # Finding the next latest price needs a scan, so wait until it's read
+            self._latest_stale = True
+
+    def put(self, issuance):
+        """Add ``issuance``, replacing any earlier version of the same row."""
+        with self._lock:
+            self._put(issuance)
+
+    def remove(self, issuance_id):
+        with self._lock:
+            self._remove(issuance_id)
+
+    def latest_price(self):
+        if self._latest_stale:
+            self._latest = None
+            for _, _, _, _, _, issue_date, price in self.contributions.values():
+                if issue_date is not None and price is not None and (self._latest is None or issue_date >= self._latest[0]):
+                    self._latest = (issue_date, price)
+            self._latest_stale = False
+        return self._latest[1] if self._latest is not None else None
+
+    def cap_table(self, price=None):
+        """The cap table without issuance rows, as ``build_cap_table(..., keep_issuances=False)``."""
+        with self._lock:
+            builder = CapTableBuilder(self.company_id, self.share_classes, self.shareholder_lookup, keep_issuances=False, price=price)
+            builder.total_shares, builder.outstanding_shares, builder.total_invested, _ = self.totals
+            builder.latest_price = self.latest_price()
+            builder.class_totals = {class_id: [shares, invested] for class_id, (shares, invested, _) in self.classes.items()}
+            for shareholder_id, (shares, outstanding, invested, _) in self.holders.items():
+                entry = builder._new_entry(shareholder_id, None)
+                entry['total_shares'] = shares
+                entry['outstanding_shares'] = outstanding
+                entry['invested'] = invested
+            by_position = {}
+            for (shareholder_id, class_id), (shares, invested, count) in self.positions.items():
+                by_position.setdefault(shareholder_id, {})[class_id] = {
+                    'total_shares': shares,
+                    'invested': invested,
+                    'issuance_count': count,
+                }
+            issuance_count = len(self.contributions)
+        cap_table = builder.build(backend='holdings')
+        cap_table['issuance_count'] = issuance_count
+        cap_table['positions'] = by_position
+        return cap_table
+
+    def all_positions(self):
+        """Copies of the share classes and every position, taken under the lock.
+
+        Unlike ``positions``, shares issued without a shareholder are included,
+        per class under ``UNASSIGNED_HOLDER``. Returns ``(share_classes, positions)``.
+        """
+        with self._lock:
+            positions = {key: tuple(value) for key, value in self.positions.items()}
+            held = {}
+            for (_, class_id), values in self.positions.items():
+                _add_to(held, class_id, values)
+            for class_id, (shares, invested, count) in self.classes.items():
+                held_shares, held_invested, held_count = held.get(class_id, (0, 0, 0))
+                if count > held_count:
+                    positions[(UNASSIGNED_HOLDER, class_id)] = (shares - held_shares, invested - held_invested, count - held_count)
+            return list(self.share_classes), positions
+
+    def summary(self, price=None):
+        """Totals, per share class, per holder and per (holder, share class) position."""
+        cap_table = self.cap_table(price)
+        summary = cap_table_summary(cap_table, len(self.shareholder_lookup), cap_table['issuance_count'])
+        summary['positions'] = cap_table['positions']
+        return summary
+
+    def differences(self, other):
+        """Where ``other`` (e.g. a fresh aggregation) disagrees with these holdings."""
+        found = []
+        for name in ('positions', 'holders', 'classes'):
+            mine, theirs = getattr(self, name), getattr(other, name)
+            for key in mine.keys() | theirs.keys():
+                a, b = mine.get(key), theirs.get(key)
+                if a is None or b is None or not all(_close(x, y) for x, y in zip(a, b)):
+                    found.append({'kind': name, 'key': list(key) if isinstance(key, tuple) else key, 'stored': a, 'actual': b})
+        if not all(_close(x, y) for x, y in zip(self.totals, other.totals)):
+            found.append({'kind': 'totals', 'key': None, 'stored': self.totals, 'actual': other.totals})
+        return found
+
+
+class HoldingsStore:
+    """``CompanyHoldings`` per company, loaded on first read by ``load(company_id)``.
+
+    Unlike the response caches, entries survive issuance writes: routes pass
+    each write to ``apply`` instead. Other writes (shareholders, share
+    classes, deletes of whole companies) drop the company's entry.
+    """
+
+    def __init__(self, versions, load, maxsize=256, ttl=None):
+        self.versions = versions
+        self.load = load
+        self.entries = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, company_id):
+        holdings = self.entries.get(company_id)
+        if holdings is not None:
+            return holdings
+        version = self.versions.get(company_id)
+        holdings = self.load(company_id)
+        with self._lock:
+            # A write applied while this was loading may be missing from it
+            if self.versions.get(company_id) == version:
+                self.entries.set(company_id, holdings)
+        return holdings
+
+    def apply(self, company_id, put=(), removed=()):
+        """Apply an issuance write: ``put`` rows in, ``removed`` issuance IDs out.
+
+        Also bumps the company's version, so a load racing with the write is
+        served but not stored.
+        """
+        with self._lock:
+            holdings = self.entries.get(company_id)
+            if holdings is not None:
+                for issuance_id in removed:
+                    holdings.remove(issuance_id)
+                for issuance in put:
+                    holdings.put(issuance)
+            self.versions.bump(company_id)
+
+    def verify(self, company_ids=None, repair=True):
+        """Compare stored holdings with a fresh load; by default every loaded company.
+
+        Returns ``{company_id: differences}``. With ``repair`` the fresh
+        holdings replace the stored ones.
+        """
+        company_ids = list(company_ids) if company_ids is not None else self.entries.keys()
+        report = {}
+        for company_id in company_ids:
+            stored = self.entries.get(company_id)
+            version = self.versions.get(company_id)
+            actual = self.load(company_id)
+            report[company_id] = stored.differences(actual) if stored is not None else []
+            if repair:
+                with self._lock:
+                    if self.versions.get(company_id) == version:
+                        self.entries.set(company_id, actual)
+        return report
+
+    def discard_company(self, company_id):
+        self.entries.pop(company_id)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return self.entries.stats()
@@ -1,27 +1,137 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+import itertools
 import os
+import sys
 from datetime import datetime
-from supabase import create_client, Client
 from functools import wraps
-from dotenv import load_dotenv
+from urllib.parse import urlencode
+from werkzeug.utils import secure_filename
 
-# Load environment variables
-load_dotenv()
+# Helper modules live next to this file; make them importable both locally and on Vercel
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Load environment variables before the helper modules read their settings
+from clients import load_env, supabase_client, supabase_configured
+load_env()
+
+from auth import AuthError, TokenVerifier
+from bundle import build_bundle
+from bulk import (
+    RowError, check_issuance_references, insert_in_chunks, issuance_row,
+    parse_bulk_payload, parse_id_list, shareholder_row, summarize, validate_rows
+)
+from cache import CompanyCache, CompanyVersions
+from compression import compress_response
+from conditional import ConditionalResponses, content_etag
+from repository import create_repository
+from cap_table import build_cap_table
+from csv_export import iter_shareholder_csv
+from csv_import import IMPORT_KINDS, CSVImporter, decode_lines
+from holdings import HoldingsStore, CompanyHoldings
+from json_provider import FastJSONProvider
+from ledger import CapTableLedger, parse_as_of
+from pagination import (
+    COMPANIES, SHARE_CLASSES, SHARE_ISSUANCES, SHAREHOLDERS, USER_PROFILES,
+    ListQueryError, fetch_page, parse_list_args
+)
+from pdf_report import iter_company_report
+from scenarios import ScenarioEngine, ScenarioError, cap_table_issuances, expand_scenarios
+from waterfall import WaterfallEngine, WaterfallError, parse_exit_values
 
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app)
+# orjson-backed when installed; encodes UUIDs, dates and decimals itself
+app.json = FastJSONProvider(app)
+# Pagination metadata travels in headers; let browser clients read them
+CORS(app, expose_headers=['X-Next-Cursor', 'X-Total-Count', 'Link', 'X-Cache', 'ETag'])
 
-# Initialize Supabase client
+# The Supabase client is built on first use, so cold starts don't import the SDK
 supabase_url = os.environ.get("SUPABASE_URL")
-supabase_key = os.environ.get("SUPABASE_ANON_KEY")
 
-if not supabase_url or not supabase_key:
-    print("Warning: Supabase credentials not found in environment variables")
-    supabase = None
-else:
-    supabase = create_client(supabase_url, supabase_key)
+if not supabase_configured():
+    print("Warning: Supabase credentials or package not found")
+
+# Data access goes through the repository; DATA_BACKEND=memory runs without Supabase
+db = create_repository(client_factory=supabase_client if supabase_configured() else None)
+
+def remote_get_user(token):
+    return supabase_client().auth.get_user(token)
+
+# Access tokens are verified locally against the JWT secret or the project's signing keys;
+# the auth server is only asked about tokens neither can check
+token_verifier = TokenVerifier(
+    jwt_secret=os.environ.get('SUPABASE_JWT_SECRET'),
+    jwks_url=f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json" if supabase_url else None,
+    remote=remote_get_user if supabase_configured() else None
+)
+
+# Computed cap tables, keyed by company and data version
+company_versions = CompanyVersions()
+cap_table_cache = CompanyCache(
+    company_versions,
+    maxsize=int(os.environ.get('CAP_TABLE_CACHE_SIZE', 256)),
+    ttl=float(os.environ.get('CAP_TABLE_CACHE_TTL', 60))
+)
+
+# Rendered PDF reports share the same data versions
+report_cache = CompanyCache(
+    company_versions,
+    maxsize=int(os.environ.get('REPORT_CACHE_SIZE', 32)),
+    ttl=float(os.environ.get('REPORT_CACHE_TTL', 300))
+)
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', 5 * 1024 * 1024))
+
+# Serialized company bundles and their ETags
+bundle_cache = CompanyCache(
+    company_versions,
+    maxsize=int(os.environ.get('BUNDLE_CACHE_SIZE', 128)),
+    ttl=float(os.environ.get('BUNDLE_CACHE_TTL', 60))
+)
+
+# Date-ordered issuance ledgers answering ?as_of= cap-table queries
+ledger_cache = CompanyCache(
+    company_versions,
+    maxsize=int(os.environ.get('LEDGER_CACHE_SIZE', 64)),
+    ttl=float(os.environ.get('LEDGER_CACHE_TTL', 60))
+)
+
+# ETags of company-scoped reads, so unchanged polls get a 304 without running the route
+conditional_responses = ConditionalResponses(company_versions)
+
+company_caches = (cap_table_cache, report_cache, bundle_cache, ledger_cache, conditional_responses)
+
+def load_holdings(company_id):
+    issuances = db.select(
+        'share_issuances',
+        'id, shareholder_id, share_class_id, shares, price_per_share, issue_date',
+        filters={'company_id': company_id}
+    )
+    share_classes = db.select('share_classes', filters={'company_id': company_id})
+    shareholders = db.select('shareholders', 'id, name, email', filters={'company_id': company_id})
+    return CompanyHoldings(company_id, issuances.data, share_classes.data, {row['id']: row for row in shareholders.data})
+
+# Per-company holdings, updated in place by issuance writes rather than invalidated
+holdings_store = HoldingsStore(
+    company_versions,
+    load_holdings,
+    maxsize=int(os.environ.get('HOLDINGS_CACHE_SIZE', 256)),
+    ttl=float(os.environ.get('HOLDINGS_CACHE_TTL', 60))
+)
+
+# after_request hooks run in reverse order of registration: this one runs last,
+# so ETags are computed on, and 304s decided for, the uncompressed body
+@app.after_request
+def compress_after_request(response):
+    return compress_response(request, response)
+
+@app.before_request
+def conditional_before_request():
+    return conditional_responses.before(request, app.response_class)
+
+@app.after_request
+def conditional_after_request(response):
+    return conditional_responses.after(request, response)
 
 # Helper function to verify auth token
 def verify_token(f):
@@ -40,8 +150,7 @@ def verify_token(f):
             return jsonify({'error': 'Token missing'}), 401
         
         try:
-            user = supabase.auth.get_user(token)
-            request.current_user = user
+            request.current_user = token_verifier.verify(token)
         except Exception as e:
             return jsonify({'error': 'Invalid token'}), 401
         
@@ -49,13 +158,107 @@ def verify_token(f):
     
     return decorated_function
 
+def parse_bool(value, default=False):
+    """A query-string or JSON flag; strings other than 1/true/yes/on are false."""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+def parse_bool_arg(name, default=False):
+    return parse_bool(request.args.get(name), default)
+
+def invalidate_company_data(*company_ids):
+    for company_id in set(company_ids):
+        if company_id:
+            company_versions.bump(company_id)
+            for cache in company_caches:
+                cache.discard_company(company_id)
+            holdings_store.discard_company(company_id)
+
+def clear_company_caches():
+    for cache in company_caches:
+        cache.clear()
+    holdings_store.clear()
+
+def invalidate_rows(rows):
+    invalidate_company_data(*(row.get('company_id') for row in rows or []))
+
+def apply_issuance_write(put=(), removed=()):
+    """Apply written issuance rows to the holdings as deltas and drop the cached responses.
+
+    ``holdings_store.apply`` bumps each company's version once, so the
+    caches only need their entries dropped.
+    """
+    writes = {}
+    for row in put:
+        writes.setdefault(row.get('company_id'), ([], []))[0].append(row)
+    for row in removed:
+        writes.setdefault(row.get('company_id'), ([], []))[1].append(row.get('id'))
+    for company_id, (company_put, company_removed) in writes.items():
+        if company_id:
+            holdings_store.apply(company_id, put=company_put, removed=company_removed)
+            for cache in company_caches:
+                cache.discard_company(company_id)
+
+def list_response(resource, filters=None):
+    """One page of ``resource`` as a JSON array, with the cursor and total in headers.
+
+    ``?envelope=true`` returns ``{data, next_cursor, total}`` instead.
+    """
+    query = parse_list_args(request.args, resource)
+    page = fetch_page(db, resource, query, filters)
+    
+    if parse_bool_arg('envelope'):
+        return jsonify({'data': page.rows, 'next_cursor': page.next_cursor, 'total': page.total}), 200
+    
+    response = jsonify(page.rows)
+    if page.next_cursor:
+        args = request.args.to_dict()
+        args['cursor'] = page.next_cursor
+        response.headers['X-Next-Cursor'] = page.next_cursor
+        response.headers['Link'] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+    if page.total is not None:
+        response.headers['X-Total-Count'] = str(page.total)
+    return response, 200
+
+def bulk_insert_response(table, rows, build_row, check_references=None):
+    valid, results = validate_rows(rows, build_row)
+    if check_references:
+        valid = check_references(db, valid, results)
+    
+    if parse_bool_arg('strict') and len(valid) < len(rows):
+        invalid = [result for result in results if result]
+        return jsonify({'error': 'Batch contains invalid rows; nothing was imported', 'invalid': len(invalid), 'results': invalid}), 400
+    
+    insert_in_chunks(db, table, valid, results)
+    invalidate_company_data(*(row['company_id'] for _, row in valid))
+    
+    summary = summarize(results)
+    if summary['created'] == len(rows):
+        status = 201
+    elif summary['created'] == 0:
+        status = 400
+    else:
+        status = 207
+    return jsonify(summary), status
+
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
 def health():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'supabase_connected': supabase is not None
+        'supabase_connected': supabase_configured(),
+        'data_backend': db.backend if db else None,
+        'cap_table_cache': cap_table_cache.stats(),
+        'report_cache': report_cache.stats(),
+        'bundle_cache': bundle_cache.stats(),
+        'ledger_cache': ledger_cache.stats(),
+        'holdings_cache': holdings_store.stats(),
+        'etag_cache': conditional_responses.stats(),
+        'auth_cache': token_verifier.stats()
     })
 
 # Test endpoint
@@ -74,7 +277,7 @@ def signup():
         if not email or not password:
             return jsonify({'error': 'Email and password required'}), 400
         
-        response = supabase.auth.sign_up({
+        response = supabase_client().auth.sign_up({
             'email': email,
             'password': password
         })
@@ -86,7 +289,7 @@ def signup():
                 'dob': data.get('dob'),
                 'address': data.get('address', '')
             }
-            supabase.table('user_profiles').insert(profile_data).execute()
+            db.insert('user_profiles', profile_data)
             
             return jsonify({
                 'user': {
@@ -111,7 +314,7 @@ def login():
         if not email or not password:
             return jsonify({'error': 'Email and password required'}), 400
         
-        response = supabase.auth.sign_in_with_password({
+        response = supabase_client().auth.sign_in_with_password({
             'email': email,
             'password': password
         })
@@ -138,8 +341,17 @@ def logout():
     try:
         auth_header = request.headers.get('Authorization')
         if auth_header:
-            token = auth_header.split(' ')[1]
-            supabase.auth.sign_out()
+            try:
+                token = auth_header.split(' ')[1]
+            except IndexError:
+                return jsonify({'error': 'Invalid token format'}), 401
+            # Drop the cached principal so the token stops working here right away
+            try:
+                token_verifier.revoke(token)
+            except AuthError:
+                return jsonify({'error': 'Invalid token'}), 401
+            if supabase_configured():
+                supabase_client().auth.sign_out()
             return jsonify({'message': 'Logged out successfully'}), 200
         else:
             return jsonify({'error': 'No auth token provided'}), 400
@@ -148,17 +360,20 @@ def logout():
 
 # Company endpoints
 @app.route('/api/companies', methods=['GET'])
+@verify_token
 def get_companies():
     try:
-        response = supabase.table('companies').select('*').execute()
-        return jsonify(response.data), 200
+        # Only the caller's own companies; /api/admin/companies lists everyone's
+        return list_response(COMPANIES, {'user_id': request.current_user.user.id})
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/companies/<company_id>', methods=['GET'])
 def get_company(company_id):
     try:
-        response = supabase.table('companies').select('*').eq('id', company_id).execute()
+        response = db.select('companies', filters={'id': company_id})
         if response.data:
             return jsonify(response.data[0]), 200
         else:
@@ -167,6 +382,7 @@ def get_company(company_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/companies', methods=['POST'])
+@verify_token
 def create_company():
     try:
         data = request.get_json()
@@ -176,9 +392,11 @@ def create_company():
             if field not in data:
                 return jsonify({'error': f'{field} is required'}), 400
         
+        # The company belongs to the caller, never to a user_id from the body
         company_data = {
             'name': data['name'],
             'description': data.get('description'),
+            'user_id': request.current_user.user.id,
             'created_at': datetime.now().isoformat()
         }
         
@@ -186,7 +404,7 @@ def create_company():
         if 'company_id' in data:
             company_data['company_id'] = data['company_id']
         
-        response = supabase.table('companies').insert(company_data).execute()
+        response = db.insert('companies', company_data)
         
         if response.data:
             return jsonify(response.data[0]), 201
@@ -200,7 +418,8 @@ def create_company():
 def update_company(company_id):
     try:
         data = request.get_json()
-        response = supabase.table('companies').update(data).eq('id', company_id).execute()
+        response = db.update('companies', data, {'id': company_id})
+        invalidate_company_data(company_id)
         
         if response.data:
             return jsonify(response.data[0]), 200
@@ -214,22 +433,17 @@ def update_company(company_id):
 @app.route('/api/shareholders', methods=['GET'])
 def get_shareholders():
     try:
-        company_id = request.args.get('company_id')
-        
-        query = supabase.table('shareholders').select('*')
-        
-        if company_id:
-            query = query.eq('company_id', company_id)
-        
-        response = query.execute()
-        return jsonify(response.data), 200
+        # company_id and the other columns filter through the list parameters
+        return list_response(SHAREHOLDERS)
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/shareholders/<shareholder_id>', methods=['GET'])
 def get_shareholder(shareholder_id):
     try:
-        response = supabase.table('shareholders').select('*').eq('id', shareholder_id).execute()
+        response = db.select('shareholders', filters={'id': shareholder_id})
         if response.data:
             return jsonify(response.data[0]), 200
         else:
@@ -242,20 +456,13 @@ def create_shareholder():
     try:
         data = request.get_json()
         
-        required_fields = ['company_id', 'name', 'email']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'{field} is required'}), 400
-        
-        shareholder_data = {
-            'company_id': data['company_id'],
-            'name': data['name'],
-            'email': data['email'],
-            'type': data.get('type'),
-            'created_at': datetime.now().isoformat()
-        }
+        try:
+            shareholder_data = shareholder_row(data, strict=False)
+        except RowError as e:
+            return jsonify({'error': str(e)}), 400
         
-        response = supabase.table('shareholders').insert(shareholder_data).execute()
+        response = db.insert('shareholders', shareholder_data)
+        invalidate_company_data(data['company_id'])
         
         if response.data:
             return jsonify(response.data[0]), 201
@@ -265,11 +472,25 @@ def create_shareholder():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/shareholders/bulk', methods=['POST'])
+def bulk_create_shareholders():
+    try:
+        rows = parse_bulk_payload(request.get_json())
+        return bulk_insert_response('shareholders', rows, shareholder_row)
+    except RowError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/shareholders/<shareholder_id>', methods=['PUT'])
 def update_shareholder(shareholder_id):
     try:
         data = request.get_json()
-        response = supabase.table('shareholders').update(data).eq('id', shareholder_id).execute()
+        response = db.update('shareholders', data, {'id': shareholder_id})
+        invalidate_rows(response.data)
+        if 'company_id' in data:
+            # The shareholder moved; the company it left is unknown here
+            clear_company_caches()
         
         if response.data:
             return jsonify(response.data[0]), 200
@@ -282,7 +503,8 @@ def update_shareholder(shareholder_id):
 @app.route('/api/shareholders/<shareholder_id>', methods=['DELETE'])
 def delete_shareholder(shareholder_id):
     try:
-        response = supabase.table('shareholders').delete().eq('id', shareholder_id).execute()
+        response = db.delete('shareholders', {'id': shareholder_id})
+        invalidate_rows(response.data)
         return jsonify({'message': 'Shareholder deleted successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -291,15 +513,9 @@ def delete_shareholder(shareholder_id):
 @app.route('/api/share-classes', methods=['GET'])
 def get_share_classes():
     try:
-        company_id = request.args.get('company_id')
-        
-        query = supabase.table('share_classes').select('*')
-        
-        if company_id:
-            query = query.eq('company_id', company_id)
-        
-        response = query.execute()
-        return jsonify(response.data), 200
+        return list_response(SHARE_CLASSES)
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -319,8 +535,12 @@ def create_share_class():
             'priority': data['priority'],
             'created_at': datetime.now().isoformat()
         }
+        if data.get('is_dilutive') is not None:
+            # Options, warrants, SAFEs: counted fully diluted only
+            share_class_data['is_dilutive'] = bool(data['is_dilutive'])
         
-        response = supabase.table('share_classes').insert(share_class_data).execute()
+        response = db.insert('share_classes', share_class_data)
+        invalidate_company_data(data['company_id'])
         
         if response.data:
             return jsonify(response.data[0]), 201
@@ -334,25 +554,17 @@ def create_share_class():
 @app.route('/api/share-issuances', methods=['GET'])
 def get_share_issuances():
     try:
-        company_id = request.args.get('company_id')
-        shareholder_id = request.args.get('shareholder_id')
-        
-        query = supabase.table('share_issuances').select('*')
-        
-        if company_id:
-            query = query.eq('company_id', company_id)
-        if shareholder_id:
-            query = query.eq('shareholder_id', shareholder_id)
-        
-        response = query.execute()
-        return jsonify(response.data), 200
+        # Also filters on issue_date_from / issue_date_to
+        return list_response(SHARE_ISSUANCES)
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/share-issuances/<issuance_id>', methods=['GET'])
 def get_share_issuance(issuance_id):
     try:
-        response = supabase.table('share_issuances').select('*').eq('id', issuance_id).execute()
+        response = db.select('share_issuances', filters={'id': issuance_id})
         if response.data:
             return jsonify(response.data[0]), 200
         else:
@@ -365,25 +577,13 @@ def create_share_issuance():
     try:
         data = request.get_json()
         
-        required_fields = ['company_id', 'shares', 'price_per_share', 'issue_date']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'{field} is required'}), 400
-        
-        issuance_data = {
-            'company_id': data['company_id'],
-            'shareholder_id': data.get('shareholder_id'),
-            'share_class_id': data.get('share_class_id'),
-            'shares': data['shares'],
-            'price_per_share': data['price_per_share'],
-            'issue_date': data['issue_date'],
-            'round': data.get('round'),
-            'round_description': data.get('round_description'),
-            'payment_status': data.get('payment_status'),
-            'created_at': datetime.now().isoformat()
-        }
+        try:
+            issuance_data = issuance_row(data, strict=False)
+        except RowError as e:
+            return jsonify({'error': str(e)}), 400
         
-        response = supabase.table('share_issuances').insert(issuance_data).execute()
+        response = db.insert('share_issuances', issuance_data)
+        apply_issuance_write(put=response.data)
         
         if response.data:
             return jsonify(response.data[0]), 201
@@ -393,12 +593,26 @@ def create_share_issuance():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/share-issuances/bulk', methods=['POST'])
+def bulk_create_share_issuances():
+    try:
+        rows = parse_bulk_payload(request.get_json())
+        return bulk_insert_response('share_issuances', rows, issuance_row, check_issuance_references)
+    except RowError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/share-issuances/<issuance_id>', methods=['PUT'])
 def update_share_issuance(issuance_id):
     try:
         data = request.get_json()
         
-        response = supabase.table('share_issuances').update(data).eq('id', issuance_id).execute()
+        response = db.update('share_issuances', data, {'id': issuance_id})
+        apply_issuance_write(put=response.data)
+        if 'company_id' in data:
+            # The issuance moved; the company it left is unknown here
+            clear_company_caches()
         
         if response.data:
             return jsonify(response.data[0]), 200
@@ -411,7 +625,8 @@ def update_share_issuance(issuance_id):
 @app.route('/api/share-issuances/<issuance_id>', methods=['DELETE'])
 def delete_share_issuance(issuance_id):
     try:
-        response = supabase.table('share_issuances').delete().eq('id', issuance_id).execute()
+        response = db.delete('share_issuances', {'id': issuance_id})
+        apply_issuance_write(removed=response.data)
         return jsonify({'message': 'Share issuance deleted successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -422,7 +637,7 @@ def delete_share_issuance(issuance_id):
 def get_profile():
     try:
         user = request.current_user
-        response = supabase.table('user_profiles').select('*').eq('id', user.user.id).execute()
+        response = db.select('user_profiles', filters={'id': user.user.id})
         
         if response.data:
             return jsonify(response.data[0]), 200
@@ -444,7 +659,7 @@ def update_profile():
             'address': data.get('address')
         }
         
-        response = supabase.table('user_profiles').update(profile_data).eq('id', user.user.id).execute()
+        response = db.update('user_profiles', profile_data, {'id': user.user.id})
         
         if response.data:
             return jsonify(response.data[0]), 200
@@ -454,42 +669,265 @@ def update_profile():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def company_ledger(company_id):
+    cache_key = ledger_cache.key(company_id)
+    ledger = ledger_cache.get(cache_key)
+    if ledger is None:
+        issuances = db.select('share_issuances', '*, shareholders(name, email)', filters={'company_id': company_id})
+        share_classes = db.select('share_classes', filters={'company_id': company_id})
+        ledger = CapTableLedger(company_id, issuances.data, share_classes.data)
+        ledger_cache.set(cache_key, ledger)
+    return ledger
+
 # Summary endpoint - get company cap table
 @app.route('/api/companies/<company_id>/cap-table', methods=['GET'])
 def get_cap_table(company_id):
     try:
-        issuances = supabase.table('share_issuances').select('*, shareholders(name, email)').eq('company_id', company_id).execute()
-        share_classes = supabase.table('share_classes').select('*').eq('company_id', company_id).execute()
+        compact = parse_bool_arg('compact')
+        # Issuance rows (or, compact, their IDs) need a read of every row; ?issuances=false
+        # answers from the holdings totals with a lookup instead
+        with_issuances = parse_bool_arg('issuances', True)
+        price = request.args.get('price', type=float)
+        as_of = request.args.get('as_of')
+        if as_of is not None:
+            try:
+                as_of = parse_as_of(as_of)
+            except ValueError:
+                return jsonify({'error': 'as_of must be an ISO date (YYYY-MM-DD)'}), 400
+        cache_key = cap_table_cache.key(company_id, (compact, with_issuances, price, as_of))
         
-        total_shares = sum(item.get('shares', 0) for item in issuances.data)
+        cap_table = cap_table_cache.get(cache_key)
+        if cap_table is not None:
+            response = jsonify(cap_table)
+            response.headers['X-Cache'] = 'HIT'
+            return response, 200
         
-        cap_table = {
-            'company_id': company_id,
-            'total_shares': total_shares,
-            'share_classes': share_classes.data,
-            'issuances': issuances.data,
-            'shareholders': {}
-        }
+        if as_of is not None:
+            cap_table = company_ledger(company_id).snapshot(as_of, price=price)
+        elif not with_issuances:
+            cap_table = holdings_store.get(company_id).cap_table(price)
+        else:
+            issuances = db.select('share_issuances', '*, shareholders(name, email)', filters={'company_id': company_id})
+            share_classes = db.select('share_classes', filters={'company_id': company_id})
+            
+            cap_table = build_cap_table(
+                company_id,
+                issuances.data,
+                share_classes.data,
+                compact=compact,
+                price=price
+            )
+        cap_table_cache.set(cache_key, cap_table)
+        
+        response = jsonify(cap_table)
+        response.headers['X-Cache'] = 'MISS'
+        return response, 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Holdings endpoint - totals per shareholder, share class and position, kept current by issuance writes
+@app.route('/api/companies/<company_id>/holdings', methods=['GET'])
+def get_company_holdings(company_id):
+    try:
+        price = request.args.get('price', type=float)
+        return jsonify(holdings_store.get(company_id).summary(price)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Waterfall endpoint - liquidation payouts per share class and holder across a range of exit values
+@app.route('/api/companies/<company_id>/waterfall', methods=['POST'])
+def get_company_waterfall(company_id):
+    try:
+        data = request.get_json(silent=True) or {}
+        exit_values = parse_exit_values(data)
+        
+        holdings = holdings_store.get(company_id)
+        # Copied under the holdings lock, so a concurrent issuance write can't change them mid-read
+        share_classes, positions = holdings.all_positions()
+        engine = WaterfallEngine(
+            share_classes,
+            positions,
+            holdings.shareholder_lookup,
+            terms=data.get('terms'),
+            dilutive_class_ids=holdings.dilutive_class_ids,
+            fully_diluted=parse_bool(data.get('fully_diluted'))
+        )
+        result = engine.run(exit_values, include_holders=parse_bool(data.get('include_holders'), True))
+        result['company_id'] = company_id
+        
+        return jsonify(result), 200
+        
+    except WaterfallError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Bundle endpoint - shareholders, share classes, issuances and cap-table summary in one response
+@app.route('/api/companies/<company_id>/bundle', methods=['GET'])
+@verify_token
+def get_company_bundle(company_id):
+    try:
+        cache_key = bundle_cache.key(company_id)
+        
+        cached = bundle_cache.get(cache_key)
+        if cached is not None:
+            body, etag, owner_id = cached
+            cache_status = 'HIT'
+        else:
+            bundle = build_bundle(db, company_id)
+            if bundle is None:
+                return jsonify({'error': 'Company not found'}), 404
+            body = app.json.dumps_bytes(bundle)
+            etag = content_etag(body)
+            owner_id = bundle['company'].get('user_id')
+            bundle_cache.set(cache_key, (body, etag, owner_id))
+            cache_status = 'MISS'
+        
+        # Other users' companies look the same as missing ones
+        if owner_id != request.current_user.user.id:
+            return jsonify({'error': 'Company not found'}), 404
+        
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        # Let browsers keep the bundle but revalidate it on every page load
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.headers['X-Cache'] = cache_status
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# CSV export endpoint - stream shareholders and their holdings
+@app.route('/api/companies/<company_id>/export/shareholders.csv', methods=['GET'])
+def export_shareholders_csv(company_id):
+    try:
+        if not db.get('companies', company_id):
+            return jsonify({'error': 'Company not found'}), 404
+        
+        chunks = iter_shareholder_csv(db, company_id)
+        # Pull the header now so query errors still get a proper error response
+        header = next(chunks)
+        filename = secure_filename(f'shareholders-{company_id}.csv')
+        return Response(
+            stream_with_context(itertools.chain([header], chunks)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# PDF report endpoint - company profile with cap table and issuance history
+@app.route('/api/companies/<company_id>/report.pdf', methods=['GET'])
+def company_report_pdf(company_id):
+    try:
+        filename = secure_filename(f'company-profile-{company_id}.pdf')
+        headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+        # Key on the version before reading, so a write during rendering can't be cached as current
+        cache_key = report_cache.key(company_id, 'company-profile')
+        
+        cached = report_cache.get(cache_key)
+        if cached is not None:
+            headers['X-Cache'] = 'HIT'
+            return Response(cached, mimetype='application/pdf', headers=headers)
+        
+        company = db.get('companies', company_id)
+        if not company:
+            return jsonify({'error': 'Company not found'}), 404
+        
+        def generate():
+            chunks = []
+            size = 0
+            for chunk in iter_company_report(db, company):
+                # Stop buffering once the report is too large to cache
+                if chunks is not None:
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size > REPORT_CACHE_MAX_BYTES:
+                        chunks = None
+                yield chunk
+            if chunks is not None:
+                report_cache.set(cache_key, b''.join(chunks))
+        
+        headers['X-Cache'] = 'MISS'
+        return Response(stream_with_context(generate()), mimetype='application/pdf', headers=headers)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# CSV import endpoint - stream shareholders or issuances into a company
+@app.route('/api/companies/<company_id>/import/<kind>', methods=['POST'])
+def import_company_csv(company_id, kind):
+    try:
+        if kind not in IMPORT_KINDS:
+            return jsonify({'error': f"kind must be one of: {', '.join(IMPORT_KINDS)}"}), 404
+        
+        if not db.get('companies', company_id):
+            return jsonify({'error': 'Company not found'}), 404
+        
+        # Read multipart uploads from the spooled file, anything else straight off the request body
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if not upload:
+                return jsonify({'error': 'file is required'}), 400
+            stream = upload.stream
+        else:
+            stream = request.stream
+        
+        importer = CSVImporter(db, company_id, kind)
+        summary = importer.run(decode_lines(stream))
+        if summary['created']:
+            invalidate_company_data(company_id)
+        
+        if summary['created'] == summary['rows']:
+            status = 201
+        elif summary['created'] == 0:
+            status = 400
+        else:
+            status = 207
+        return jsonify(summary), status
+        
+    except (RowError, UnicodeDecodeError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Scenario endpoint - apply hypothetical issuances and rounds to a cap table
+@app.route('/api/equity-calculator', methods=['POST'])
+def equity_calculator():
+    try:
+        data = request.get_json() or {}
+        
+        if data.get('cap_table'):
+            base = data['cap_table']
+            company_id = data.get('company_id')
+            issuances = base.get('issuances')
+            price = None
+            if issuances is None and base.get('positions') is not None:
+                # Cap tables served from the holdings list positions instead of issuance rows
+                issuances = cap_table_issuances(base)
+                price = base.get('price_per_share')
+            share_classes = base.get('share_classes') or []
+            shareholders = base.get('shareholders') or {}
+            # A cap-table response keys shareholders by ID; a plain list carries the ID on each row
+            if not isinstance(shareholders, dict):
+                shareholders = {sh['id']: sh for sh in shareholders if sh.get('id')}
+        elif data.get('company_id'):
+            company_id = data['company_id']
+            issuances = db.select('share_issuances', '*, shareholders(name, email)', filters={'company_id': company_id}).data
+            share_classes = db.select('share_classes', filters={'company_id': company_id}).data
+            shareholders = None
+            price = None
+        else:
+            return jsonify({'error': 'company_id or cap_table is required'}), 400
         
-        for issuance in issuances.data:
-            if issuance.get('shareholder_id'):
-                shareholder_id = issuance['shareholder_id']
-                if shareholder_id not in cap_table['shareholders']:
-                    cap_table['shareholders'][shareholder_id] = {
-                        'name': issuance.get('shareholders', {}).get('name'),
-                        'email': issuance.get('shareholders', {}).get('email'),
-                        'total_shares': 0,
-                        'percentage': 0,
-                        'issuances': []
-                    }
-                
-                shares = issuance.get('shares', 0)
-                cap_table['shareholders'][shareholder_id]['total_shares'] += shares
-                cap_table['shareholders'][shareholder_id]['percentage'] = (cap_table['shareholders'][shareholder_id]['total_shares'] / total_shares * 100) if total_shares > 0 else 0
-                cap_table['shareholders'][shareholder_id]['issuances'].append(issuance)
+        scenarios = expand_scenarios(data)
+        engine = ScenarioEngine(company_id, issuances or [], share_classes, shareholders, price=price)
+        result = engine.run(scenarios, include_holders=parse_bool(data.get('include_holders'), True))
         
-        return jsonify(cap_table), 200
+        return jsonify(result), 200
         
+    except ScenarioError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -508,10 +946,17 @@ def index():
             '/api/share-classes',
             '/api/share-issuances',
             '/api/companies/{id}/cap-table',
+            '/api/companies/{id}/bundle',
+            '/api/companies/{id}/holdings',
+            '/api/companies/{id}/waterfall',
+            '/api/equity-calculator',
             '/api/admin/users',
             '/api/admin/companies',
             '/api/admin/shareholders',
-            '/api/admin/share-issuances'
+            '/api/admin/share-issuances',
+            '/api/admin/companies/bulk-delete',
+            '/api/admin/shareholders/bulk-delete',
+            '/api/admin/holdings/verify'
         ]
     })
 
@@ -529,16 +974,28 @@ def api_root():
             '/api/companies',
             '/api/companies/{id}',
             '/api/companies/{id}/cap-table',
+            '/api/companies/{id}/bundle',
+            '/api/companies/{id}/holdings',
+            '/api/companies/{id}/waterfall',
+            '/api/companies/{id}/import/{kind}',
+            '/api/companies/{id}/export/shareholders.csv',
+            '/api/companies/{id}/report.pdf',
+            '/api/equity-calculator',
             '/api/shareholders',
             '/api/shareholders/{id}',
+            '/api/shareholders/bulk',
             '/api/share-classes',
             '/api/share-issuances',
             '/api/share-issuances/{id}',
+            '/api/share-issuances/bulk',
             '/api/profile',
             '/api/admin/users',
             '/api/admin/companies',
             '/api/admin/shareholders',
-            '/api/admin/share-issuances'
+            '/api/admin/share-issuances',
+            '/api/admin/companies/bulk-delete',
+            '/api/admin/shareholders/bulk-delete',
+            '/api/admin/holdings/verify'
         ]
     })
 
@@ -546,51 +1003,51 @@ def api_root():
 @app.route('/api/test-data', methods=['POST'])
 def create_test_data():
     try:
-        company_response = supabase.table('companies').insert({
+        company_response = db.insert('companies', {
             'name': 'Test Startup Inc',
             'description': 'A test company for demonstration'
-        }).execute()
+        })
         
         if not company_response.data:
             return jsonify({'error': 'Failed to create test company'}), 400
             
         company_id = company_response.data[0]['id']
         
-        ordinary_shares = supabase.table('share_classes').insert({
+        ordinary_shares = db.insert('share_classes', {
             'company_id': company_id,
             'name': 'Ordinary Shares',
             'priority': 1
-        }).execute()
+        })
         
-        preference_shares = supabase.table('share_classes').insert({
+        preference_shares = db.insert('share_classes', {
             'company_id': company_id,
             'name': 'Preference Shares',
             'priority': 2
-        }).execute()
+        })
         
-        shareholder1 = supabase.table('shareholders').insert({
+        shareholder1 = db.insert('shareholders', {
             'company_id': company_id,
             'name': 'John Founder',
             'email': 'john@example.com',
             'type': 'individual'
-        }).execute()
+        })
         
-        shareholder2 = supabase.table('shareholders').insert({
+        shareholder2 = db.insert('shareholders', {
             'company_id': company_id,
             'name': 'Jane Investor',
             'email': 'jane@example.com',
             'type': 'individual'
-        }).execute()
+        })
         
-        shareholder3 = supabase.table('shareholders').insert({
+        shareholder3 = db.insert('shareholders', {
             'company_id': company_id,
             'name': 'Venture Capital LLC',
             'email': 'vc@example.com',
             'type': 'company'
-        }).execute()
+        })
         
         if shareholder1.data and ordinary_shares.data:
-            supabase.table('share_issuances').insert({
+            db.insert('share_issuances', {
                 'company_id': company_id,
                 'shareholder_id': shareholder1.data[0]['id'],
                 'share_class_id': ordinary_shares.data[0]['id'],
@@ -598,10 +1055,10 @@ def create_test_data():
                 'price_per_share': 0.001,
                 'issue_date': '2024-01-01',
                 'round': 1
-            }).execute()
+            })
         
         if shareholder2.data and ordinary_shares.data:
-            supabase.table('share_issuances').insert({
+            db.insert('share_issuances', {
                 'company_id': company_id,
                 'shareholder_id': shareholder2.data[0]['id'],
                 'share_class_id': ordinary_shares.data[0]['id'],
@@ -609,10 +1066,10 @@ def create_test_data():
                 'price_per_share': 1.0,
                 'issue_date': '2024-06-01',
                 'round': 2
-            }).execute()
+            })
         
         if shareholder3.data and preference_shares.data:
-            supabase.table('share_issuances').insert({
+            db.insert('share_issuances', {
                 'company_id': company_id,
                 'shareholder_id': shareholder3.data[0]['id'],
                 'share_class_id': preference_shares.data[0]['id'],
@@ -620,7 +1077,7 @@ def create_test_data():
                 'price_per_share': 5.0,
                 'issue_date': '2024-12-01',
                 'round': 3
-            }).execute()
+            })
         
         return jsonify({
             'message': 'Test data created successfully',
@@ -634,42 +1091,36 @@ def create_test_data():
 @app.route('/api/admin/users', methods=['GET'])
 def get_admin_users():
     try:
-        response = supabase.table('user_profiles').select('*').execute()
-        # Convert IDs to strings to fix the substring error
-        for item in response.data:
-            if 'id' in item and item['id'] is not None:
-                item['id'] = str(item['id'])
-        return jsonify(response.data), 200
+        return list_response(USER_PROFILES)
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e), 'message': 'Failed to fetch users'}), 500
 
 @app.route('/api/admin/companies', methods=['GET'])
 def get_admin_companies():
     try:
-        response = supabase.table('companies').select('*').execute()
-        # Convert IDs to strings to fix the substring error
-        for item in response.data:
-            if 'id' in item and item['id'] is not None:
-                item['id'] = str(item['id'])
-            if 'user_id' in item and item['user_id'] is not None:
-                item['user_id'] = str(item['user_id'])
-        return jsonify(response.data), 200
+        return list_response(COMPANIES)
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e), 'message': 'Failed to fetch companies'}), 500
 
 @app.route('/api/admin/shareholders', methods=['GET'])
 def get_admin_shareholders():
     try:
-        response = supabase.table('shareholders').select('*').execute()
-        return jsonify(response.data), 200
+        return list_response(SHAREHOLDERS)
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e), 'message': 'Failed to fetch shareholders'}), 500
 
 @app.route('/api/admin/share-issuances', methods=['GET'])
 def get_admin_share_issuances():
     try:
-        response = supabase.table('share_issuances').select('*').execute()
-        return jsonify(response.data), 200
+        return list_response(SHARE_ISSUANCES)
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e), 'message': 'Failed to fetch share issuances'}), 500
 
@@ -677,13 +1128,9 @@ def get_admin_share_issuances():
 @app.route('/api/admin/issuances', methods=['GET'])
 def get_admin_issuances_alias():
     try:
-        response = supabase.table('share_issuances').select('*').execute()
-        # Convert IDs to strings to fix the substring error
-        for item in response.data:
-            for key in ['id', 'company_id', 'shareholder_id', 'share_class_id']:
-                if key in item and item[key] is not None:
-                    item[key] = str(item[key])
-        return jsonify(response.data), 200
+        return list_response(SHARE_ISSUANCES)
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -691,32 +1138,68 @@ def get_admin_issuances_alias():
 @app.route('/api/admin/companies/<company_id>', methods=['DELETE'])
 def delete_admin_company(company_id):
     try:
-        # Delete related data first
-        supabase.table('share_issuances').delete().eq('company_id', company_id).execute()
-        supabase.table('shareholders').delete().eq('company_id', company_id).execute()
-        supabase.table('share_classes').delete().eq('company_id', company_id).execute()
-        supabase.table('companies').delete().eq('id', company_id).execute()
-        return jsonify({'message': 'Company deleted'}), 200
+        # Issuances, shareholders, share classes and the company go in one transaction
+        deleted = db.delete_companies([company_id])
+        invalidate_company_data(company_id)
+        return jsonify({'message': 'Company deleted', 'deleted': deleted}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/companies/bulk-delete', methods=['POST'])
+def bulk_delete_admin_companies():
+    try:
+        company_ids = parse_id_list(request.get_json())
+        deleted = db.delete_companies(company_ids)
+        invalidate_company_data(*company_ids)
+        return jsonify({'message': f"{deleted['companies']} companies deleted", 'deleted': deleted}), 200
+    except RowError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/admin/shareholders/<shareholder_id>', methods=['DELETE'])
 def delete_admin_shareholder(shareholder_id):
     try:
-        supabase.table('share_issuances').delete().eq('shareholder_id', shareholder_id).execute()
-        supabase.table('shareholders').delete().eq('id', shareholder_id).execute()
-        return jsonify({'message': 'Shareholder deleted'}), 200
+        deleted = db.delete_shareholders([shareholder_id])
+        invalidate_company_data(*deleted['company_ids'])
+        return jsonify({'message': 'Shareholder deleted', 'deleted': deleted}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/shareholders/bulk-delete', methods=['POST'])
+def bulk_delete_admin_shareholders():
+    try:
+        deleted = db.delete_shareholders(parse_id_list(request.get_json()))
+        invalidate_company_data(*deleted['company_ids'])
+        return jsonify({'message': f"{deleted['shareholders']} shareholders deleted", 'deleted': deleted}), 200
+    except RowError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/admin/share-issuances/<issuance_id>', methods=['DELETE'])
 def delete_admin_share_issuance(issuance_id):
     try:
-        supabase.table('share_issuances').delete().eq('id', issuance_id).execute()
+        response = db.delete('share_issuances', {'id': issuance_id})
+        apply_issuance_write(removed=response.data)
         return jsonify({'message': 'Share issuance deleted'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/admin/holdings/verify', methods=['POST'])
+def verify_admin_holdings():
+    try:
+        # Without IDs, every company whose holdings this instance has loaded
+        data = request.get_json(silent=True) or {}
+        company_ids = parse_id_list(data) if data.get('ids') is not None else None
+        report = holdings_store.verify(company_ids, repair=parse_bool_arg('repair', True))
+        inconsistent = {company_id: found for company_id, found in report.items() if found}
+        return jsonify({'verified': len(report), 'inconsistent': len(inconsistent), 'differences': inconsistent}), 200
+    except RowError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -0,0 +1,244 @@
+"""Durable job queue on SQLite.
+
+A job is a batch of tasks, one per item (e.g. one per shareholder of an email
+campaign). Tasks are claimed in batches under a lease, so a worker that dies
+mid-batch only delays its tasks until the lease runs out. Failed tasks are
+retried with exponential backoff until ``max_attempts``.
+
+Every task has an idempotency key, ``<job key>:<item>``, that is unique in
+the store and travels with the task to whatever performs it. Enqueueing a job
+with the idempotency key of an existing one returns that job instead of
+creating a second.
+
+The store is a single SQLite file (``JOB_DB_PATH``), so the queue works
+offline and in tests; on serverless hosts it lives as long as the instance's
+``/tmp``.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from clients import backoff_delay
+
+JOB_DB_PATH = os.environ.get('JOB_DB_PATH', '/tmp/kapitalized-jobs.sqlite3')
+
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 120))
+
+# First retry delay; doubles on every attempt up to the cap
+JOB_BACKOFF_SECONDS = float(os.environ.get('JOB_BACKOFF_SECONDS', 5))
+JOB_BACKOFF_CAP_SECONDS = float(os.environ.get('JOB_BACKOFF_CAP_SECONDS', 600))
+
+# Task states that still need work
+OPEN_STATES = ('pending', 'running')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    payload TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL REFERENCES jobs(id),
+    item TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_job ON tasks (job_id, status);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, available_at);
+"""
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobQueue:
+    """A SQLite-backed queue of jobs and their tasks."""
+
+    def __init__(self, path=None, max_attempts=None, lease_seconds=None):
+        self.path = path or JOB_DB_PATH
+        self.max_attempts = max_attempts or JOB_MAX_ATTEMPTS
+        self.lease_seconds = lease_seconds or JOB_LEASE_SECONDS
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        # IMMEDIATE takes the write lock up front, so two workers can't claim the same tasks
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def enqueue(self, kind, items, payload=None, idempotency_key=None):
+        """Create a job with one task per item; returns ``(job, created)``."""
+        items = list(dict.fromkeys(str(item) for item in items))
+        with self._transaction() as conn:
+            if idempotency_key:
+                row = conn.execute('SELECT * FROM jobs WHERE idempotency_key = ?', (idempotency_key,)).fetchone()
+                if row:
+                    return self._job(row), False
+
+            job_id = str(uuid.uuid4())
+            key = idempotency_key or job_id
+            now = _now_iso()
+            conn.execute(
+                'INSERT INTO jobs (id, kind, idempotency_key, payload, created_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, kind, idempotency_key, json.dumps(payload or {}), now)
+            )
+            conn.executemany(
+                'INSERT INTO tasks (job_id, item, idempotency_key, available_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                [(job_id, item, f'{key}:{item}', time.time(), now) for item in items]
+            )
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            return self._job(row), True
+
+    def claim(self, limit=50, kind=None):
+        """Lease up to ``limit`` ready tasks, oldest first.
+
+        Ready means pending and past its backoff, or running under an expired
+        lease. Each returned task carries its job's ``kind`` and ``payload``.
+        """
+        now = time.time()
+        lease_until = now + self.lease_seconds
+        with self._transaction() as conn:
+            rows = conn.execute(
+                '''
+                SELECT tasks.*, jobs.kind, jobs.payload FROM tasks JOIN jobs ON jobs.id = tasks.job_id
+                WHERE ((tasks.status = 'pending' AND tasks.available_at <= ?)
+                       OR (tasks.status = 'running' AND tasks.lease_until < ?))
+                  AND (? IS NULL OR jobs.kind = ?)
+                ORDER BY tasks.available_at, tasks.id
+                LIMIT ?
+                ''',
+                (now, now, kind, kind, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ? WHERE id = ?",
+                [(lease_until, _now_iso(), row['id']) for row in rows]
+            )
+        return [
+            {
+                'id': row['id'],
+                'job_id': row['job_id'],
+                'kind': row['kind'],
+                'payload': json.loads(row['payload']),
+                'item': row['item'],
+                'idempotency_key': row['idempotency_key'],
+                'attempts': row['attempts'] + 1,
+                'lease_until': lease_until,
+            }
+            for row in rows
+        ]
+
+    def complete(self, task, status='done', result=None, error=None):
+        """Close a task for good with a final ``status``.
+
+        Returns False, changing nothing, when the task's lease expired and
+        another worker has claimed it since.
+        """
+        with self._transaction() as conn:
+            updated = conn.execute(
+                'UPDATE tasks SET status = ?, lease_until = NULL, result = ?, error = ?, updated_at = ? WHERE id = ? AND lease_until = ?',
+                (status, json.dumps(result) if result is not None else None, error, _now_iso(), task['id'], task['lease_until'])
+            )
+            return updated.rowcount == 1
+
+    def retry(self, task, error):
+        """Schedule a failed task again, or fail it once out of attempts."""
+        if task['attempts'] >= self.max_attempts:
+            self.complete(task, 'failed', error=error)
+            return False
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = 'pending', lease_until = NULL, available_at = ?, error = ?, updated_at = ? WHERE id = ? AND lease_until = ?",
+                (time.time() + backoff_delay(task['attempts'], JOB_BACKOFF_SECONDS, JOB_BACKOFF_CAP_SECONDS), error, _now_iso(), task['id'], task['lease_until'])
+            )
+        return True
+
+    def has_ready(self, kind=None):
+        now = time.time()
+        row = self._connection().execute(
+            '''
+            SELECT 1 FROM tasks JOIN jobs ON jobs.id = tasks.job_id
+            WHERE ((tasks.status = 'pending' AND tasks.available_at <= ?)
+                   OR (tasks.status = 'running' AND tasks.lease_until < ?))
+              AND (? IS NULL OR jobs.kind = ?)
+            LIMIT 1
+            ''',
+            (now, now, kind, kind)
+        ).fetchone()
+        return row is not None
+
+    def _job(self, row):
+        return {
+            'id': row['id'],
+            'kind': row['kind'],
+            'idempotency_key': row['idempotency_key'],
+            'payload': json.loads(row['payload']),
+            'created_at': row['created_at'],
+        }
+
+    def status(self, job_id, include_tasks=False):
+        """Progress of a job, or None when it doesn't exist."""
+        conn = self._connection()
+        row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = self._job(row)
+
+        counts = {
+            status: count
+            for status, count in conn.execute('SELECT status, COUNT(*) FROM tasks WHERE job_id = ? GROUP BY status', (job_id,))
+        }
+        total = sum(counts.values())
+        remaining = sum(counts.get(state, 0) for state in OPEN_STATES)
+        job.update(
+            status='completed' if remaining == 0 else ('queued' if remaining == total and not counts.get('running') else 'running'),
+            total=total,
+            finished=total - remaining,
+            progress=round((total - remaining) / total, 4) if total else 1.0,
+            counts=counts,
+        )
+        if include_tasks:
+            job['tasks'] = [
+                {
+                    'item': task['item'],
+                    'status': task['status'],
+                    'attempts': task['attempts'],
+                    'result': json.loads(task['result']) if task['result'] else None,
+                    'error': task['error'],
+                    'updated_at': task['updated_at'],
+                }
+                for task in conn.execute('SELECT * FROM tasks WHERE job_id = ? ORDER BY id', (job_id,))
+            ]
+        return job
@@ -0,0 +1,118 @@
+"""Point-in-time cap tables from a date-ordered issuance ledger.
+
+``CapTableLedger`` sorts a company's issuances by ``issue_date`` once and
+records a checkpoint of the running totals (per shareholder, per share class
+and overall) every ``interval`` issuances. The cap table as of a date is then
+the last checkpoint before that date, found by binary search, plus the few
+issuances between the checkpoint and the date, rather than a filtered scan of
+every issuance.
+
+``as_of`` is inclusive and dates compare on their ``YYYY-MM-DD`` part.
+Issuances without an ``issue_date`` count as issued before any date.
+Snapshots carry totals only, without the issuance rows.
+"""
+import bisect
+import math
+import os
+from datetime import date
+
+from cap_table import CapTableBuilder
+
+LEDGER_CHECKPOINT_INTERVAL = int(os.environ.get('LEDGER_CHECKPOINT_INTERVAL', 256))
+
+# Large companies get checkpoints further apart, so memory stays bounded
+LEDGER_MAX_CHECKPOINTS = int(os.environ.get('LEDGER_MAX_CHECKPOINTS', 64))
+
+
+def parse_as_of(value):
+    """``value`` as a ``YYYY-MM-DD`` string; raises ValueError if it isn't a date."""
+    return date.fromisoformat(str(value)[:10]).isoformat()
+
+
+def _date_key(issuance):
+    issue_date = issuance.get('issue_date')
+    return '' if issue_date is None else str(issue_date)[:10]
+
+
+class CapTableLedger:
+    """A company's issuances in date order, with checkpointed running totals."""
+
+    def __init__(self, company_id, issuances, share_classes=None, shareholders=None, interval=None):
+        self.company_id = company_id
+        self.share_classes = list(share_classes or [])
+        self.shareholder_lookup = shareholders or {}
+
+        # Stable sort keeps same-day issuances in their original order
+        self.issuances = sorted(issuances, key=_date_key)
+        self.dates = [_date_key(issuance) for issuance in self.issuances]
+        self.interval = interval or max(LEDGER_CHECKPOINT_INTERVAL, math.ceil(len(self.issuances) / LEDGER_MAX_CHECKPOINTS))
+
+        builder = self._builder()
+        self.checkpoints = [self._checkpoint(builder)]
+        for position, issuance in enumerate(self.issuances, 1):
+            builder.add(issuance)
+            if position % self.interval == 0:
+                self.checkpoints.append(self._checkpoint(builder))
+
+        self.details = {
+            shareholder_id: {'name': entry['name'], 'email': entry['email']}
+            for shareholder_id, entry in builder.shareholders.items()
+        }
+
+    def __len__(self):
+        return len(self.issuances)
+
+    def _builder(self, price=None):
+        return CapTableBuilder(self.company_id, self.share_classes, self.shareholder_lookup, keep_issuances=False, price=price)
+
+    @staticmethod
+    def _checkpoint(builder):
+        return {
+            'total_shares': builder.total_shares,
+            'outstanding_shares': builder.outstanding_shares,
+            'total_invested': builder.total_invested,
+            'latest_date': builder.latest_date,
+            'latest_price': builder.latest_price,
+            'shareholders': {
+                shareholder_id: (entry['total_shares'], entry['outstanding_shares'], entry['invested'])
+                for shareholder_id, entry in builder.shareholders.items()
+            },
+            'class_totals': {class_id: tuple(totals) for class_id, totals in builder.class_totals.items()},
+        }
+
+    def _restore(self, checkpoint, price=None):
+        builder = self._builder(price)
+        builder.total_shares = checkpoint['total_shares']
+        builder.outstanding_shares = checkpoint['outstanding_shares']
+        builder.total_invested = checkpoint['total_invested']
+        builder.latest_date = checkpoint['latest_date']
+        builder.latest_price = checkpoint['latest_price']
+        builder.class_totals = {class_id: list(totals) for class_id, totals in checkpoint['class_totals'].items()}
+        for shareholder_id, (shares, outstanding, invested) in checkpoint['shareholders'].items():
+            entry = builder._new_entry(shareholder_id, self.details.get(shareholder_id))
+            entry['total_shares'] = shares
+            entry['outstanding_shares'] = outstanding
+            entry['invested'] = invested
+        return builder
+
+    def position(self, as_of=None):
+        """How many issuances were issued on or before ``as_of``."""
+        if as_of is None:
+            return len(self.issuances)
+        return bisect.bisect_right(self.dates, as_of)
+
+    def snapshot(self, as_of=None, price=None):
+        """The cap table as of ``as_of`` (a ``YYYY-MM-DD`` string), or today's if None.
+
+        ``price`` values holdings as in ``build_cap_table``; by default the
+        price of the latest issuance up to ``as_of`` is used.
+        """
+        position = self.position(as_of)
+        checkpoint = position // self.interval
+        builder = self._restore(self.checkpoints[checkpoint], price)
+        builder.add_many(self.issuances[checkpoint * self.interval:position])
+
+        cap_table = builder.build(backend='ledger')
+        cap_table['as_of'] = as_of
+        cap_table['issuance_count'] = position
+        return cap_table
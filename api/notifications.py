@@ -0,0 +1,181 @@
+"""Batched, concurrent shareholder notifications.
+
+``POST /api/notify-shareholders`` enqueues a job with one task per shareholder
+on the durable queue in ``jobs`` and drains it here in batches, for up to
+``NOTIFY_DRAIN_SECONDS``, before it responds.
+Each batch loads its recipients and only their own issuances with one paged
+read and groups them in memory, instead of one issuance query per
+shareholder, and sends from a bounded thread pool behind a shared rate
+limiter that keeps the pool under the email provider's request rate.
+
+Failed sends are retried with backoff by the queue. Every send carries the
+task's idempotency key, so a retry after a lost response doesn't email the
+shareholder twice.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from repository import iter_keyset
+
+NOTIFY_JOB_KIND = 'shareholder-email'
+
+NOTIFY_MAX_WORKERS = int(os.environ.get('NOTIFY_MAX_WORKERS', 8))
+
+# Sends per second across all workers; 0 disables the limit
+NOTIFY_RATE_LIMIT = float(os.environ.get('NOTIFY_RATE_LIMIT', 10))
+
+# Tasks claimed per batch; also bounds the ID list in each recipients query
+NOTIFY_BATCH_SIZE = int(os.environ.get('NOTIFY_BATCH_SIZE', 50))
+
+NOTIFY_PAGE_SIZE = int(os.environ.get('NOTIFY_PAGE_SIZE', 1000))
+
+# How long a request spends draining the queue before it responds; kept under
+# the serverless function timeout, since nothing runs after the response
+NOTIFY_DRAIN_SECONDS = float(os.environ.get('NOTIFY_DRAIN_SECONDS', 8))
+
+
+class RateLimiter:
+    """Space calls at least ``1 / rate`` seconds apart across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate and rate > 0 else 0
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def load_recipients(db, company_id, shareholder_ids, page_size=None):
+    """The requested shareholders of ``company_id`` and their issuances.
+
+    Returns ``(shareholders, issuances_by_shareholder)``. Shareholders are
+    restricted to the company, so IDs from other companies are never
+    notified. Issuances carry a ``share_class_name`` and are sorted by date.
+    """
+    page_size = page_size or NOTIFY_PAGE_SIZE
+    shareholder_ids = list(dict.fromkeys(shareholder_ids))
+    shareholders = {
+        row['id']: row
+        for row in db.select('shareholders', filters={'company_id': company_id, 'id': shareholder_ids}).data
+    }
+    share_classes = {
+        sc['id']: sc
+        for sc in db.select('share_classes', 'id, name', filters={'company_id': company_id}).data
+    }
+
+    issuances_by_shareholder = {shareholder_id: [] for shareholder_id in shareholders}
+    if shareholders:
+        # Only these shareholders' own rows, through the (shareholder_id, issue_date)
+        # index; the shareholders were already restricted to the company above
+        issuances = iter_keyset(
+            db,
+            'share_issuances',
+            filters={'shareholder_id': list(shareholders)},
+            page_size=page_size,
+            order=[('issue_date', False), ('id', False)]
+        )
+        for issuance in issuances:
+            share_class_name = share_classes.get(issuance.get('share_class_id'), {}).get('name', 'Unknown')
+            issuances_by_shareholder[issuance['shareholder_id']].append({**issuance, 'share_class_name': share_class_name})
+    return shareholders, issuances_by_shareholder
+
+
+def deliver_all(deliveries, send, max_workers=None, rate=None):
+    """Call ``send(*args)`` for each args tuple on a bounded, rate-limited pool.
+
+    Returns the outcomes in order; an exception becomes a failed outcome.
+    """
+    limiter = RateLimiter(NOTIFY_RATE_LIMIT if rate is None else rate)
+
+    def deliver(args):
+        limiter.wait()
+        try:
+            return send(*args)
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    if not deliveries:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers or NOTIFY_MAX_WORKERS, len(deliveries))) as pool:
+        return list(pool.map(deliver, deliveries))
+
+
+def enqueue_notifications(queue, company, shareholder_ids, idempotency_key=None):
+    """Queue one email task per shareholder; returns ``(job, created)``."""
+    return queue.enqueue(
+        NOTIFY_JOB_KIND,
+        shareholder_ids,
+        payload={'company_id': company['id'], 'company_name': company.get('name') or 'Unknown Company'},
+        idempotency_key=idempotency_key
+    )
+
+
+def process_batch(queue, db, send, batch_size=None):
+    """Claim one batch of email tasks and send them.
+
+    ``send(payload, shareholder, issuances, idempotency_key)`` returns
+    ``{"success": bool, "message_id"/"error": ...}`` and may set
+    ``"retryable": False`` for errors a retry can't fix. Tasks whose
+    recipients can't be loaded or sent are scheduled for a retry. Returns the
+    number of tasks claimed.
+    """
+    tasks = queue.claim(batch_size or NOTIFY_BATCH_SIZE, kind=NOTIFY_JOB_KIND)
+
+    by_company = {}
+    for task in tasks:
+        by_company.setdefault(task['payload']['company_id'], []).append(task)
+
+    deliveries = []
+    for company_id, company_tasks in by_company.items():
+        try:
+            shareholders, issuances_by_shareholder = load_recipients(db, company_id, [task['item'] for task in company_tasks])
+        except Exception as e:
+            # Hand the tasks back for a retry rather than leaving them leased until the lease runs out
+            for task in company_tasks:
+                queue.retry(task, f'Could not load recipients: {e}')
+            continue
+        for task in company_tasks:
+            shareholder = shareholders.get(task['item'])
+            if shareholder is None:
+                queue.complete(task, 'not_found', error='Shareholder not found for this company')
+            elif not shareholder.get('email'):
+                queue.complete(task, 'skipped', error='No email address')
+            else:
+                deliveries.append((task, shareholder, issuances_by_shareholder[shareholder['id']]))
+
+    try:
+        outcomes = deliver_all(
+            [(task['payload'], shareholder, issuances, task['idempotency_key']) for task, shareholder, issuances in deliveries],
+            send
+        )
+    except Exception as e:
+        outcomes = [{'success': False, 'error': str(e)}] * len(deliveries)
+    for (task, _, _), outcome in zip(deliveries, outcomes):
+        if outcome.get('success'):
+            queue.complete(task, 'sent', result={'message_id': outcome.get('message_id')})
+        elif outcome.get('retryable', True):
+            queue.retry(task, outcome.get('error'))
+        else:
+            queue.complete(task, 'failed', error=outcome.get('error'))
+    return len(tasks)
+
+
+def drain(queue, db, send, batch_size=None, deadline=None):
+    """Process batches until no task is ready or the monotonic ``deadline`` passes."""
+    processed = 0
+    while deadline is None or time.monotonic() < deadline:
+        claimed = process_batch(queue, db, send, batch_size)
+        if not claimed:
+            break
+        processed += claimed
+    return processed
@@ -1,140 +1,102 @@
 # api/notify-shareholders.py
 import os
+import sys
 import json
+import time
 from datetime import datetime
+from functools import partial
 from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
 
-# Import required libraries
-try:
-    from supabase import create_client, Client
-    import sib_api_v3_sdk
-    from sib_api_v3_sdk.rest import ApiException
-    IMPORTS_AVAILABLE = True
-except ImportError as e:
-    IMPORTS_AVAILABLE = False
-    IMPORT_ERROR = str(e)
-
-# Initialize environment variables
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-BREVO_API_KEY = os.environ.get("BREVO_API_KEY")
+# Helper modules live next to this file; make them importable both locally and on Vercel
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Initialize Supabase client
-supabase = None
-if IMPORTS_AVAILABLE and SUPABASE_URL and SUPABASE_KEY:
-    try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    except Exception as e:
-        print(f"Failed to initialize Supabase: {e}")
+from clients import (
+    REQUEST_TIMEOUT, brevo_transactional_api, load_env, package_available, supabase_client,
+    supabase_configured, with_retries
+)
+load_env()
 
-# Initialize Brevo API
-api_instance = None
-if IMPORTS_AVAILABLE and BREVO_API_KEY:
-    try:
-        configuration = sib_api_v3_sdk.Configuration()
-        configuration.api_key['api-key'] = BREVO_API_KEY
-        api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
-    except Exception as e:
-        print(f"Failed to initialize Brevo: {e}")
+from email_template import render_shareholder_email
+from jobs import JobQueue
+from notifications import NOTIFY_DRAIN_SECONDS, NOTIFY_MAX_WORKERS, drain, enqueue_notifications
+from repository import create_repository
 
-def load_email_template():
-    """Load the HTML email template with fallback"""
-    return '''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-            .container { max-width: 600px; margin: 0 auto; padding: 20px; }
-            .header { background-color: #1a73e8; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }
-            .content { padding: 20px; background-color: #f9f9f9; }
-            .issuance { background-color: white; margin: 10px 0; padding: 15px; border-left: 3px solid #34a853; border-radius: 4px; }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h2>Kapitalized Equity Management</h2>
-            </div>
-            <div class="content">
-                <p>Dear {{shareholder_name}},</p>
-                <p>This email provides a summary of your current shareholdings in <strong>{{company_name}}</strong>.</p>
-                
-                <h3>Your Share Issuances:</h3>
-                {{issuances_list_html}}
+# The SDKs are only imported, and their clients built, when a request first needs them
+MISSING_PACKAGES = [name for name in ('supabase', 'sib_api_v3_sdk') if not package_available(name)]
+IMPORTS_AVAILABLE = not MISSING_PACKAGES
+IMPORT_ERROR = f"No module named {', '.join(MISSING_PACKAGES)}" if MISSING_PACKAGES else None
 
-                <p>If you have any questions regarding your shareholdings, please contact us at {{contact_email}}.</p>
-                <p>Sincerely,<br>The Kapitalized Team</p>
-            </div>
-            <div style="text-align: center; color: #777; margin-top: 20px;">
-                <p>&copy; {{current_year}} Kapitalized. All rights reserved.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    '''
+SUPABASE_KEY_ENV = "SUPABASE_SERVICE_ROLE_KEY"
 
-def format_issuances_html(issuances):
-    """Format issuances data into HTML for the email template"""
-    if not issuances:
-        return "<p>No share issuances found.</p>"
-    
-    html_parts = []
-    for issuance in issuances:
-        total_value = issuance.get('shares', 0) * issuance.get('price_per_share', 0)
-        html_parts.append(f'''
-        <div class="issuance">
-            <strong>Share Class:</strong> {issuance.get('share_class_name', 'Unknown')}<br>
-            <strong>Shares:</strong> {issuance.get('shares', 0):,}<br>
-            <strong>Price per Share:</strong> ${issuance.get('price_per_share', 0):.2f}<br>
-            <strong>Total Value:</strong> ${total_value:,.2f}<br>
-            <strong>Issue Date:</strong> {issuance.get('issue_date', 'Unknown')}<br>
-            <strong>Round:</strong> {issuance.get('round', 'N/A')} ({issuance.get('round_description', 'N/A')})
-        </div>
-        ''')
-    
-    return ''.join(html_parts)
+db = create_repository(
+    client_factory=partial(supabase_client, SUPABASE_KEY_ENV) if supabase_configured(SUPABASE_KEY_ENV) else None
+)
 
-def send_shareholder_email(shareholder_email, shareholder_name, company_name, issuances, contact_email="hello@kapitalized.com"):
+def send_shareholder_email(shareholder_email, shareholder_name, company_name, issuances, contact_email="hello@kapitalized.com", idempotency_key=None):
     """Send email to individual shareholder"""
+    # One pooled connection per notification worker
+    api_instance = brevo_transactional_api(pool_size=NOTIFY_MAX_WORKERS)
     if not api_instance:
-        return {"success": False, "error": "Email service not configured"}
+        return {"success": False, "error": "Email service not configured", "retryable": False}
         
-    try:
-        # Load and customize the email template
-        template = load_email_template()
-        issuances_html = format_issuances_html(issuances)
+    import sib_api_v3_sdk
+    from sib_api_v3_sdk.rest import ApiException
         
-        # Replace template placeholders
-        email_content = template.replace('{{shareholder_name}}', shareholder_name)
-        email_content = email_content.replace('{{company_name}}', company_name)
-        email_content = email_content.replace('{{issuances_list_html}}', issuances_html)
-        email_content = email_content.replace('{{contact_email}}', contact_email)
-        email_content = email_content.replace('{{current_year}}', str(datetime.now().year))
+    try:
+        # Render the pre-parsed template; values are HTML-escaped
+        email_content = render_shareholder_email(shareholder_name, company_name, issuances, contact_email)
         
         # Create the email
         send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
             to=[sib_api_v3_sdk.SendSmtpEmailTo(email=shareholder_email, name=shareholder_name)],
             sender=sib_api_v3_sdk.SendSmtpEmailSender(email=contact_email, name="Kapitalized Team"),
             subject=f"Your Shareholding Summary - {company_name}",
-            html_content=email_content
+            html_content=email_content,
+            # Brevo drops repeats of a key, so a retried task can't send twice
+            headers={"idempotencyKey": idempotency_key} if idempotency_key else None
         )
         
-        # Send the email
-        api_response = api_instance.send_transac_email(send_smtp_email)
+        # Send the email; the idempotency key makes quick retries of transient failures safe
+        api_response = with_retries(lambda: api_instance.send_transac_email(send_smtp_email, _request_timeout=REQUEST_TIMEOUT))
         return {"success": True, "message_id": api_response.message_id}
         
     except ApiException as e:
-        return {"success": False, "error": f"Brevo API error: {str(e)}"}
+        # Client errors other than rate limiting fail the same way on every retry
+        retryable = e.status is None or e.status == 429 or e.status >= 500
+        return {"success": False, "error": f"Brevo API error: {str(e)}", "retryable": retryable}
     except Exception as e:
         return {"success": False, "error": f"Email error: {str(e)}"}
 
+def send_notification(payload, shareholder, issuances, idempotency_key):
+    """Send one queued notification task"""
+    return send_shareholder_email(
+        shareholder_email=shareholder['email'],
+        shareholder_name=shareholder.get('name') or 'Unknown Shareholder',
+        company_name=payload['company_name'],
+        issuances=issuances,
+        contact_email="hello@kapitalized.com",  # Use verified email
+        idempotency_key=idempotency_key
+    )
+
+# Notification jobs are queued here and drained by the requests themselves
+queue = JobQueue()
+
+def drain_for_request():
+    """Send queued notifications until the queue is empty or the time budget runs out.
+
+    Serverless hosts freeze the instance once the response is sent, so a
+    background thread can't be relied on to finish; whatever is left is
+    picked up by the next request (e.g. a status poll) or the standalone worker.
+    """
+    return drain(queue, db, send_notification, deadline=time.monotonic() + NOTIFY_DRAIN_SECONDS)
+
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
         self.end_headers()
 
@@ -171,7 +133,7 @@ class handler(BaseHTTPRequestHandler):
                 self.wfile.write(json.dumps(error_response).encode())
                 return
             
-            if not supabase:
+            if not db:
                 self.send_response(500)
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.send_header('Content-Type', 'application/json')
@@ -182,8 +144,8 @@ class handler(BaseHTTPRequestHandler):
                 return
             
             # Get company details
-            company_response = supabase.table('companies').select('*').eq('id', company_id).single().execute()
-            if not company_response.data:
+            company = db.get('companies', company_id)
+            if not company:
                 self.send_response(404)
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.send_header('Content-Type', 'application/json')
@@ -193,71 +155,27 @@ class handler(BaseHTTPRequestHandler):
                 self.wfile.write(json.dumps(error_response).encode())
                 return
             
-            company = company_response.data
-            company_name = company.get('name', 'Unknown Company')
-            
-            # Get shareholders
-            shareholders_response = supabase.table('shareholders').select('*').in_('id', shareholder_ids).execute()
-            shareholders = shareholders_response.data
-            
-            # Get share classes for this company
-            share_classes_response = supabase.table('share_classes').select('*').eq('company_id', company_id).execute()
-            share_classes = {sc['id']: sc for sc in share_classes_response.data}
-            
-            sent_count = 0
-            failed_emails = []
-            
-            # Send emails to each selected shareholder
-            for shareholder in shareholders:
-                shareholder_id = shareholder['id']
-                shareholder_name = shareholder.get('name', 'Unknown Shareholder')
-                shareholder_email = shareholder.get('email')
-                
-                if not shareholder_email:
-                    failed_emails.append(f"{shareholder_name} (no email address)")
-                    continue
-                
-                # Get share issuances for this shareholder
-                issuances_response = supabase.table('share_issuances').select('*').eq('company_id', company_id).eq('shareholder_id', shareholder_id).execute()
-                
-                # Enrich issuances with share class names
-                enriched_issuances = []
-                for issuance in issuances_response.data:
-                    share_class_id = issuance.get('share_class_id')
-                    share_class_name = share_classes.get(share_class_id, {}).get('name', 'Unknown')
-                    
-                    enriched_issuance = {**issuance, 'share_class_name': share_class_name}
-                    enriched_issuances.append(enriched_issuance)
-                
-                # Send email
-                result = send_shareholder_email(
-                    shareholder_email=shareholder_email,
-                    shareholder_name=shareholder_name,
-                    company_name=company_name,
-                    issuances=enriched_issuances,
-                    contact_email="hello@kapitalized.com"  # Use verified email
-                )
-                
-                if result["success"]:
-                    sent_count += 1
-                else:
-                    failed_emails.append(f"{shareholder_name} ({result['error']})")
-            
-            # Send success response
-            self.send_response(200)
+            idempotency_key = request_data.get('idempotency_key') or self.headers.get('Idempotency-Key')
+            job, created = enqueue_notifications(queue, company, shareholder_ids, idempotency_key)
+            try:
+                drain_for_request()
+                status = queue.status(job['id'])
+            except Exception as e:
+                # The job is queued either way; an error response would only get it enqueued again
+                status = {**job, "status": "queued", "drain_error": str(e)}
+            
+            # Done once every task has settled; otherwise accepted, and the rest is sent as the status endpoint is polled
+            self.send_response(200 if status['status'] == 'completed' else 202)
             self.send_header('Access-Control-Allow-Origin', '*')
             self.send_header('Content-Type', 'application/json')
             self.end_headers()
             
-            response_message = f"Successfully sent {sent_count} email(s)"
-            if failed_emails:
-                response_message += f". Failed to send to: {', '.join(failed_emails)}"
-            
             response_data = {
-                "message": response_message,
-                "sent_count": sent_count,
-                "failed_count": len(failed_emails),
-                "failed_emails": failed_emails
+                "message": "Notification job queued" if created else "Notification job already queued",
+                "job_id": job['id'],
+                "created": created,
+                "status_url": f"/api/notify-shareholders?job_id={job['id']}",
+                **status
             }
             
             self.wfile.write(json.dumps(response_data).encode())
@@ -276,15 +194,41 @@ class handler(BaseHTTPRequestHandler):
             self.wfile.write(json.dumps(error_response).encode())
 
     def do_GET(self):
-        """Handle GET requests - return method not allowed"""
-        self.send_response(405)
+        """Report the progress of a notification job"""
+        job_id = parse_qs(urlparse(self.path).query).get('job_id', [None])[0]
+        # Polling sends what's left: retries that came due, or tasks beyond the POST's time budget
+        if job_id and queue.has_ready():
+            try:
+                drain_for_request()
+            except Exception:
+                # Still report the progress; the next poll picks the tasks up again
+                pass
+        status = queue.status(job_id, include_tasks=True) if job_id else None
+        
+        if status is None:
+            self.send_response(400 if not job_id else 404)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            
+            response_data = {
+                "error": "job_id is required" if not job_id else "Job not found",
+                "endpoint": "Email notification API"
+            }
+            self.wfile.write(json.dumps(response_data).encode())
+            return
+        
+        self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Content-Type', 'application/json')
         self.end_headers()
         
-        response_data = {
-            "error": "Method not allowed. Use POST.",
-            "endpoint": "Email notification API"
-        }
-        
-        self.wfile.write(json.dumps(response_data).encode())
+        self.wfile.write(json.dumps(status).encode())
+
+# Standalone worker: python api/notify-shareholders.py
+if __name__ == '__main__':
+    poll_interval = float(os.environ.get('NOTIFY_POLL_SECONDS', 5))
+    print(f"Draining notification queue at {queue.path}")
+    while True:
+        drain(queue, db, send_notification)
+        time.sleep(poll_interval)
@@ -0,0 +1,231 @@
+"""Keyset pagination, column selection, sorting and filtering for list routes.
+
+List routes read a page at a time with these query parameters:
+
+* ``limit``: rows per page (default ``LIST_PAGE_SIZE``, at most ``MAX_PAGE_SIZE``).
+* ``cursor``: the ``next_cursor`` of the previous page.
+* ``fields``: comma-separated columns to return.
+* ``order``: comma-separated columns, ``-name`` or ``name.desc`` for
+  descending. ``id`` is always appended as a tie-breaker so the keyset is
+  unique.
+* ``<column>=value`` for equality, or ``<column>__<op>=value`` with ``op``
+  one of ``neq``, ``gt``, ``gte``, ``lt``, ``lte`` and ``in`` (comma-separated).
+  Parameters that don't name a column are ignored.
+* ``<column>_from`` / ``<column>_to``: inclusive ISO date range on a
+  resource's ``date_range`` column, e.g. ``issue_date_from=2024-01-01``.
+* ``count``: ``estimated`` (default) or ``exact`` total on the first page,
+  ``none`` to skip it.
+
+Cursors are opaque: the order columns and the last row's values for them,
+base64-encoded. A cursor is only valid with the ``order`` it was issued for.
+"""
+import base64
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import date
+
+from repository import normalize_filters
+
+LIST_PAGE_SIZE = int(os.environ.get('LIST_PAGE_SIZE', 100))
+
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 1000))
+
+FILTER_OPERATORS = ('neq', 'gt', 'gte', 'lt', 'lte', 'in')
+
+# Query parameters that are never column filters
+RESERVED_ARGS = ('limit', 'cursor', 'fields', 'order', 'count', 'envelope')
+
+COUNT_MODES = ('estimated', 'exact', 'none')
+
+
+class ListQueryError(ValueError):
+    """Raised for list parameters that can't be applied."""
+
+
+@dataclass
+class ListResource:
+    """What a list route lets callers select, sort and filter on."""
+
+    table: str
+    columns: tuple
+    default_order: tuple = (('created_at', True),)
+    # Columns callers may filter on; defaults to every column
+    filter_columns: tuple = None
+    # Date column filterable with <column>_from / <column>_to
+    date_range: str = None
+
+
+@dataclass
+class ListQuery:
+    fields: list
+    order: list
+    filters: list = field(default_factory=list)
+    limit: int = LIST_PAGE_SIZE
+    after: tuple = None
+    count: str = 'estimated'
+
+
+@dataclass
+class Page:
+    rows: list
+    next_cursor: str = None
+    total: int = None
+
+
+def encode_cursor(order, values):
+    payload = json.dumps({'o': [[column, descending] for column, descending in order], 'v': list(values)}, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, order):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        cursor_order = [(column, bool(descending)) for column, descending in payload['o']]
+        values = tuple(payload['v'])
+    except (ValueError, TypeError, KeyError):
+        raise ListQueryError('cursor is invalid')
+    if cursor_order != list(order) or len(values) != len(order):
+        raise ListQueryError('cursor does not match the requested order')
+    return values
+
+
+def _parse_order(value, resource):
+    if not value:
+        order = list(resource.default_order)
+    else:
+        order = []
+        for term in value.split(','):
+            term = term.strip()
+            descending = term.startswith('-') or term.endswith('.desc')
+            column = term.lstrip('-').rsplit('.', 1)[0] if term.endswith(('.asc', '.desc')) else term.lstrip('-')
+            if column not in resource.columns:
+                raise ListQueryError(f'Cannot order by {column}')
+            order.append((column, descending))
+    if 'id' not in [column for column, _ in order]:
+        order.append(('id', False))
+    return order
+
+
+def _parse_filters(args, resource):
+    allowed = resource.filter_columns or resource.columns
+    range_args = {}
+    if resource.date_range:
+        range_args = {f'{resource.date_range}_from': 'gte', f'{resource.date_range}_to': 'lte'}
+    filters = []
+    for key in args:
+        if key in RESERVED_ARGS:
+            continue
+        if key in range_args:
+            value = args.get(key)
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise ListQueryError(f'{key} must be an ISO date (YYYY-MM-DD)')
+            filters.append((resource.date_range, range_args[key], value))
+            continue
+        column, _, operator = key.partition('__')
+        operator = operator or 'eq'
+        if column not in resource.columns:
+            # Not a filter, e.g. a cache-busting ?_=<timestamp>
+            continue
+        if column not in allowed:
+            raise ListQueryError(f'Cannot filter on {column}')
+        if operator != 'eq' and operator not in FILTER_OPERATORS:
+            raise ListQueryError(f'Unknown filter operator {operator}')
+        value = args.get(key)
+        filters.append((column, operator, value.split(',') if operator == 'in' else value))
+    return filters
+
+
+def parse_list_args(args, resource):
+    """A ``ListQuery`` from request args; raises ``ListQueryError``."""
+    try:
+        limit = int(args.get('limit', LIST_PAGE_SIZE))
+    except ValueError:
+        raise ListQueryError('limit must be an integer')
+    if limit < 1:
+        raise ListQueryError('limit must be at least 1')
+
+    fields = None
+    if args.get('fields'):
+        fields = [column.strip() for column in args['fields'].split(',') if column.strip()]
+        unknown = [column for column in fields if column not in resource.columns]
+        if unknown:
+            raise ListQueryError(f"Unknown fields: {', '.join(unknown)}")
+
+    count = args.get('count', 'estimated')
+    if count not in COUNT_MODES:
+        raise ListQueryError(f"count must be one of: {', '.join(COUNT_MODES)}")
+
+    order = _parse_order(args.get('order'), resource)
+    return ListQuery(
+        fields=fields,
+        order=order,
+        filters=_parse_filters(args, resource),
+        limit=min(limit, MAX_PAGE_SIZE),
+        after=decode_cursor(args['cursor'], order) if args.get('cursor') else None,
+        count=count,
+    )
+
+
+def fetch_page(db, resource, query, filters=None):
+    """Read one page of ``resource``; ``filters`` are applied on top of the caller's."""
+    order_columns = [column for column, _ in query.order]
+    if query.fields is None:
+        columns = '*'
+    else:
+        columns = ', '.join(dict.fromkeys(query.fields + order_columns))
+
+    # One extra row tells us whether there is a next page without a second query
+    result = db.select(
+        resource.table,
+        columns,
+        filters=normalize_filters(filters) + query.filters,
+        order=query.order,
+        limit=query.limit + 1,
+        count=query.count if query.count != 'none' and query.after is None else None,
+        after=query.after,
+    )
+    rows = result.data
+    next_cursor = None
+    if len(rows) > query.limit:
+        rows = rows[:query.limit]
+        next_cursor = encode_cursor(query.order, [rows[-1].get(column) for column in order_columns])
+
+    extra = [column for column in order_columns if query.fields is not None and column not in query.fields]
+    for row in rows:
+        for column in extra:
+            row.pop(column, None)
+    return Page(rows=rows, next_cursor=next_cursor, total=result.count)
+
+
+COMPANIES = ListResource(
+    'companies',
+    ('id', 'name', 'description', 'user_id', 'company_id', 'created_at'),
+)
+
+SHAREHOLDERS = ListResource(
+    'shareholders',
+    ('id', 'company_id', 'name', 'email', 'type', 'created_at'),
+)
+
+SHARE_CLASSES = ListResource(
+    'share_classes',
+    ('id', 'company_id', 'name', 'priority', 'is_dilutive', 'created_at'),
+    default_order=(('priority', False),),
+)
+
+SHARE_ISSUANCES = ListResource(
+    'share_issuances',
+    (
+        'id', 'company_id', 'shareholder_id', 'share_class_id', 'shares', 'price_per_share',
+        'issue_date', 'round', 'round_description', 'payment_status', 'created_at',
+    ),
+    date_range='issue_date',
+)
+
+USER_PROFILES = ListResource(
+    'user_profiles',
+    ('id', 'full_name', 'dob', 'address', 'is_admin', 'created_at'),
+)
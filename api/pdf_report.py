@@ -0,0 +1,276 @@
+"""Streaming PDF company report.
+
+The report lists the cap table, the share classes, the shareholder details and
+the full issuance history of one company. It is produced by a small PDF 1.4
+writer that only needs the standard Type 1 fonts, so no rendering library has
+to be bundled with the function.
+
+Output is a generator of byte chunks, one per page: each page's content
+stream is written as soon as it is full, and the page tree, cross-reference
+table and trailer go out last. The cap table is aggregated with
+``CapTableBuilder`` without keeping issuance rows, and the issuance history
+is paged through in keyset order while it is being laid out, so memory grows
+with the number of shareholders and one page of text, never with the number
+of issuances.
+"""
+import os
+from datetime import datetime
+
+from cap_table import UNASSIGNED_CLASS, CapTableBuilder
+from repository import iter_keyset
+
+REPORT_PAGE_SIZE = int(os.environ.get('REPORT_PAGE_SIZE', 1000))
+
+# US Letter, in points
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 50
+FOOTER_HEIGHT = 20
+
+# Resource name -> base font; all are standard fonts every viewer ships
+FONTS = {
+    'F1': 'Helvetica',
+    'F2': 'Helvetica-Bold',
+    'F3': 'Courier',
+    'F4': 'Courier-Bold',
+}
+
+# Line style -> (font, size, leading)
+STYLES = {
+    'title': ('F2', 16, 24),
+    'heading': ('F2', 12, 20),
+    'text': ('F1', 9, 12),
+    'row': ('F3', 8, 10),
+    'header_row': ('F4', 8, 10),
+}
+
+# Courier is 0.6 em wide, so this many characters fit in a row at 8pt
+ROW_CHARS = int((PAGE_WIDTH - 2 * MARGIN) / (0.6 * 8))
+TEXT_CHARS = 110
+
+
+def _pdf_string(text):
+    """``text`` as a PDF literal string in WinAnsiEncoding."""
+    data = str(text).encode('cp1252', errors='replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _fit(text, width):
+    text = '' if text is None else str(text)
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+
+class PDFWriter:
+    """Write a PDF one page at a time.
+
+    Object numbers 1 and 2 are reserved for the catalog and the page tree;
+    the page tree can only be written once every page is known, so it goes
+    out last. Each method returns the bytes to send next.
+    """
+
+    CATALOG_ID = 1
+    PAGES_ID = 2
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.page_ids = []
+        self.font_ids = {}
+        self.next_id = 3
+
+    def _allocate(self):
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def _object(self, obj_id, body):
+        self.offsets[obj_id] = self.offset
+        data = b'%d 0 obj\n%s\nendobj\n' % (obj_id, body)
+        self.offset += len(data)
+        return data
+
+    def start(self):
+        # The binary comment line tells transfer tools the file isn't text
+        header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        self.offset = len(header)
+        parts = [header, self._object(self.CATALOG_ID, b'<< /Type /Catalog /Pages %d 0 R >>' % self.PAGES_ID)]
+        for name, base_font in FONTS.items():
+            font_id = self.font_ids[name] = self._allocate()
+            parts.append(self._object(
+                font_id,
+                b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % base_font.encode()
+            ))
+        return b''.join(parts)
+
+    def page(self, lines, footer=None):
+        """Write one page from ``(style, text)`` lines laid out top to bottom."""
+        ops = []
+        y = PAGE_HEIGHT - MARGIN
+        for style, text in lines:
+            font, size, leading = STYLES[style]
+            y -= leading
+            if text:
+                ops.append(b'BT /%s %d Tf %d %d Td %s Tj ET' % (font.encode(), size, MARGIN, y, _pdf_string(text)))
+        if footer:
+            ops.append(b'BT /F1 8 Tf %d %d Td %s Tj ET' % (MARGIN, MARGIN - FOOTER_HEIGHT, _pdf_string(footer)))
+        content = b'\n'.join(ops)
+
+        content_id = self._allocate()
+        page_id = self._allocate()
+        self.page_ids.append(page_id)
+        fonts = b' '.join(b'/%s %d 0 R' % (name.encode(), font_id) for name, font_id in self.font_ids.items())
+        return self._object(
+            content_id,
+            b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content)
+        ) + self._object(
+            page_id,
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources << /Font << %s >> >> /Contents %d 0 R >>'
+            % (self.PAGES_ID, PAGE_WIDTH, PAGE_HEIGHT, fonts, content_id)
+        )
+
+    def finish(self):
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        pages = self._object(self.PAGES_ID, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.page_ids)))
+
+        xref_offset = self.offset
+        entries = [b'0000000000 65535 f \n']
+        entries += [b'%010d 00000 n \n' % self.offsets[obj_id] for obj_id in range(1, self.next_id)]
+        xref = b'xref\n0 %d\n%s' % (self.next_id, b''.join(entries))
+        trailer = b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (self.next_id, self.CATALOG_ID, xref_offset)
+        return pages + xref + trailer
+
+
+def paginate(lines, footer=None):
+    """Lay ``(style, text)`` lines out on pages and yield the PDF in chunks."""
+    writer = PDFWriter()
+    yield writer.start()
+
+    available = PAGE_HEIGHT - 2 * MARGIN
+    page, used = [], 0
+    for style, text in lines:
+        leading = STYLES[style][2]
+        # Headings never end a page; they move to the next one with what follows
+        limit = available - (STYLES['row'][2] * 3 if style in ('title', 'heading') else 0)
+        if page and used + leading > limit:
+            yield writer.page(page, f'{footer} - page {len(writer.page_ids) + 1}' if footer else None)
+            page, used = [], 0
+        page.append((style, text))
+        used += leading
+
+    yield writer.page(page, f'{footer} - page {len(writer.page_ids) + 1}' if footer else None)
+    yield writer.finish()
+
+
+def _columns(values, widths):
+    """One fixed-width row; negative widths right-align the column."""
+    cells = []
+    for value, width in zip(values, widths):
+        text = _fit(value, abs(width))
+        cells.append(text.rjust(-width) if width < 0 else text.ljust(width))
+    return ' '.join(cells).rstrip()
+
+
+def _number(value, decimals=0):
+    if value is None:
+        return '-'
+    return f'{value:,.{decimals}f}'
+
+
+def _table(header, rows, widths):
+    if header:
+        yield 'header_row', _fit(_columns(header, widths), ROW_CHARS)
+    for row in rows:
+        yield 'row', _fit(_columns(row, widths), ROW_CHARS)
+
+
+def report_lines(db, company, page_size=None):
+    """Yield the ``(style, text)`` lines of the report for ``company``."""
+    page_size = page_size or REPORT_PAGE_SIZE
+    company_id = company['id']
+    share_classes = db.select('share_classes', filters={'company_id': company_id}, order=[('priority', False)]).data
+    shareholders = {
+        row['id']: row
+        for row in iter_keyset(db, 'shareholders', 'id, name, email, type', {'company_id': company_id}, page_size)
+    }
+
+    builder = CapTableBuilder(company_id, share_classes, shareholders, keep_issuances=False)
+    for issuance in iter_keyset(db, 'share_issuances', 'id, shareholder_id, share_class_id, shares, price_per_share, issue_date', {'company_id': company_id}, page_size):
+        builder.add(issuance)
+    cap_table = builder.build()
+
+    yield 'title', _fit(f'Company Profile: {company.get("name") or company_id}', 60)
+    if company.get('description'):
+        yield 'text', _fit(company['description'], TEXT_CHARS)
+    yield 'text', f'Generated {datetime.now().strftime("%Y-%m-%d %H:%M")}'
+
+    yield 'heading', 'Summary'
+    yield from _table(None, [
+        ['Fully diluted shares', _number(cap_table['fully_diluted_shares'])],
+        ['Outstanding shares', _number(cap_table['outstanding_shares'])],
+        ['Total invested', _number(cap_table['total_invested'], 2)],
+        ['Price per share', _number(cap_table['price_per_share'], 4)],
+        ['Valuation', _number(cap_table['valuation'], 2)],
+        ['Shareholders', _number(len(shareholders))],
+    ], [24, -24])
+
+    yield 'heading', 'Cap Table'
+    holders = sorted(cap_table['shareholders'].values(), key=lambda entry: -entry['total_shares'])
+    yield from _table(
+        ['Shareholder', 'Shares', 'Fully diluted', 'Outstanding', 'Invested'],
+        ([
+            entry['name'] or '-',
+            _number(entry['total_shares']),
+            f'{entry["fully_diluted_percentage"]:.2f}%',
+            f'{entry["ownership_percentage"]:.2f}%',
+            _number(entry['invested'], 2),
+        ] for entry in holders),
+        [34, -16, -13, -13, -20]
+    )
+
+    yield 'heading', 'Share Classes'
+    class_names = {sc['id']: sc.get('name') or sc['id'] for sc in share_classes}
+    yield from _table(
+        ['Class', 'Shares', 'Fully diluted', 'Invested', 'Basis'],
+        ([
+            class_names.get(class_id, 'Unassigned' if class_id == UNASSIGNED_CLASS else class_id),
+            _number(totals['total_shares']),
+            f'{totals["percentage"]:.2f}%',
+            _number(totals['invested'], 2),
+            'Fully diluted only' if totals['dilutive'] else 'Outstanding',
+        ] for class_id, totals in cap_table['by_share_class'].items()),
+        [30, -16, -13, -20, 18]
+    )
+
+    yield 'heading', 'Shareholder Details'
+    yield from _table(
+        ['Name', 'Email', 'Type'],
+        ([row.get('name'), row.get('email'), row.get('type') or '-'] for row in shareholders.values()),
+        [34, 44, 20]
+    )
+
+    yield 'heading', 'Issuance History'
+    history = iter_keyset(
+        db,
+        'share_issuances',
+        'id, shareholder_id, share_class_id, shares, price_per_share, issue_date, round',
+        {'company_id': company_id},
+        page_size,
+        order=[('issue_date', False), ('id', False)]
+    )
+    yield from _table(
+        ['Date', 'Shareholder', 'Class', 'Shares', 'Price', 'Round'],
+        ([
+            str(issuance.get('issue_date') or '-')[:10],
+            (shareholders.get(issuance.get('shareholder_id')) or {}).get('name') or '-',
+            class_names.get(issuance.get('share_class_id'), '-'),
+            _number(issuance.get('shares')),
+            _number(issuance.get('price_per_share'), 4),
+            issuance.get('round') or '-',
+        ] for issuance in history),
+        [10, 26, 16, -14, -12, 20]
+    )
+
+
+def iter_company_report(db, company, page_size=None):
+    """Yield the PDF report for ``company`` (a ``companies`` row) in chunks."""
+    return paginate(report_lines(db, company, page_size), footer=_fit(company.get('name') or company['id'], 60))
@@ -0,0 +1,457 @@
+"""Data-access layer for the API functions.
+
+Routes talk to a ``Repository`` instead of the Supabase client so the storage
+behind them can be swapped without touching route code. Two backends ship:
+
+* ``SupabaseRepository`` wraps the PostgREST query builder (the default).
+* ``MemoryRepository`` keeps every table in process memory. It needs no
+  network or credentials, which makes it the backend for offline profiling,
+  benchmarks and reproducible load tests.
+
+``DATA_BACKEND`` (``supabase`` or ``memory``) selects the backend;
+``MEMORY_DATA_PATH`` optionally seeds the memory store from a JSON file of
+``{table: [rows]}``.
+
+Filters are either a dict (equality, or ``in`` for list values) or an
+iterable of ``(column, operator, value)`` tuples with operators ``eq``,
+``neq``, ``in``, ``gt``, ``gte``, ``lt`` and ``lte``.
+
+Cascading deletes (``delete_companies``, ``delete_shareholders``) remove a
+set of rows with everything that references them as one atomic operation:
+a Postgres function called over RPC on Supabase (see
+``supabase/migrations``), a single locked pass in memory.
+
+Keyset pagination passes ``after``: the values of the ``order`` columns for
+the last row already seen. Only rows strictly after it in that order are
+returned, so the ordering should end with a unique column such as ``id``.
+"""
+import json
+import os
+import re
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+from clients import with_retries
+
+TABLES = ('companies', 'shareholders', 'share_classes', 'share_issuances', 'user_profiles')
+
+# Foreign-key column used to embed a related row, e.g. select('*, shareholders(name)')
+EMBED_FOREIGN_KEYS = {
+    'companies': 'company_id',
+    'shareholders': 'shareholder_id',
+    'share_classes': 'share_class_id',
+}
+
+OPERATORS = ('eq', 'neq', 'in', 'gt', 'gte', 'lt', 'lte')
+
+
+@dataclass
+class QueryResult:
+    data: list
+    count: int = None
+
+
+def normalize_filters(filters):
+    """Turn a filters dict or tuple list into ``(column, operator, value)`` triples."""
+    if not filters:
+        return []
+    if isinstance(filters, dict):
+        return [
+            (column, 'in' if isinstance(value, (list, tuple, set)) else 'eq', value)
+            for column, value in filters.items()
+        ]
+    normalized = []
+    for column, operator, value in filters:
+        if operator not in OPERATORS:
+            raise ValueError(f'Unsupported filter operator: {operator}')
+        normalized.append((column, operator, value))
+    return normalized
+
+
+class Repository:
+    """Interface shared by the storage backends."""
+
+    backend = None
+
+    def select(self, table, columns='*', filters=None, order=None, limit=None, count=None, after=None):
+        """Rows of ``table`` matching ``filters``.
+
+        ``order`` is a list of ``(column, descending)`` pairs and ``after`` an
+        optional keyset position in that order. ``count`` asks for the total
+        number of matching rows (``'exact'`` or ``'estimated'``) alongside the
+        possibly limited data.
+        """
+        raise NotImplementedError
+
+    def insert(self, table, rows):
+        raise NotImplementedError
+
+    def update(self, table, values, filters):
+        raise NotImplementedError
+
+    def delete(self, table, filters):
+        raise NotImplementedError
+
+    def delete_companies(self, company_ids):
+        """Delete companies with their issuances, shareholders and share classes.
+
+        All or nothing. Returns the number of rows deleted per table and the
+        ``company_ids`` that existed.
+        """
+        raise NotImplementedError
+
+    def delete_shareholders(self, shareholder_ids):
+        """Delete shareholders with their issuances, all or nothing.
+
+        Returns the number of rows deleted per table and the ``company_ids``
+        whose data changed.
+        """
+        raise NotImplementedError
+
+    def get(self, table, row_id, columns='*'):
+        """A single row by ID, or None."""
+        response = self.select(table, columns, filters={'id': row_id}, limit=1)
+        return response.data[0] if response.data else None
+
+
+class SupabaseRepository(Repository):
+    """Repository backed by the Supabase PostgREST client."""
+
+    backend = 'supabase'
+
+    POSTGREST_METHODS = {
+        'eq': 'eq',
+        'neq': 'neq',
+        'in': 'in_',
+        'gt': 'gt',
+        'gte': 'gte',
+        'lt': 'lt',
+        'lte': 'lte',
+    }
+
+    def __init__(self, client=None, client_factory=None):
+        self._client = client
+        self._client_factory = client_factory
+
+    @property
+    def client(self):
+        # The factory memoizes the client; it is built on the first query, not at import
+        return self._client if self._client is not None else self._client_factory()
+
+    def _filtered(self, query, filters):
+        for column, operator, value in normalize_filters(filters):
+            if operator == 'in':
+                value = list(value)
+            query = getattr(query, self.POSTGREST_METHODS[operator])(column, value)
+        return query
+
+    @staticmethod
+    def _keyset_condition(order, after):
+        """PostgREST ``or`` filter for rows after ``after`` in ``order``.
+
+        For ``a, b`` ascending this is ``a > x OR (a = x AND b > y)``. NULLs
+        sort last ascending and first descending, as PostgREST orders them.
+        """
+        def quoted(value):
+            return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+        def equal(column, value):
+            return f'{column}.is.null' if value is None else f'{column}.eq.{quoted(value)}'
+
+        def beyond(column, descending, value):
+            if value is None:
+                return f'{column}.not.is.null' if descending else None
+            if descending:
+                return f'{column}.lt.{quoted(value)}'
+            return f'or({column}.gt.{quoted(value)},{column}.is.null)'
+
+        branches = []
+        for position, (column, descending) in enumerate(order):
+            term = beyond(column, descending, after[position])
+            if term is None:
+                continue
+            terms = [equal(prior, value) for (prior, _), value in zip(order[:position], after)] + [term]
+            branches.append(terms[0] if len(terms) == 1 else f'and({",".join(terms)})')
+        return ','.join(branches)
+
+    def select(self, table, columns='*', filters=None, order=None, limit=None, count=None, after=None):
+        query = self._filtered(self.client.table(table).select(columns, count=count), filters)
+        if after is not None:
+            query = query.or_(self._keyset_condition(order, after))
+        for column, descending in order or []:
+            query = query.order(column, desc=descending)
+        if limit is not None:
+            query = query.limit(limit)
+        response = with_retries(query.execute)
+        return QueryResult(response.data, getattr(response, 'count', None))
+
+    def insert(self, table, rows):
+        # Not retried: an insert that timed out may have been applied
+        response = self.client.table(table).insert(rows).execute()
+        return QueryResult(response.data)
+
+    def update(self, table, values, filters):
+        response = with_retries(self._filtered(self.client.table(table).update(values), filters).execute)
+        return QueryResult(response.data)
+
+    def delete(self, table, filters):
+        response = with_retries(self._filtered(self.client.table(table).delete(), filters).execute)
+        return QueryResult(response.data)
+
+    def delete_companies(self, company_ids):
+        return with_retries(self.client.rpc('delete_companies', {'company_ids': list(company_ids)}).execute).data
+
+    def delete_shareholders(self, shareholder_ids):
+        return with_retries(self.client.rpc('delete_shareholders', {'shareholder_ids': list(shareholder_ids)}).execute).data
+
+
+def _sort_key(value):
+    # Postgres sorts NULLs last in ascending order
+    return (value is None, value if value is not None else 0)
+
+
+def _coerce(actual, value):
+    """Cast a query-string value to the stored column's type, as Postgres would."""
+    if not isinstance(value, str) or actual is None or isinstance(actual, str):
+        return value
+    if isinstance(actual, bool):
+        return value.lower() in ('true', 't', '1')
+    if isinstance(actual, (int, float)):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _matches(row, filters):
+    for column, operator, value in filters:
+        actual = row.get(column)
+        value = [_coerce(actual, item) for item in value] if operator == 'in' else _coerce(actual, value)
+        if operator == 'eq':
+            if actual != value:
+                return False
+        elif operator == 'neq':
+            if actual == value:
+                return False
+        elif operator == 'in':
+            if actual not in value:
+                return False
+        elif actual is None:
+            return False
+        elif operator == 'gt' and not actual > value:
+            return False
+        elif operator == 'gte' and not actual >= value:
+            return False
+        elif operator == 'lt' and not actual < value:
+            return False
+        elif operator == 'lte' and not actual <= value:
+            return False
+    return True
+
+
+def _is_after(row, order, after):
+    for (column, descending), value in zip(order, after):
+        actual = row.get(column)
+        if actual == value:
+            continue
+        if actual is None or value is None:
+            # NULLs sort last ascending, first descending
+            return (actual is None) != descending
+        return actual < value if descending else actual > value
+    return False
+
+
+_EMBED_PATTERN = re.compile(r'(\w+)\(([^)]*)\)')
+
+
+def _parse_columns(columns):
+    """Split a PostgREST select string into plain columns and embeds.
+
+    Returns ``(columns or None for '*', {table: [columns]})``.
+    """
+    embeds = {}
+    for table, embedded in _EMBED_PATTERN.findall(columns):
+        embeds[table] = [column.strip() for column in embedded.split(',') if column.strip()]
+    plain = [column.strip() for column in _EMBED_PATTERN.sub('', columns).split(',') if column.strip()]
+    if not plain or '*' in plain:
+        plain = None
+    return plain, embeds
+
+
+class MemoryRepository(Repository):
+    """Repository that keeps every table in process memory.
+
+    Rows get a UUID ``id`` and a ``created_at`` timestamp when inserted without
+    one, like the Supabase tables. Reads return copies, so callers can't
+    mutate the store by accident.
+    """
+
+    backend = 'memory'
+
+    def __init__(self, data=None):
+        self._tables = {table: {} for table in TABLES}
+        self._lock = threading.RLock()
+        if data:
+            self.load(data)
+
+    def load(self, data):
+        with self._lock:
+            for table, rows in data.items():
+                self._insert_rows(table, rows)
+
+    def _table(self, table):
+        return self._tables.setdefault(table, {})
+
+    def _insert_rows(self, table, rows):
+        stored = self._table(table)
+        inserted = []
+        for row in rows:
+            row = dict(row)
+            row.setdefault('id', str(uuid.uuid4()))
+            row.setdefault('created_at', datetime.now().isoformat())
+            stored[row['id']] = row
+            inserted.append(dict(row))
+        return inserted
+
+    def _candidates(self, table, filters):
+        stored = self._table(table)
+        for column, operator, value in filters:
+            if column == 'id' and operator == 'eq':
+                return [stored[value]] if value in stored else []
+        return list(stored.values())
+
+    def _embed(self, row, embeds):
+        for related_table, related_columns in embeds.items():
+            foreign_key = EMBED_FOREIGN_KEYS.get(related_table)
+            related = self._table(related_table).get(row.get(foreign_key))
+            if related is None:
+                row[related_table] = None
+            elif not related_columns or '*' in related_columns:
+                row[related_table] = dict(related)
+            else:
+                row[related_table] = {column: related.get(column) for column in related_columns}
+        return row
+
+    def select(self, table, columns='*', filters=None, order=None, limit=None, count=None, after=None):
+        filters = normalize_filters(filters)
+        plain, embeds = _parse_columns(columns)
+        with self._lock:
+            rows = [row for row in self._candidates(table, filters) if _matches(row, filters)]
+            if after is not None:
+                rows = [row for row in rows if _is_after(row, order, after)]
+            total = len(rows) if count else None
+            # Sort by the least significant key first so earlier keys win
+            for column, descending in reversed(order or []):
+                rows.sort(key=lambda row: _sort_key(row.get(column)), reverse=descending)
+            if limit is not None:
+                rows = rows[:limit]
+            data = []
+            for row in rows:
+                row = dict(row) if plain is None else {column: row.get(column) for column in plain}
+                data.append(self._embed(row, embeds) if embeds else row)
+        return QueryResult(data, total)
+
+    def insert(self, table, rows):
+        rows = rows if isinstance(rows, list) else [rows]
+        with self._lock:
+            return QueryResult(self._insert_rows(table, rows))
+
+    def update(self, table, values, filters):
+        filters = normalize_filters(filters)
+        with self._lock:
+            updated = []
+            for row in self._candidates(table, filters):
+                if _matches(row, filters):
+                    row.update(values)
+                    updated.append(dict(row))
+        return QueryResult(updated)
+
+    def delete(self, table, filters):
+        filters = normalize_filters(filters)
+        with self._lock:
+            stored = self._table(table)
+            deleted = [row for row in self._candidates(table, filters) if _matches(row, filters)]
+            for row in deleted:
+                del stored[row['id']]
+        return QueryResult(deleted)
+
+    def _delete_where(self, table, column, values):
+        stored = self._table(table)
+        deleted = [row for row in stored.values() if row.get(column) in values]
+        for row in deleted:
+            del stored[row['id']]
+        return deleted
+
+    def delete_companies(self, company_ids):
+        company_ids = set(company_ids)
+        with self._lock:
+            counts = {
+                table: len(self._delete_where(table, 'company_id', company_ids))
+                for table in ('share_issuances', 'shareholders', 'share_classes')
+            }
+            companies = self._delete_where('companies', 'id', company_ids)
+        return {'companies': len(companies), **counts, 'company_ids': [row['id'] for row in companies]}
+
+    def delete_shareholders(self, shareholder_ids):
+        shareholder_ids = set(shareholder_ids)
+        with self._lock:
+            issuances = self._delete_where('share_issuances', 'shareholder_id', shareholder_ids)
+            shareholders = self._delete_where('shareholders', 'id', shareholder_ids)
+        company_ids = {row.get('company_id') for row in issuances + shareholders} - {None}
+        return {'shareholders': len(shareholders), 'share_issuances': len(issuances), 'company_ids': sorted(company_ids)}
+
+
+def iter_keyset(db, table, columns='*', filters=None, page_size=1000, order=None):
+    """Yield every matching row, fetching ``page_size`` rows per query.
+
+    Pages follow ``order`` (``id`` ascending by default; it should end with a
+    unique column) and each query resumes after the last row seen, so no query
+    has to skip over earlier rows the way OFFSET does. ``columns`` must
+    include the ``order`` columns.
+    """
+    order = order or [('id', False)]
+    after = None
+    while True:
+        rows = db.select(table, columns, filters=filters, order=order, limit=page_size, after=after).data
+        yield from rows
+        if len(rows) < page_size:
+            return
+        after = tuple(rows[-1][column] for column, _ in order)
+
+
+_shared_memory_repository = None
+_shared_memory_lock = threading.Lock()
+
+
+def shared_memory_repository():
+    """The process-wide memory store, so every function module sees the same data."""
+    global _shared_memory_repository
+    with _shared_memory_lock:
+        if _shared_memory_repository is None:
+            data = None
+            seed_path = os.environ.get('MEMORY_DATA_PATH')
+            if seed_path:
+                with open(seed_path) as seed_file:
+                    data = json.load(seed_file)
+            _shared_memory_repository = MemoryRepository(data)
+        return _shared_memory_repository
+
+
+def create_repository(client=None, client_factory=None):
+    """Build the repository selected by ``DATA_BACKEND``.
+
+    The Supabase backend takes a client, or a ``client_factory`` called on
+    the first query. Returns None for it when neither is given, mirroring the
+    module-level ``supabase = None`` convention.
+    """
+    backend = os.environ.get('DATA_BACKEND', 'supabase').lower()
+    if backend == 'memory':
+        return shared_memory_repository()
+    if backend != 'supabase':
+        raise ValueError(f'Unknown DATA_BACKEND: {backend}')
+    if client is None and client_factory is None:
+        return None
+    return SupabaseRepository(client, client_factory)
@@ -0,0 +1,241 @@
+"""Batched what-if scenarios on top of a company's current cap table.
+
+The current state is aggregated once. Each scenario is then applied as a small
+delta of new shares per holder, so a sweep of dozens of rounds costs little
+more than computing the cap table itself.
+
+A scenario is a dict with any of:
+
+* ``issuances``: hypothetical issuances, each with ``shares``, an optional
+  ``price_per_share`` and ``share_class_id``, and either an existing
+  ``shareholder_id`` or a ``shareholder_name`` for a new holder.
+* ``round``: a priced round with an ``amount`` and either a
+  ``pre_money_valuation`` or a ``price_per_share``. New shares are priced on
+  the fully diluted share count before the round.
+"""
+import itertools
+import math
+
+from cap_table import CapTableBuilder
+
+MAX_SCENARIOS = 500
+
+NEW_HOLDER_PREFIX = 'new:'
+
+
+class ScenarioError(ValueError):
+    """Raised for scenario payloads that can't be evaluated."""
+
+
+def _positive_number(value, field, allow_zero=False):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ScenarioError(f'{field} must be a number')
+    if not math.isfinite(number):
+        raise ScenarioError(f'{field} must be a finite number')
+    if number < 0 or (number == 0 and not allow_zero):
+        raise ScenarioError(f'{field} must be greater than zero')
+    return number
+
+
+def expand_scenarios(data):
+    """Collect scenarios from a request payload.
+
+    Besides an explicit ``scenarios`` list this accepts the single
+    ``future_issuance`` of the original calculator and a ``sweep`` of round
+    sizes and pre-money valuations, which expands to every combination.
+    """
+    scenarios = list(data.get('scenarios') or [])
+
+    future_issuance = data.get('future_issuance')
+    if future_issuance:
+        scenarios.append({'name': 'Future issuance', 'issuances': [future_issuance]})
+
+    sweep = data.get('sweep')
+    if sweep:
+        amounts = [_positive_number(amount, 'sweep.amounts') for amount in sweep.get('amounts') or []]
+        valuations = [_positive_number(valuation, 'sweep.pre_money_valuations') for valuation in sweep.get('pre_money_valuations') or []]
+        if not amounts or not valuations:
+            raise ScenarioError('sweep requires amounts and pre_money_valuations')
+        for amount, valuation in itertools.product(amounts, valuations):
+            scenarios.append({
+                'name': f'{amount:,.0f} @ {valuation:,.0f} pre-money',
+                'round': {
+                    'amount': amount,
+                    'pre_money_valuation': valuation,
+                    'share_class_id': sweep.get('share_class_id'),
+                    'investor': sweep.get('investor'),
+                    'shareholder_id': sweep.get('shareholder_id'),
+                },
+            })
+
+    if not scenarios:
+        raise ScenarioError('At least one scenario is required')
+    if len(scenarios) > MAX_SCENARIOS:
+        raise ScenarioError(f'At most {MAX_SCENARIOS} scenarios can be evaluated per request')
+    return scenarios
+
+
+def cap_table_issuances(cap_table):
+    """Issuances equivalent to a cap table that lists ``positions`` instead of issuance rows.
+
+    One per (holder, share class) position, priced at its average price, plus
+    one per share class for any shares that no holder holds.
+    """
+    issuances = []
+    held = {}
+    for shareholder_id, classes in (cap_table.get('positions') or {}).items():
+        for class_id, position in classes.items():
+            shares, invested = position.get('total_shares') or 0, position.get('invested') or 0
+            issuances.append(_position_issuance(shareholder_id, class_id, shares, invested))
+            class_held = held.setdefault(class_id, [0, 0])
+            class_held[0] += shares
+            class_held[1] += invested
+    for class_id, totals in (cap_table.get('by_share_class') or {}).items():
+        class_held = held.get(class_id, (0, 0))
+        shares = (totals.get('total_shares') or 0) - class_held[0]
+        if shares:
+            issuances.append(_position_issuance(None, class_id, shares, (totals.get('invested') or 0) - class_held[1]))
+    return issuances
+
+
+def _position_issuance(shareholder_id, class_id, shares, invested):
+    return {
+        'shareholder_id': shareholder_id,
+        'share_class_id': class_id,
+        'shares': shares,
+        'price_per_share': invested / shares if shares else 0,
+    }
+
+
+class ScenarioEngine:
+    """Apply hypothetical issuances and rounds to one base cap table."""
+
+    def __init__(self, company_id, issuances, share_classes=None, shareholders=None, price=None):
+        builder = CapTableBuilder(company_id, share_classes, shareholders, compact=True, keep_issuances=False, price=price)
+        self.current = builder.add_many(issuances).build()
+        self.dilutive_class_ids = builder.dilutive_class_ids
+        self.total_shares = self.current['total_shares']
+        self.outstanding_shares = self.current['outstanding_shares']
+        self.holders = {
+            shareholder_id: (entry['total_shares'], entry['outstanding_shares'], entry['name'])
+            for shareholder_id, entry in self.current['shareholders'].items()
+        }
+
+    def _holder_key(self, spec, default_name):
+        shareholder_id = spec.get('shareholder_id')
+        if shareholder_id:
+            if shareholder_id not in self.holders:
+                raise ScenarioError(f'Unknown shareholder_id {shareholder_id}')
+            return shareholder_id, self.holders[shareholder_id][2]
+        name = spec.get('shareholder_name') or spec.get('investor') or default_name
+        return NEW_HOLDER_PREFIX + name, name
+
+    def apply(self, scenario, include_holders=True):
+        """Evaluate one scenario against the current state."""
+        if not isinstance(scenario, dict):
+            raise ScenarioError('Each scenario must be an object')
+        deltas = {}
+        total_shares = self.total_shares
+        outstanding_shares = self.outstanding_shares
+        last_price = self.current['price_per_share']
+
+        def issue(key, name, shares, share_class_id):
+            nonlocal total_shares, outstanding_shares
+            entry = deltas.get(key)
+            if entry is None:
+                entry = deltas[key] = {'name': name, 'new_shares': 0, 'new_outstanding': 0}
+            entry['new_shares'] += shares
+            total_shares += shares
+            if share_class_id not in self.dilutive_class_ids:
+                entry['new_outstanding'] += shares
+                outstanding_shares += shares
+
+        for position, spec in enumerate(scenario.get('issuances') or []):
+            shares = _positive_number(spec.get('shares'), 'shares')
+            shares = int(shares) if shares.is_integer() else shares
+            key, name = self._holder_key(spec, f'New holder {position + 1}')
+            issue(key, name, shares, spec.get('share_class_id'))
+            if spec.get('price_per_share') is not None:
+                last_price = _positive_number(spec['price_per_share'], 'price_per_share', allow_zero=True)
+
+        result = {'name': scenario.get('name')}
+
+        round_spec = scenario.get('round')
+        if round_spec:
+            amount = _positive_number(round_spec.get('amount'), 'round.amount')
+            pre_money_shares = total_shares
+            if round_spec.get('pre_money_valuation') is not None:
+                pre_money = _positive_number(round_spec['pre_money_valuation'], 'round.pre_money_valuation')
+                if pre_money_shares <= 0:
+                    raise ScenarioError('A priced round needs existing shares to price against')
+                price = pre_money / pre_money_shares
+            elif round_spec.get('price_per_share') is not None:
+                price = _positive_number(round_spec['price_per_share'], 'round.price_per_share')
+                pre_money = price * pre_money_shares
+            else:
+                raise ScenarioError('round requires pre_money_valuation or price_per_share')
+
+            # Priced off the share count directly; amount / price can land a hair below a whole share
+            new_shares = math.floor(amount * pre_money_shares / pre_money + 1e-9)
+            key, name = self._holder_key(round_spec, 'New investor')
+            issue(key, name, new_shares, round_spec.get('share_class_id'))
+            last_price = price
+            result.update({
+                'amount': amount,
+                'pre_money_valuation': pre_money,
+                'post_money_valuation': pre_money + amount,
+                'round_shares': new_shares,
+            })
+
+        fd_scale = 100 / total_shares if total_shares > 0 else 0
+        basic_scale = 100 / outstanding_shares if outstanding_shares > 0 else 0
+
+        changed = {}
+        for key, entry in deltas.items():
+            base_total, base_outstanding, _ = self.holders.get(key, (0, 0, None))
+            holder_total = base_total + entry['new_shares']
+            changed[key] = {
+                'name': entry['name'],
+                'new_shares': entry['new_shares'],
+                'total_shares': holder_total,
+                'percentage': holder_total * fd_scale,
+                'ownership_percentage': (base_outstanding + entry['new_outstanding']) * basic_scale,
+            }
+
+        result.update({
+            'price_per_share': last_price,
+            'total_shares': total_shares,
+            'outstanding_shares': outstanding_shares,
+            'new_shares': total_shares - self.total_shares,
+            'valuation': total_shares * last_price if last_price is not None else None,
+            # Every holder not in the scenario keeps its shares, so its stake
+            # shrinks by exactly this factor
+            'dilution_factor': self.total_shares / total_shares if total_shares > 0 else 1,
+            'changed_holders': changed,
+        })
+
+        if include_holders:
+            holders = {}
+            for shareholder_id, (base_total, base_outstanding, name) in self.holders.items():
+                if shareholder_id in changed:
+                    continue
+                holders[shareholder_id] = {
+                    'name': name,
+                    'new_shares': 0,
+                    'total_shares': base_total,
+                    'percentage': base_total * fd_scale,
+                    'ownership_percentage': base_outstanding * basic_scale,
+                }
+            holders.update(changed)
+            result['shareholders'] = holders
+
+        return result
+
+    def run(self, scenarios, include_holders=True):
+        return {
+            'company_id': self.current['company_id'],
+            'current': self.current,
+            'scenarios': [self.apply(scenario, include_holders) for scenario in scenarios],
+        }
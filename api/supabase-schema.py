@@ -1,13 +1,14 @@
 # api/supabase-schema.py
 import os
+import sys
 import json
-from supabase import create_client, Client
 
-# Supabase client initialization using the Service Role Key
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+from clients import supabase_client
+
+# Supabase client using the Service Role Key, built on the first request
+SUPABASE_KEY_ENV = "SUPABASE_SERVICE_ROLE_KEY"
 
 def handler(request, context=None):
     """
@@ -22,6 +23,7 @@ def handler(request, context=None):
         return json.dumps({"error": "Method not allowed"}), 405, headers
 
     try:
+        supabase = supabase_client(SUPABASE_KEY_ENV)
         if supabase is None:
             return json.dumps({"error": "Supabase client not initialized"}), 500, headers
 
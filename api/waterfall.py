@@ -0,0 +1,271 @@
+"""Liquidation preference waterfall over many exit values at once.
+
+Proceeds are distributed in two steps:
+
+1. Preferences, by seniority. Share classes are paid in descending
+   ``priority``; classes with the same priority are paid pari passu, in
+   proportion to their preference. A class's preference is its liquidation
+   preference multiple times the amount invested in it.
+2. The remainder, per share, across common classes (those without a
+   preference), participating preferred classes and any non-participating
+   class that does better converting to common than taking its preference.
+   Classes convert one at a time, lowest preference per share first, until
+   no further conversion would pay more.
+
+Within a class every payout is split between holders pro rata to shares.
+
+Share classes don't store preference terms, so they default from
+``priority``: classes at the lowest priority are common, all others carry a
+1x non-participating preference. ``liquidation_preference``,
+``participating`` and ``seniority`` on the share class row, or in the
+request's ``terms``, override the defaults.
+
+Every exit value is a row of the same NumPy arrays, so a payout curve of
+hundreds of points costs one pass over the classes, not one per point.
+Dilutive classes (options, warrants) are left out unless ``fully_diluted``
+treats them as exercised; they are then common unless ``terms`` say otherwise.
+"""
+import math
+import os
+
+from cap_table import UNASSIGNED_CLASS, UNASSIGNED_HOLDER
+
+MAX_EXIT_VALUES = int(os.environ.get('WATERFALL_MAX_EXIT_VALUES', 1000))
+
+DEFAULT_EXIT_STEPS = 100
+
+# NumPy is only imported by the first waterfall, not on every cold start
+np = None
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+
+class WaterfallError(ValueError):
+    """Raised for waterfall payloads that can't be evaluated."""
+
+
+def _number(value, field, minimum=0):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise WaterfallError(f'{field} must be a number')
+    if math.isnan(number) or math.isinf(number) or number < minimum:
+        raise WaterfallError(f'{field} must be at least {minimum}')
+    return number
+
+
+def _flag(value):
+    # Parsed like the API's query flags, so "false" from a text column isn't true
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def parse_exit_values(data):
+    """Exit values from ``exit_values`` or an evenly spaced ``exit_range`` of ``{min, max, steps}``."""
+    if data.get('exit_values') is not None:
+        values = data['exit_values']
+        if not isinstance(values, list) or not values:
+            raise WaterfallError('exit_values must be a non-empty list')
+        values = [_number(value, 'exit_values') for value in values]
+    elif data.get('exit_range') is not None:
+        exit_range = data['exit_range']
+        if not isinstance(exit_range, dict):
+            raise WaterfallError('exit_range must be an object')
+        low = _number(exit_range.get('min', 0), 'exit_range.min')
+        high = _number(exit_range.get('max'), 'exit_range.max')
+        steps = int(_number(exit_range.get('steps', DEFAULT_EXIT_STEPS), 'exit_range.steps', minimum=1))
+        if high < low:
+            raise WaterfallError('exit_range.max must not be below exit_range.min')
+        if steps > MAX_EXIT_VALUES:
+            raise WaterfallError(f'At most {MAX_EXIT_VALUES} exit values can be evaluated per request')
+        values = [low] if steps == 1 else [low + (high - low) * i / (steps - 1) for i in range(steps)]
+    else:
+        raise WaterfallError('exit_values or exit_range is required')
+
+    if len(values) > MAX_EXIT_VALUES:
+        raise WaterfallError(f'At most {MAX_EXIT_VALUES} exit values can be evaluated per request')
+    return values
+
+
+def class_terms(share_classes, overrides=None):
+    """``{class_id: {seniority, liquidation_preference, participating}}`` for every class.
+
+    ``overrides`` maps class IDs to any of those keys and wins over the row.
+    """
+    overrides = overrides or {}
+    if not isinstance(overrides, dict):
+        raise WaterfallError('terms must be an object keyed by share class ID')
+
+    priorities = [sc.get('priority') for sc in share_classes if sc.get('priority') is not None]
+    lowest = min(priorities) if priorities else None
+
+    terms = {}
+    for share_class in [*share_classes, {'id': UNASSIGNED_CLASS}]:
+        class_id = share_class.get('id')
+        override = overrides.get(class_id) or {}
+        if not isinstance(override, dict):
+            raise WaterfallError(f'terms for {class_id} must be an object')
+        priority = share_class.get('priority')
+        is_common = priority is None or priority == lowest
+
+        seniority = override.get('seniority', share_class.get('seniority', priority))
+        multiple = override.get('liquidation_preference', share_class.get('liquidation_preference'))
+        terms[class_id] = {
+            'seniority': _number(seniority, f'{class_id} seniority', minimum=-math.inf) if seniority is not None else None,
+            'liquidation_preference': _number(multiple, f'{class_id} liquidation_preference') if multiple is not None else (0.0 if is_common else 1.0),
+            'participating': _flag(override.get('participating', share_class.get('participating'))),
+        }
+
+    unknown = set(overrides) - set(terms)
+    if unknown:
+        raise WaterfallError(f'Unknown share class in terms: {sorted(unknown)[0]}')
+    return terms
+
+
+def _rank(seniority):
+    # Most senior first; classes without a seniority are paid last
+    return math.inf if seniority is None else -seniority
+
+
+class WaterfallEngine:
+    """Distribute exit values across the share classes and holders of one company.
+
+    ``positions`` maps ``(shareholder_id, share_class_id)`` to
+    ``(shares, invested, ...)``, as returned by ``CompanyHoldings.all_positions``;
+    shares without a shareholder are paid out under ``UNASSIGNED_HOLDER``.
+    """
+
+    def __init__(self, share_classes, positions, shareholders=None, terms=None, dilutive_class_ids=(), fully_diluted=False):
+        _load_numpy()
+        share_classes = list(share_classes or [])
+        shareholders = shareholders or {}
+        terms_by_class = class_terms(share_classes, terms)
+        names = {sc.get('id'): sc.get('name') for sc in share_classes}
+
+        included = {
+            key: value for key, value in positions.items()
+            if fully_diluted or key[1] not in dilutive_class_ids
+        }
+        for _, class_id in included:
+            # Issuances can point at a class the company no longer lists; count them as common
+            terms_by_class.setdefault(class_id, {'seniority': None, 'liquidation_preference': 0.0, 'participating': False})
+        class_ids = sorted(
+            {class_id for _, class_id in included},
+            key=lambda class_id: (_rank(terms_by_class[class_id]['seniority']), str(class_id))
+        )
+        holder_ids = list(dict.fromkeys(shareholder_id for shareholder_id, _ in included))
+        class_index = {class_id: i for i, class_id in enumerate(class_ids)}
+        holder_index = {shareholder_id: i for i, shareholder_id in enumerate(holder_ids)}
+
+        holdings = np.zeros((len(class_ids), len(holder_ids)))
+        invested = np.zeros(len(class_ids))
+        for (shareholder_id, class_id), (shares, class_invested, *_) in included.items():
+            holdings[class_index[class_id], holder_index[shareholder_id]] += shares
+            invested[class_index[class_id]] += class_invested
+
+        self.class_ids = class_ids
+        self.holder_ids = holder_ids
+        self.class_names = [names.get(class_id) for class_id in class_ids]
+        self.holder_names = [
+            'Unassigned' if shareholder_id == UNASSIGNED_HOLDER else (shareholders.get(shareholder_id) or {}).get('name')
+            for shareholder_id in holder_ids
+        ]
+        self.terms = [terms_by_class[class_id] for class_id in class_ids]
+
+        self.shares = holdings.sum(axis=1)
+        multiples = np.array([term['liquidation_preference'] for term in self.terms])
+        self.preferences = multiples * invested
+        self.participating = np.array([term['participating'] for term in self.terms], dtype=bool)
+        self.has_preference = self.preferences > 0
+        self.non_participating = self.has_preference & ~self.participating
+        # Each class's share of its class total, per holder
+        self.holder_fractions = np.divide(holdings, self.shares[:, None], out=np.zeros_like(holdings), where=self.shares[:, None] > 0)
+
+        # Consecutive runs of equal seniority are paid pari passu
+        self.tiers = []
+        start = 0
+        for end in range(1, len(class_ids) + 1):
+            if end == len(class_ids) or self.terms[end]['seniority'] != self.terms[start]['seniority']:
+                self.tiers.append(slice(start, end))
+                start = end
+
+    def _pay_preferences(self, exit_values, converted):
+        claims = np.where(converted, 0.0, self.preferences)
+        paid = np.zeros_like(claims)
+        remaining = exit_values.copy()
+        for tier in self.tiers:
+            tier_claims = claims[:, tier]
+            total = tier_claims.sum(axis=1)
+            pay = np.minimum(remaining, total)
+            scale = np.divide(pay, total, out=np.zeros_like(pay), where=total > 0)
+            paid[:, tier] = tier_claims * scale[:, None]
+            remaining -= pay
+        return paid
+
+    def _distribute(self, exit_values):
+        converted = np.zeros((len(exit_values), len(self.class_ids)), dtype=bool)
+        # At most one conversion per class, so this always settles
+        for _ in range(int(self.non_participating.sum()) + 1):
+            paid = self._pay_preferences(exit_values, converted)
+            residual = exit_values - paid.sum(axis=1)
+            sharing = ~self.has_preference | self.participating | converted
+            sharing_shares = (sharing * self.shares).sum(axis=1)
+            # With nobody to share the remainder, any conversion beats leaving it unpaid
+            per_share = np.divide(
+                residual, sharing_shares,
+                out=np.where(residual > 0, np.inf, 0.0),
+                where=sharing_shares > 0
+            )
+
+            # Converting pays a class more exactly when a common share is worth more than its preference per share
+            preference_per_share = np.divide(paid, self.shares, out=np.full_like(paid, np.inf), where=self.shares > 0)
+            candidates = self.non_participating & ~converted & (per_share[:, None] > preference_per_share * (1 + 1e-12))
+            converting = candidates.any(axis=1)
+            if not converting.any():
+                break
+            pick = np.where(candidates, preference_per_share, np.inf).argmin(axis=1)
+            converted[converting, pick[converting]] = True
+
+        per_share = np.where(np.isfinite(per_share), per_share, 0.0)
+        class_payouts = paid + sharing * self.shares * per_share[:, None]
+        return class_payouts, per_share, converted
+
+    def run(self, exit_values, include_holders=True):
+        """Payouts for every exit value, per share class and (optionally) per holder."""
+        exit_values = np.asarray(exit_values, dtype=float)
+        class_payouts, per_share, converted = self._distribute(exit_values)
+
+        share_classes = []
+        for i, class_id in enumerate(self.class_ids):
+            entry = {
+                'id': class_id,
+                'name': self.class_names[i],
+                'shares': self.shares[i].item(),
+                'preference': self.preferences[i].item(),
+                'payouts': class_payouts[:, i].tolist(),
+                **self.terms[i],
+            }
+            if self.non_participating[i]:
+                entry['converted'] = converted[:, i].tolist()
+            share_classes.append(entry)
+
+        result = {
+            'exit_values': exit_values.tolist(),
+            'common_price_per_share': per_share.tolist(),
+            'unallocated': (exit_values - class_payouts.sum(axis=1)).tolist(),
+            'share_classes': share_classes,
+        }
+        if include_holders:
+            holder_payouts = class_payouts @ self.holder_fractions
+            result['shareholders'] = {
+                shareholder_id: {'name': self.holder_names[i], 'payouts': holder_payouts[:, i].tolist()}
+                for i, shareholder_id in enumerate(self.holder_ids)
+            }
+        return result
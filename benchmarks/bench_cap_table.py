@@ -0,0 +1,152 @@
+"""Benchmark the cap-table engine against the original get_cap_table loop.
+
+Runs on synthetic companies with 1k/10k/100k issuances and reports build time,
+serialization time and JSON payload size for the legacy endpoint body and the
+engine, in full and compact modes.
+Serialization is timed with the standard library as Flask's default provider
+calls it (sorted keys) and with ``api/json_provider.py``, whose output is the
+payload measured.
+
+Point-in-time (``?as_of=``) snapshots are timed both as a filtered scan of
+every issuance and from ``api/ledger.py``'s checkpointed ledger.
+
+    python benchmarks/bench_cap_table.py [--sizes 1000,10000,100000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from cap_table import build_cap_table
+from json_provider import ORJSON_AVAILABLE, dumps_bytes
+from ledger import CapTableLedger
+
+
+def make_company(n_issuances, n_shareholders=None, n_classes=4, seed=42):
+    """Build synthetic rows shaped like the Supabase responses used by get_cap_table."""
+    rng = random.Random(seed)
+    n_shareholders = n_shareholders or max(10, n_issuances // 20)
+    company_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    share_classes = [
+        {'id': str(uuid.UUID(int=rng.getrandbits(128))), 'company_id': company_id, 'name': f'Class {i}', 'priority': i + 1}
+        for i in range(n_classes)
+    ]
+    shareholders = [
+        {'id': str(uuid.UUID(int=rng.getrandbits(128))), 'name': f'Holder {i}', 'email': f'holder{i}@example.com'}
+        for i in range(n_shareholders)
+    ]
+    issuances = []
+    for i in range(n_issuances):
+        holder = rng.choice(shareholders)
+        issuances.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'company_id': company_id,
+            'shareholder_id': holder['id'],
+            'share_class_id': rng.choice(share_classes)['id'],
+            'shares': rng.randint(100, 100000),
+            'price_per_share': round(rng.uniform(0.001, 10), 4),
+            'issue_date': f'20{rng.randint(15, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+            'round': rng.randint(1, 5),
+            'round_description': None,
+            'payment_status': 'paid',
+            'created_at': '2025-01-01T00:00:00',
+            'shareholders': {'name': holder['name'], 'email': holder['email']},
+        })
+    return company_id, issuances, share_classes, shareholders
+
+
+def legacy_cap_table(company_id, issuances, share_classes):
+    """The body of get_cap_table before the engine was introduced."""
+    total_shares = sum(item.get('shares', 0) for item in issuances)
+
+    cap_table = {
+        'company_id': company_id,
+        'total_shares': total_shares,
+        'share_classes': share_classes,
+        'issuances': issuances,
+        'shareholders': {}
+    }
+
+    for issuance in issuances:
+        if issuance.get('shareholder_id'):
+            shareholder_id = issuance['shareholder_id']
+            if shareholder_id not in cap_table['shareholders']:
+                cap_table['shareholders'][shareholder_id] = {
+                    'name': issuance.get('shareholders', {}).get('name'),
+                    'email': issuance.get('shareholders', {}).get('email'),
+                    'total_shares': 0,
+                    'percentage': 0,
+                    'issuances': []
+                }
+
+            shares = issuance.get('shares', 0)
+            cap_table['shareholders'][shareholder_id]['total_shares'] += shares
+            cap_table['shareholders'][shareholder_id]['percentage'] = (cap_table['shareholders'][shareholder_id]['total_shares'] / total_shares * 100) if total_shares > 0 else 0
+            cap_table['shareholders'][shareholder_id]['issuances'].append(issuance)
+
+    return cap_table
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(sizes, repeat):
+    print(f"JSON provider: {'orjson' if ORJSON_AVAILABLE else 'stdlib'}")
+    print(f"{'issuances':>10} {'variant':>8} {'build ms':>10} {'json ms':>10} {'fast ms':>10} {'payload KB':>12}")
+    for size in sizes:
+        company_id, issuances, share_classes, _ = make_company(size)
+        variants = [
+            ('legacy', lambda: legacy_cap_table(company_id, issuances, share_classes)),
+            ('engine', lambda: build_cap_table(company_id, issuances, share_classes)),
+            ('compact', lambda: build_cap_table(company_id, issuances, share_classes, compact=True)),
+        ]
+        for label, fn in variants:
+            build_time, cap_table = best_of(fn, repeat)
+            json_time, _ = best_of(lambda: json.dumps(cap_table, sort_keys=True), max(1, repeat // 2))
+            fast_time, payload = best_of(lambda: dumps_bytes(cap_table), max(1, repeat // 2))
+            print(
+                f"{size:>10} {label:>8} {build_time * 1000:>10.2f} {json_time * 1000:>10.2f} "
+                f"{fast_time * 1000:>10.2f} {len(payload) / 1024:>12.1f}"
+            )
+
+
+def run_as_of(sizes, repeat, as_of='2020-06-30'):
+    print()
+    print(f"{'issuances':>10} {'ledger build ms':>16} {'scan ms':>10} {'snapshot ms':>12}")
+    for size in sizes:
+        company_id, issuances, share_classes, _ = make_company(size)
+
+        def scan():
+            rows = [issuance for issuance in issuances if (issuance['issue_date'] or '')[:10] <= as_of]
+            return build_cap_table(company_id, rows, share_classes, keep_issuances=False)
+
+        build_time, ledger = best_of(lambda: CapTableLedger(company_id, issuances, share_classes), max(1, repeat // 2))
+        scan_time, _ = best_of(scan, repeat)
+        snapshot_time, _ = best_of(lambda: ledger.snapshot(as_of), repeat)
+        print(f"{size:>10} {build_time * 1000:>16.2f} {scan_time * 1000:>10.2f} {snapshot_time * 1000:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    run(sizes, args.repeat)
+    run_as_of(sizes, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark per-email rendering of the shareholder summary notification.
+
+Compares the original path (rebuild the template string, f-string every
+issuance block, five chained ``str.replace`` passes) with the pre-parsed
+template in ``api/email_template.py`` for shareholders holding 1 to 1000
+issuances.
+
+    python benchmarks/bench_email_render.py [--sizes 1,10,100,500,1000] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from email_template import render_shareholder_email
+
+
+def make_issuances(n_issuances, seed=42):
+    """Issuances shaped like the enriched rows the notifier renders."""
+    rng = random.Random(seed)
+    return [
+        {
+            'share_class_name': rng.choice(['Ordinary', 'Preference A', 'Options <ESOP>']),
+            'shares': rng.randint(100, 100000),
+            'price_per_share': rng.choice([0.01, 1.0, 2.5]),
+            'issue_date': f'20{rng.randint(15, 24)}-{rng.randint(1, 12):02d}-01',
+            'round': rng.choice(['Seed', 'Series A', 'Series B']),
+            'round_description': 'Priced round & extension',
+        }
+        for _ in range(n_issuances)
+    ]
+
+
+def legacy_load_email_template():
+    """Verbatim copy of the template loader the notifier used before."""
+    return '''
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+            body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+            .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+            .header { background-color: #1a73e8; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }
+            .content { padding: 20px; background-color: #f9f9f9; }
+            .issuance { background-color: white; margin: 10px 0; padding: 15px; border-left: 3px solid #34a853; border-radius: 4px; }
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h2>Kapitalized Equity Management</h2>
+            </div>
+            <div class="content">
+                <p>Dear {{shareholder_name}},</p>
+                <p>This email provides a summary of your current shareholdings in <strong>{{company_name}}</strong>.</p>
+                
+                <h3>Your Share Issuances:</h3>
+                {{issuances_list_html}}
+
+                <p>If you have any questions regarding your shareholdings, please contact us at {{contact_email}}.</p>
+                <p>Sincerely,<br>The Kapitalized Team</p>
+            </div>
+            <div style="text-align: center; color: #777; margin-top: 20px;">
+                <p>&copy; {{current_year}} Kapitalized. All rights reserved.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    '''
+
+
+def legacy_format_issuances_html(issuances):
+    if not issuances:
+        return "<p>No share issuances found.</p>"
+
+    html_parts = []
+    for issuance in issuances:
+        total_value = issuance.get('shares', 0) * issuance.get('price_per_share', 0)
+        html_parts.append(f'''
+        <div class="issuance">
+            <strong>Share Class:</strong> {issuance.get('share_class_name', 'Unknown')}<br>
+            <strong>Shares:</strong> {issuance.get('shares', 0):,}<br>
+            <strong>Price per Share:</strong> ${issuance.get('price_per_share', 0):.2f}<br>
+            <strong>Total Value:</strong> ${total_value:,.2f}<br>
+            <strong>Issue Date:</strong> {issuance.get('issue_date', 'Unknown')}<br>
+            <strong>Round:</strong> {issuance.get('round', 'N/A')} ({issuance.get('round_description', 'N/A')})
+        </div>
+        ''')
+
+    return ''.join(html_parts)
+
+
+def legacy_render(shareholder_name, company_name, issuances, contact_email):
+    template = legacy_load_email_template()
+    issuances_html = legacy_format_issuances_html(issuances)
+    email_content = template.replace('{{shareholder_name}}', shareholder_name)
+    email_content = email_content.replace('{{company_name}}', company_name)
+    email_content = email_content.replace('{{issuances_list_html}}', issuances_html)
+    email_content = email_content.replace('{{contact_email}}', contact_email)
+    email_content = email_content.replace('{{current_year}}', str(datetime.now().year))
+    return email_content
+
+
+def best_of(fn, repeat):
+    """Best per-call time over ``repeat`` calls, in seconds."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(sizes, repeat):
+    print(f"{'issuances':>10} {'variant':>9} {'us/email':>10} {'KB/email':>10}")
+    for size in sizes:
+        issuances = make_issuances(size)
+        args = ('Jane Investor', 'Test Startup Inc', issuances, 'hello@kapitalized.com')
+        variants = [
+            ('legacy', lambda: legacy_render(*args)),
+            ('parsed', lambda: render_shareholder_email(*args)),
+        ]
+        for label, fn in variants:
+            elapsed, body = best_of(fn, repeat)
+            print(f"{size:>10} {label:>9} {elapsed * 1e6:>10.1f} {len(body) / 1024:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1,10,100,500,1000')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    run([int(size) for size in args.sizes.split(',')], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
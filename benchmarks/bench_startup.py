@@ -0,0 +1,85 @@
+"""Measure cold-start cost of the API function modules.
+
+Imports each serverless entry point in a fresh interpreter, the way a cold
+start does, and reports the best-of-N import time, the latency of the first
+request after it, and the heaviest imports from ``python -X importtime``.
+
+    python benchmarks/bench_startup.py [--repeat 5] [--top 15] [--modules index,notify-shareholders]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+
+# Runs in the child interpreter; prints {"import_ms", "first_request_ms"} on stdout
+CHILD = r'''
+import importlib.util, json, sys, time
+api_dir, module_name = sys.argv[1], sys.argv[2]
+sys.path.insert(0, api_dir)
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location(module_name.replace('-', '_'), f'{api_dir}/{module_name}.py')
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+first_request_ms = None
+if hasattr(module, 'app'):
+    response = module.app.test_client().get('/api/health')
+    response.get_data()
+    first_request_ms = (time.perf_counter() - imported) * 1000
+print(json.dumps({'import_ms': (imported - start) * 1000, 'first_request_ms': first_request_ms}))
+'''
+
+
+def run_child(module_name, importtime=False):
+    env = dict(os.environ, JOB_DB_PATH=os.path.join(tempfile.gettempdir(), 'bench-startup-jobs.sqlite3'))
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CHILD, API_DIR, module_name]
+    result = subprocess.run(command, capture_output=True, text=True, env=env, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, result.stderr
+
+
+def parse_importtime(stderr):
+    """``(cumulative_us, self_us, name)`` for every line of ``-X importtime`` output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return entries
+
+
+def run(modules, repeat, top):
+    for module_name in modules:
+        runs = [run_child(module_name)[0] for _ in range(repeat)]
+        best_import = min(timing['import_ms'] for timing in runs)
+        first_requests = [timing['first_request_ms'] for timing in runs if timing['first_request_ms'] is not None]
+
+        print(f'{module_name}: import {best_import:.1f} ms (best of {repeat})', end='')
+        if first_requests:
+            print(f', first request {min(first_requests):.1f} ms', end='')
+        print()
+
+        _, stderr = run_child(module_name, importtime=True)
+        entries = sorted(parse_importtime(stderr), reverse=True)
+        print(f"  {'cumulative ms':>13} {'self ms':>8}  module")
+        for cumulative_us, self_us, name in entries[:top]:
+            print(f'  {cumulative_us / 1000:>13.1f} {self_us / 1000:>8.1f}  {name}')
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modules', default='index,notify-shareholders')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+    run(args.modules.split(','), args.repeat, args.top)
+
+
+if __name__ == '__main__':
+    main()
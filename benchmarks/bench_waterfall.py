@@ -0,0 +1,78 @@
+"""Benchmark the liquidation waterfall engine.
+
+Builds synthetic companies with many share classes and holders (a common
+class plus preferred classes at increasing priority, a mix of participating
+and non-participating) and reports, for a payout curve of N exit values:
+engine set-up time, one vectorized ``run`` with and without per-holder
+payouts, and the same curve evaluated one exit value at a time.
+
+    python benchmarks/bench_waterfall.py [--cases 4x100,16x1000,64x10000] [--points 500] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from waterfall import WaterfallEngine
+
+
+def make_company(n_classes, n_holders, positions_per_holder=3, seed=42):
+    """Share classes, ``(holder, class) -> (shares, invested)`` positions and terms."""
+    rng = random.Random(seed)
+    share_classes = [{'id': f'class-{i}', 'name': f'Class {i}', 'priority': i + 1} for i in range(n_classes)]
+    terms = {
+        share_class['id']: {'participating': rng.random() < 0.3, 'liquidation_preference': rng.choice([1, 1, 1.5, 2])}
+        for share_class in share_classes[1:]
+    }
+    positions = {}
+    for holder in range(n_holders):
+        for share_class in rng.sample(share_classes, min(positions_per_holder, n_classes)):
+            shares = rng.randint(1000, 100000)
+            price = 0.01 if share_class['priority'] == 1 else share_class['priority'] * 0.5
+            positions[(f'holder-{holder}', share_class['id'])] = (shares, shares * price)
+    shareholders = {f'holder-{holder}': {'name': f'Holder {holder}'} for holder in range(n_holders)}
+    return share_classes, positions, shareholders, terms
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(cases, points, repeat):
+    print(f"{'classes':>8} {'holders':>8} {'setup ms':>10} {'curve ms':>10} {'+holders ms':>12} {'per-value ms':>13}")
+    for n_classes, n_holders in cases:
+        share_classes, positions, shareholders, terms = make_company(n_classes, n_holders)
+        total_invested = sum(invested for _, invested in positions.values())
+        exit_values = [total_invested * 3 * i / (points - 1) for i in range(points)]
+
+        setup_time, engine = best_of(lambda: WaterfallEngine(share_classes, positions, shareholders, terms=terms), repeat)
+        curve_time, _ = best_of(lambda: engine.run(exit_values, include_holders=False), repeat)
+        holders_time, _ = best_of(lambda: engine.run(exit_values), repeat)
+        loop_time, _ = best_of(lambda: [engine.run([value], include_holders=False) for value in exit_values], 1)
+        print(
+            f"{n_classes:>8} {n_holders:>8} {setup_time * 1000:>10.2f} {curve_time * 1000:>10.2f} "
+            f"{holders_time * 1000:>12.2f} {loop_time * 1000:>13.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cases', default='4x100,16x1000,64x10000')
+    parser.add_argument('--points', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    cases = [tuple(int(part) for part in case.split('x')) for case in args.cases.split(',')]
+    run(cases, args.points, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
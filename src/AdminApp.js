@@ -6,6 +6,24 @@ import _ from 'lodash';
 import { supabaseClient } from './services/authService';
 
 const ADMIN_BACKEND_BASE_URL = "/api/admin";
+const ADMIN_PAGE_SIZE = 1000;
+
+// List endpoints return one page at a time; follow X-Next-Cursor until the last page.
+const fetchAllPages = async (path, params = {}) => {
+    const rows = [];
+    let cursor = null;
+    do {
+        const query = new URLSearchParams({ ...params, limit: ADMIN_PAGE_SIZE, count: 'none' });
+        if (cursor) query.set('cursor', cursor);
+        const response = await fetch(`${ADMIN_BACKEND_BASE_URL}/${path}?${query}`);
+        if (!response.ok) {
+            throw new Error(`Failed to fetch ${path} (status ${response.status}).`);
+        }
+        rows.push(...(await response.json()));
+        cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return rows;
+};
 
 // Modal Component
 const Modal = ({ children, onClose }) => (
@@ -181,20 +199,12 @@ const AdminApp = () => {
     const fetchAllAdminData = useCallback(async () => {
       setLoadingAdminData(true);
       try {
-        const [usersRes, companiesRes, issuancesRes] = await Promise.all([
-            fetch(`${ADMIN_BACKEND_BASE_URL}/users`),
-            fetch(`${ADMIN_BACKEND_BASE_URL}/companies`),
-            fetch(`${ADMIN_BACKEND_BASE_URL}/issuances`),
+        const [usersData, companiesData, issuancesData] = await Promise.all([
+            fetchAllPages('users'),
+            fetchAllPages('companies'),
+            fetchAllPages('issuances', { fields: 'id,company_id,shareholder_id,shares,price_per_share' }),
         ]);
 
-        if (!usersRes.ok || !companiesRes.ok || !issuancesRes.ok) {
-            throw new Error('Failed to fetch one or more admin resources.');
-        }
-
-        const usersData = await usersRes.json();
-        const companiesData = await companiesRes.json();
-        const issuancesData = await issuancesRes.json();
-
         setAllUsers(usersData);
         setAllCompanies(companiesData);
         setAllIssuances(issuancesData);
@@ -101,7 +101,7 @@ const EquityManager = ({ user, userProfile, onProfileUpdate, onBackToProducts })
             case 'issuances':
                 return <IssuancesPage companyData={companyData} selectedCompany={selectedCompany} onDataRefresh={refreshCompanyData} />;
             case 'reports':
-                return <ReportsPage />;
+                return <ReportsPage selectedCompany={selectedCompany} />;
             case 'notifications':
                 return <NotificationsPage companyData={companyData} />;
             case 'account':
@@ -36,7 +36,31 @@ const EquityHomePage = ({ companyData, shareClasses }) => {
         return { totalShares, totalValue, classSummary, latestValuationPerShare, companyValuation };
     };
 
-    const summary = getSummaryData(companyData.shareIssuances);
+    // Totals computed by the API with the company bundle
+    const fromBundle = (bundleSummary) => {
+        const classSummary = Object.values(
+            Object.values(bundleSummary.by_share_class).reduce((acc, shareClass) => {
+                const className = shareClass.name || 'Unknown';
+                if (!acc[className]) {
+                    acc[className] = { name: className, totalShares: 0, totalValue: 0, percentage: 0 };
+                }
+                acc[className].totalShares += shareClass.total_shares;
+                acc[className].totalValue += shareClass.invested;
+                acc[className].percentage += shareClass.percentage;
+                return acc;
+            }, {})
+        ).map(summary => ({ ...summary, percentage: summary.percentage.toFixed(2) }));
+
+        return {
+            totalShares: bundleSummary.total_shares,
+            totalValue: bundleSummary.total_invested,
+            classSummary,
+            latestValuationPerShare: bundleSummary.price_per_share || 0,
+            companyValuation: bundleSummary.valuation || 0,
+        };
+    };
+
+    const summary = companyData.summary ? fromBundle(companyData.summary) : getSummaryData(companyData.shareIssuances);
 
     const shareClassSummaryColumns = [
         { key: 'name', header: 'Class', isSortable: true },
@@ -2,6 +2,8 @@ import React, { useState } from 'react';
 import { PlusCircle } from 'lucide-react';
 import SortableTable from '../../../components/ui/SortableTable';
 import Modal from '../../../components/ui/Modal';
+import { enrichIssuances } from '../../../services/apiService';
+import useListPages from '../useListPages';
 // Placeholder for IssuanceForm
 const IssuanceForm = ({ onSubmit, onCancel }) => (
     <form onSubmit={(e) => { e.preventDefault(); onSubmit({ shares: 1000, pricePerShare: 1.5, issueDate: '2025-08-27' }); }}>
@@ -14,8 +16,15 @@ const IssuanceForm = ({ onSubmit, onCancel }) => (
     </form>
 );
 
-const IssuancesPage = ({ companyData, createIssuance, deleteIssuance }) => {
+const IssuancesPage = ({ companyData, selectedCompany, createIssuance, deleteIssuance }) => {
     const [showCreateIssuance, setShowCreateIssuance] = useState(false);
+    // Loaded a page at a time, newest first; names come from the company's bundle
+    const issuances = useListPages(
+        selectedCompany ? 'share-issuances' : null,
+        { company_id: selectedCompany?.id, order: '-issue_date' },
+        companyData
+    );
+    const issuanceRows = enrichIssuances(issuances.rows, companyData.shareholders, companyData.shareClasses);
 
     const issuanceColumns = [
         { key: 'issue_date', header: 'Date', isSortable: true },
@@ -42,11 +51,22 @@ const IssuancesPage = ({ companyData, createIssuance, deleteIssuance }) => {
             <div className="bg-white p-6 rounded-lg shadow">
                 <h3 className="text-xl font-bold mb-4">Issuance History</h3>
                 <SortableTable
-                    data={companyData.shareIssuances}
+                    data={issuanceRows}
                     columns={issuanceColumns}
                     entityType="issuance"
                     onRowDelete={deleteIssuance}
                 />
+                {issuances.hasMore && (
+                    <div className="flex justify-center mt-4">
+                        <button
+                            onClick={issuances.loadMore}
+                            disabled={issuances.loading}
+                            className="px-4 py-2 text-sm font-medium text-gray-700 bg-gray-100 rounded-md hover:bg-gray-200"
+                        >
+                            {issuances.loading ? 'Loading...' : `Load more (${issuances.rows.length}${issuances.total !== null ? ` of ${issuances.total}` : ''})`}
+                        </button>
+                    </div>
+                )}
             </div>
 
             {showCreateIssuance && (
@@ -1,15 +1,16 @@
 import React from 'react';
 import { Download } from 'lucide-react';
 
-const ReportsPage = () => {
-    // Placeholder functions for report generation.
-    // In a real implementation, these would trigger API calls or client-side generation.
+const ReportsPage = ({ selectedCompany }) => {
+    // Reports are streamed by the API, so let the browser download them directly.
     const handleDownloadPdf = () => {
-        alert('PDF download functionality will be implemented here.');
+        if (!selectedCompany) return;
+        window.location.href = `/api/companies/${selectedCompany.id}/report.pdf`;
     };
 
     const handleDownloadCsv = () => {
-        alert('CSV download functionality will be implemented here.');
+        if (!selectedCompany) return;
+        window.location.href = `/api/companies/${selectedCompany.id}/export/shareholders.csv`;
     };
 
     return (
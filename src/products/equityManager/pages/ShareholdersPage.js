@@ -4,11 +4,18 @@ import SortableTable from '../../../components/ui/SortableTable';
 import Modal from '../../../components/ui/Modal';
 import ShareholderForm from '../forms/ShareholderForm';
 import * as ApiService from '../../../services/apiService';
+import useListPages from '../useListPages';
 
 const ShareholdersPage = ({ companyData, selectedCompany, onDataRefresh }) => {
     const [showCreateModal, setShowCreateModal] = useState(false);
     const [showEditModal, setShowEditModal] = useState(false);
     const [editingShareholder, setEditingShareholder] = useState(null);
+    // Loaded a page at a time; companyData changes after every write, which reloads the list
+    const shareholders = useListPages(
+        selectedCompany ? 'shareholders' : null,
+        { company_id: selectedCompany?.id, order: 'name' },
+        companyData
+    );
 
     const shareholderColumns = [
         { key: 'name', header: 'Name', isSortable: true },
@@ -38,7 +45,7 @@ const ShareholdersPage = ({ companyData, selectedCompany, onDataRefresh }) => {
     };
 
     const handleEditClick = (shareholderId) => {
-        const shareholderToEdit = companyData.shareholders.find(s => s.id === shareholderId);
+        const shareholderToEdit = shareholders.rows.find(s => s.id === shareholderId);
         setEditingShareholder(shareholderToEdit);
         setShowEditModal(true);
     };
@@ -69,12 +76,23 @@ const ShareholdersPage = ({ companyData, selectedCompany, onDataRefresh }) => {
 
             <div className="bg-white p-6 rounded-lg shadow">
                 <SortableTable
-                    data={companyData.shareholders}
+                    data={shareholders.rows}
                     columns={shareholderColumns}
                     entityType="shareholder"
                     onRowEdit={handleEditClick}
                     onRowDelete={handleDeleteClick}
                 />
+                {shareholders.hasMore && (
+                    <div className="flex justify-center mt-4">
+                        <button
+                            onClick={shareholders.loadMore}
+                            disabled={shareholders.loading}
+                            className="px-4 py-2 text-sm font-medium text-gray-700 bg-gray-100 rounded-md hover:bg-gray-200"
+                        >
+                            {shareholders.loading ? 'Loading...' : `Load more (${shareholders.rows.length}${shareholders.total !== null ? ` of ${shareholders.total}` : ''})`}
+                        </button>
+                    </div>
+                )}
             </div>
 
             {showCreateModal && (
@@ -0,0 +1,59 @@
+import { useCallback, useEffect, useState } from 'react';
+import * as ApiService from '../../services/apiService';
+
+const PAGE_SIZE = 50;
+
+/**
+ * Loads a paginated API list a page at a time, for tables that load lazily.
+ * Starts again from the first page when the path, params or reloadKey change.
+ * @param {string|null} path - The endpoint under /api; nothing is loaded while it is null.
+ * @param {object} params - Filters and list parameters for every page.
+ * @param {*} reloadKey - Any value that changes when the list should be reloaded.
+ * @returns {{rows: Array, total: number|null, hasMore: boolean, loading: boolean, loadMore: Function}}
+ */
+const useListPages = (path, params, reloadKey) => {
+    const [rows, setRows] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [total, setTotal] = useState(null);
+    const [loading, setLoading] = useState(false);
+    const query = JSON.stringify(params);
+
+    useEffect(() => {
+        if (!path) {
+            setRows([]);
+            setNextCursor(null);
+            setTotal(null);
+            return undefined;
+        }
+        let cancelled = false;
+        setLoading(true);
+        ApiService.fetchListPage(path, { ...JSON.parse(query), limit: PAGE_SIZE })
+            .then(page => {
+                if (cancelled) return;
+                setRows(page.rows);
+                setNextCursor(page.nextCursor);
+                setTotal(page.total);
+            })
+            .catch(error => console.error(`Failed to load ${path}:`, error))
+            .finally(() => {
+                if (!cancelled) setLoading(false);
+            });
+        return () => { cancelled = true; };
+    }, [path, query, reloadKey]);
+
+    const loadMore = useCallback(() => {
+        if (!path || !nextCursor || loading) return;
+        setLoading(true);
+        ApiService.fetchListPage(path, { ...JSON.parse(query), limit: PAGE_SIZE, cursor: nextCursor })
+            .then(page => {
+                setRows(current => [...current, ...page.rows]);
+                setNextCursor(page.nextCursor);
+            })
+            .catch(error => console.error(`Failed to load more ${path}:`, error))
+            .finally(() => setLoading(false));
+    }, [path, query, nextCursor, loading]);
+
+    return { rows, total, hasMore: Boolean(nextCursor), loading, loadMore };
+};
+
+export default useListPages;
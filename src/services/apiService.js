@@ -59,38 +59,47 @@ export const fetchCompanies = async (userId) => {
 };
 
 /**
- * Fetches all data related to a specific company.
+ * Adds shareholder and share class names and the total value to issuances, for display.
+ * @param {Array} issuances - Share issuance rows.
+ * @param {Array} shareholders - The company's shareholders.
+ * @param {Array} shareClasses - The company's share classes.
+ * @returns {Array} The issuances with shareholder_name, share_class_name and total_value.
+ */
+export const enrichIssuances = (issuances, shareholders, shareClasses) => {
+    const shareholdersById = new Map(shareholders.map(s => [s.id, s]));
+    const shareClassesById = new Map(shareClasses.map(sc => [sc.id, sc]));
+    return issuances.map(issuance => ({
+        ...issuance,
+        shareholder_name: shareholdersById.get(issuance.shareholder_id)?.name || 'Unknown',
+        share_class_name: shareClassesById.get(issuance.share_class_id)?.name || 'Unknown',
+        total_value: issuance.shares * issuance.price_per_share,
+    }));
+};
+
+/**
+ * Fetches all data related to a specific company in one request.
+ * The bundle carries an ETag, so an unchanged company is revalidated by the browser cache (304) instead of re-sent.
  * @param {string} companyId - The ID of the company.
- * @returns {Promise<object>} An object containing shareholders, share classes, and issuances.
+ * @returns {Promise<object>} An object containing shareholders, share classes, issuances, and the cap-table summary.
  */
 export const fetchCompanyRelatedData = async (companyId) => {
-    const [shareholdersRes, shareClassesRes, shareIssuancesRes] = await Promise.all([
-        supabaseClient.from('shareholders').select('*').eq('company_id', companyId),
-        supabaseClient.from('share_classes').select('*').eq('company_id', companyId),
-        supabaseClient.from('share_issuances').select('*').eq('company_id', companyId)
-    ]);
+    const { data: { session } } = await supabaseClient.auth.getSession();
+    const response = await fetch(`/api/companies/${companyId}/bundle`, {
+        headers: session ? { Authorization: `Bearer ${session.access_token}` } : {},
+    });
 
-    if (shareholdersRes.error || shareClassesRes.error || shareIssuancesRes.error) {
-        console.error('Error fetching company data:', shareholdersRes.error || shareClassesRes.error || shareIssuancesRes.error);
+    if (!response.ok) {
+        const error = await response.json().catch(() => ({}));
+        console.error('Error fetching company data:', error);
         throw new Error('Failed to fetch company data.');
     }
-
-    // Enrich issuances with names for easier display
-    const enrichedIssuances = shareIssuancesRes.data.map(issuance => {
-        const shareholder = shareholdersRes.data.find(s => s.id === issuance.shareholder_id);
-        const shareClass = shareClassesRes.data.find(sc => sc.id === issuance.share_class_id);
-        return {
-          ...issuance,
-          shareholder_name: shareholder?.name || 'Unknown',
-          share_class_name: shareClass?.name || 'Unknown',
-          total_value: issuance.shares * issuance.price_per_share,
-        };
-      });
+    const bundle = await response.json();
 
     return {
-        shareholders: shareholdersRes.data,
-        shareClasses: shareClassesRes.data,
-        shareIssuances: enrichedIssuances,
+        shareholders: bundle.shareholders,
+        shareClasses: bundle.share_classes,
+        shareIssuances: enrichIssuances(bundle.issuances, bundle.shareholders, bundle.share_classes),
+        summary: bundle.summary,
     };
 };
 
@@ -233,6 +242,31 @@ export const deleteIssuance = async (issuanceId) => {
     if (error) throw error;
 };
 
+/**
+ * Fetches one page from a paginated API list endpoint, for tables that load lazily.
+ * @param {string} path - The endpoint under /api (e.g. 'shareholders', 'share-issuances').
+ * @param {object} params - Filters and list parameters (company_id, limit, cursor, fields, order, issue_date_from, ...).
+ * @returns {Promise<{rows: Array, nextCursor: string|null, total: number|null}>} The page, the cursor of the next one, and the total on the first page.
+ */
+export const fetchListPage = async (path, params = {}) => {
+    const { data: { session } } = await supabaseClient.auth.getSession();
+    const response = await fetch(`/api/${path}?${new URLSearchParams(params)}`, {
+        headers: session ? { Authorization: `Bearer ${session.access_token}` } : {},
+    });
+
+    if (!response.ok) {
+        const error = await response.json().catch(() => ({}));
+        console.error(`Error fetching ${path}:`, error);
+        throw new Error(error.error || `Failed to fetch ${path}.`);
+    }
+    const total = response.headers.get('X-Total-Count');
+    return {
+        rows: await response.json(),
+        nextCursor: response.headers.get('X-Next-Cursor'),
+        total: total === null ? null : Number(total),
+    };
+};
+
 // Add this function for Capital Raising Notes product module
 
 /**
@@ -0,0 +1,75 @@
+-- Cascading deletes for the admin API (api/repository.py).
+--
+-- Each function runs in the transaction of its RPC call, so a company or
+-- shareholder is removed together with everything that references it, or
+-- not at all. Both take arrays so many rows can be deleted in one round trip,
+-- and return the deleted row counts with the affected company IDs, which the
+-- API uses to invalidate its caches.
+
+create or replace function public.delete_companies(company_ids uuid[])
+returns jsonb
+language plpgsql
+security invoker
+as $$
+declare
+    deleted_issuances integer;
+    deleted_shareholders integer;
+    deleted_share_classes integer;
+    deleted_company_ids uuid[];
+begin
+    delete from public.share_issuances where company_id = any(company_ids);
+    get diagnostics deleted_issuances = row_count;
+
+    delete from public.shareholders where company_id = any(company_ids);
+    get diagnostics deleted_shareholders = row_count;
+
+    delete from public.share_classes where company_id = any(company_ids);
+    get diagnostics deleted_share_classes = row_count;
+
+    with deleted as (
+        delete from public.companies where id = any(company_ids) returning id
+    )
+    select coalesce(array_agg(id), '{}') into deleted_company_ids from deleted;
+
+    return jsonb_build_object(
+        'companies', coalesce(array_length(deleted_company_ids, 1), 0),
+        'share_issuances', deleted_issuances,
+        'shareholders', deleted_shareholders,
+        'share_classes', deleted_share_classes,
+        'company_ids', to_jsonb(deleted_company_ids)
+    );
+end;
+$$;
+
+create or replace function public.delete_shareholders(shareholder_ids uuid[])
+returns jsonb
+language plpgsql
+security invoker
+as $$
+declare
+    deleted_issuances integer;
+    deleted_shareholders integer;
+    issuance_company_ids uuid[];
+    shareholder_company_ids uuid[];
+begin
+    with deleted as (
+        delete from public.share_issuances where shareholder_id = any(shareholder_ids) returning company_id
+    )
+    select count(*), coalesce(array_agg(distinct company_id), '{}') into deleted_issuances, issuance_company_ids from deleted;
+
+    with deleted as (
+        delete from public.shareholders where id = any(shareholder_ids) returning company_id
+    )
+    select count(*), coalesce(array_agg(distinct company_id), '{}') into deleted_shareholders, shareholder_company_ids from deleted;
+
+    return jsonb_build_object(
+        'shareholders', deleted_shareholders,
+        'share_issuances', deleted_issuances,
+        'company_ids', (
+            select coalesce(jsonb_agg(distinct company_id), '[]'::jsonb)
+            from unnest(issuance_company_ids || shareholder_company_ids) as company_id
+            where company_id is not null
+        )
+    );
+end;
+$$;
@@ -0,0 +1,7 @@
+-- Explicit dilution flag for share classes (api/cap_table.py).
+--
+-- true: the class (options, warrants, SAFEs) counts on a fully diluted basis
+-- only; false: it counts as outstanding whatever its name. Classes left null
+-- fall back to matching their name, which DILUTIVE_NAME_MATCH=false disables.
+
+alter table public.share_classes add column if not exists is_dilutive boolean;
@@ -0,0 +1,8 @@
+-- Per-shareholder issuance reads (api/notifications.py).
+--
+-- Notification batches read the issuances of the shareholders they email,
+-- in date order, paged by (issue_date, id). This index serves that read from
+-- the shareholders' own rows instead of the company's whole issuance list.
+
+create index if not exists share_issuances_shareholder_issue_date_idx
+    on public.share_issuances (shareholder_id, issue_date, id);
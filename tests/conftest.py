@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+
+# The API modules import each other as top-level modules, as on Vercel
+sys.path.insert(0, API_DIR)
+
+os.environ.setdefault('DATA_BACKEND', 'memory')
+
+
+@pytest.fixture
+def client():
+    from index import app
+    return app.test_client()
+
+
+@pytest.fixture
+def company_id(client):
+    """A fresh company seeded by ``POST /api/test-data``."""
+    response = client.post('/api/test-data')
+    assert response.status_code == 201
+    return response.get_json()['company_id']
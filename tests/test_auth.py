@@ -0,0 +1,60 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+
+from auth import AuthError, TokenVerifier
+from cache import LRUCache
+
+SECRET = 'test-secret'
+
+
+def _segment(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+def make_token(sub='user-1', secret=SECRET, expires_in=3600):
+    signing_input = f"{_segment({'alg': 'HS256', 'typ': 'JWT'})}.{_segment({'sub': sub, 'aud': 'authenticated', 'exp': time.time() + expires_in})}"
+    signature = hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f'{signing_input}.{base64.urlsafe_b64encode(signature).decode().rstrip("=")}'
+
+
+def test_revoked_token_is_refused():
+    verifier = TokenVerifier(jwt_secret=SECRET)
+    token = make_token()
+    assert verifier.verify(token).user.id == 'user-1'
+
+    verifier.revoke(token)
+
+    with pytest.raises(AuthError):
+        verifier.verify(token)
+
+
+def test_only_valid_tokens_can_be_revoked():
+    verifier = TokenVerifier(jwt_secret=SECRET)
+
+    with pytest.raises(AuthError):
+        verifier.revoke(make_token(secret='forged'))
+    with pytest.raises(AuthError):
+        verifier.revoke('not-a-token')
+
+    assert len(verifier.revoked) == 0
+
+
+def test_revoked_tokens_are_bounded():
+    verifier = TokenVerifier(jwt_secret=SECRET)
+    verifier.revoked = LRUCache(maxsize=2)
+
+    for user in range(5):
+        verifier.revoke(make_token(sub=f'user-{user}'))
+
+    assert len(verifier.revoked) == 2
+
+
+def test_logout_without_a_token_in_the_header(client):
+    response = client.post('/api/auth/logout', headers={'Authorization': 'Bearer'})
+
+    assert response.status_code == 401
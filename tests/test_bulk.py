@@ -0,0 +1,83 @@
+import pytest
+
+from bulk import RowError, insert_in_chunks, issuance_row, shareholder_row, summarize, validate_rows
+from repository import MemoryRepository, QueryResult
+
+
+class RejectingRepository(MemoryRepository):
+    """Rejects any write containing a row named ``bad``."""
+
+    def insert(self, table, rows):
+        if any(row['name'] == 'bad' for row in (rows if isinstance(rows, list) else [rows])):
+            raise ValueError('rejected')
+        return super().insert(table, rows)
+
+
+class TruncatingRepository(MemoryRepository):
+    """Writes every row but, like a capped response, returns only the first."""
+
+    def insert(self, table, rows):
+        return QueryResult(super().insert(table, rows).data[:1])
+
+
+def shareholders(*names):
+    return [{'company_id': 'co', 'name': name, 'email': f'{name}@example.com'} for name in names]
+
+
+def test_a_rejected_chunk_only_fails_its_bad_rows():
+    rows = shareholders('a', 'bad', 'c', 'd') + [{'company_id': 'co', 'name': 'no email'}]
+    valid, results = validate_rows(rows, shareholder_row)
+
+    summary = summarize(insert_in_chunks(RejectingRepository(), 'shareholders', valid, results, chunk_size=2))
+
+    assert (summary['created'], summary['failed'], summary['invalid']) == (3, 1, 1)
+    assert [result['status'] for result in summary['results']] == ['created', 'failed', 'created', 'created', 'invalid']
+    assert all(result['id'] for result in summary['results'] if result['status'] == 'created')
+
+
+def test_unmatched_returned_rows_are_created_without_ids():
+    valid, results = validate_rows(shareholders('a', 'b', 'c'), shareholder_row)
+
+    summary = summarize(insert_in_chunks(TruncatingRepository(), 'shareholders', valid, results))
+
+    assert summary['created'] == 3
+    assert [result['id'] for result in summary['results']] == [None, None, None]
+
+
+def test_summarize_reports_missing_results_as_failed():
+    summary = summarize([{'index': 0, 'status': 'created', 'id': 'x'}, None])
+
+    assert (summary['created'], summary['failed']) == (1, 1)
+    assert summary['results'][1]['status'] == 'failed'
+
+
+def issuance(**overrides):
+    return {'company_id': 'co', 'shares': 100, 'price_per_share': 1.5, 'issue_date': '2024-03-01', **overrides}
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), 'inf', '-Infinity'])
+def test_non_finite_numbers_are_rejected(value):
+    with pytest.raises(RowError):
+        issuance_row(issuance(shares=value))
+    with pytest.raises(RowError):
+        issuance_row(issuance(price_per_share=value))
+
+
+def test_issue_dates_are_stored_normalized():
+    assert issuance_row(issuance(issue_date='2024-03-01T12:30:00Z'))['issue_date'] == '2024-03-01'
+
+
+def test_single_row_creates_keep_their_leniency():
+    assert issuance_row(issuance(shares=-25), strict=False)['shares'] == -25
+    assert shareholder_row({'company_id': 'co', 'name': 'a', 'email': 'pending'}, strict=False)['email'] == 'pending'
+    with pytest.raises(RowError):
+        issuance_row(issuance(shares=-25))
+    with pytest.raises(RowError):
+        issuance_row(issuance(shares=float('nan')), strict=False)
+
+
+def test_share_adjustments_can_be_created_one_at_a_time(client, company_id):
+    response = client.post('/api/share-issuances', json=issuance(company_id=company_id, shares=-10))
+
+    assert response.status_code == 201
+    assert response.get_json()['shares'] == -10
@@ -0,0 +1,53 @@
+import time
+
+from cache import CompanyCache, CompanyVersions, LRUCache
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.keys() == ['a', 'c']
+    assert cache.get('b') is None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = LRUCache(ttl=60)
+    cache.set('default', 1)
+    cache.set('short', 2, ttl=5)
+
+    now[0] += 10
+    assert (cache.get('default'), cache.get('short')) == (1, None)
+    now[0] += 60
+    assert cache.get('default') is None
+    assert cache.stats()['expirations'] == 2
+
+
+def test_a_version_bump_hides_every_entry_of_that_company():
+    versions = CompanyVersions()
+    cap_tables, reports = CompanyCache(versions), CompanyCache(versions)
+    cap_tables.set(cap_tables.key('co', 'full'), 'cap table')
+    reports.set(reports.key('co'), 'report')
+    cap_tables.set(cap_tables.key('other'), 'other cap table')
+
+    assert cap_tables.invalidate('co') == 1
+
+    assert cap_tables.get(cap_tables.key('co', 'full')) is None
+    assert reports.get(reports.key('co')) is None
+    assert cap_tables.get(cap_tables.key('other')) == 'other cap table'
+
+
+def test_writes_invalidate_the_cached_cap_table(client, company_id):
+    url = f'/api/companies/{company_id}/cap-table'
+    first = client.get(url)
+    assert (first.headers['X-Cache'], client.get(url).headers['X-Cache']) == ('MISS', 'HIT')
+
+    client.post('/api/shareholders', json={'company_id': company_id, 'name': 'New', 'email': 'new@example.com'})
+
+    assert client.get(url).headers['X-Cache'] == 'MISS'
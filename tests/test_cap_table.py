@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from cap_table import CapTableBuilder, build_cap_table, is_dilutive_class
+
+SHARE_CLASSES = [
+    {'id': 'common', 'name': 'Common', 'priority': 1},
+    {'id': 'pref', 'name': 'Series A Preferred', 'priority': 2},
+    {'id': 'pool', 'name': 'Employee Options', 'priority': 0},
+]
+
+
+def make_issuances(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            'id': f'issuance-{i}',
+            'shareholder_id': rng.choice([f'holder-{h}' for h in range(20)] + [None]),
+            'share_class_id': rng.choice(['common', 'pref', 'pool', None]),
+            'shares': rng.randint(1, 10000),
+            'price_per_share': rng.choice([None, 0.01, 1.5, 2.25]),
+            'issue_date': f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+        }
+        for i in range(count)
+    ]
+
+
+def rounded(value):
+    """``value`` with floats rounded, so sums taken in a different order compare equal."""
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, dict):
+        return {key: rounded(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [rounded(item) for item in value]
+    return value
+
+
+def test_totals_match_a_naive_sum():
+    issuances = make_issuances(500)
+    cap_table = build_cap_table('co', issuances, SHARE_CLASSES)
+
+    assert cap_table['total_shares'] == sum(row['shares'] for row in issuances)
+    assert cap_table['outstanding_shares'] == sum(row['shares'] for row in issuances if row['share_class_id'] != 'pool')
+    assert cap_table['total_invested'] == pytest.approx(sum(row['shares'] * (row['price_per_share'] or 0) for row in issuances))
+
+    for shareholder_id, entry in cap_table['shareholders'].items():
+        rows = [row for row in issuances if row['shareholder_id'] == shareholder_id]
+        assert entry['total_shares'] == sum(row['shares'] for row in rows)
+        assert entry['issuances'] == rows
+    assert sum(entry['fully_diluted_percentage'] for entry in cap_table['shareholders'].values()) == pytest.approx(
+        100 * sum(row['shares'] for row in issuances if row['shareholder_id']) / cap_table['total_shares']
+    )
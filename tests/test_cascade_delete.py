@@ -0,0 +1,76 @@
+from repository import MemoryRepository, SupabaseRepository
+
+
+def two_companies():
+    return MemoryRepository({
+        'companies': [{'id': 'co'}, {'id': 'other'}],
+        'share_classes': [{'id': 'common', 'company_id': 'co'}, {'id': 'other-common', 'company_id': 'other'}],
+        'shareholders': [
+            {'id': 'ada', 'company_id': 'co'},
+            {'id': 'bob', 'company_id': 'co'},
+            {'id': 'eve', 'company_id': 'other'},
+        ],
+        'share_issuances': [
+            {'id': 'i-1', 'company_id': 'co', 'shareholder_id': 'ada'},
+            {'id': 'i-2', 'company_id': 'co', 'shareholder_id': 'bob'},
+            {'id': 'i-3', 'company_id': 'other', 'shareholder_id': 'eve'},
+        ],
+    })
+
+
+def remaining(db, table):
+    return sorted(row['id'] for row in db.select(table).data)
+
+
+def test_deleting_a_company_takes_its_rows_and_nothing_else():
+    db = two_companies()
+
+    deleted = db.delete_companies(['co', 'missing'])
+
+    assert deleted == {'companies': 1, 'share_issuances': 2, 'shareholders': 2, 'share_classes': 1, 'company_ids': ['co']}
+    assert remaining(db, 'companies') == ['other']
+    assert remaining(db, 'shareholders') == ['eve']
+    assert remaining(db, 'share_issuances') == ['i-3']
+
+
+def test_deleting_shareholders_takes_their_issuances():
+    db = two_companies()
+
+    deleted = db.delete_shareholders(['ada', 'eve'])
+
+    assert deleted == {'shareholders': 2, 'share_issuances': 2, 'company_ids': ['co', 'other']}
+    assert remaining(db, 'share_issuances') == ['i-2']
+
+
+def test_supabase_deletes_are_one_rpc_each():
+    calls = []
+
+    class Client:
+        def rpc(self, name, params):
+            calls.append((name, params))
+            return self
+
+        def execute(self):
+            return type('Response', (), {'data': {'companies': 1}})()
+
+    db = SupabaseRepository(Client())
+
+    assert db.delete_companies(('co',)) == {'companies': 1}
+    db.delete_shareholders({'ada'})
+    assert calls == [('delete_companies', {'company_ids': ['co']}), ('delete_shareholders', {'shareholder_ids': ['ada']})]
+
+
+def test_bulk_deletes_invalidate_the_cached_cap_table(client, company_id):
+    url = f'/api/companies/{company_id}/cap-table'
+    shareholder_ids = [row['id'] for row in client.get(f'/api/shareholders?company_id={company_id}').get_json()]
+    before = client.get(url).get_json()
+
+    response = client.post('/api/admin/shareholders/bulk-delete', json={'ids': shareholder_ids[:1]})
+
+    assert response.get_json()['deleted']['company_ids'] == [company_id]
+    after = client.get(url)
+    assert after.headers['X-Cache'] == 'MISS'
+    assert after.get_json()['total_shares'] < before['total_shares']
+
+    assert client.post('/api/admin/companies/bulk-delete', json={'ids': [company_id]}).status_code == 200
+    assert client.get(f'/api/shareholders?company_id={company_id}').get_json() == []
@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import clients
+from conftest import API_DIR
+
+
+def test_importing_the_api_loads_no_sdk():
+    code = (
+        'import sys, index\n'
+        "print('loaded:' + ','.join(name for name in ('supabase', 'sib_api_v3_sdk', 'numpy', 'httpx') if name in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=API_DIR,
+        env={**os.environ, 'DATA_BACKEND': 'memory', 'PYTHONPATH': API_DIR},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.strip().splitlines()[-1] == 'loaded:'
+
+
+def test_clients_are_built_once_on_first_use(monkeypatch):
+    monkeypatch.setattr(clients, '_clients', {})
+    built = []
+
+    def build():
+        time.sleep(0.01)
+        built.append(object())
+        return built[-1]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(clients._memoized('service', build))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert all(result is built[0] for result in results)
+
+
+def test_unconfigured_clients_are_none(monkeypatch):
+    monkeypatch.delenv('SUPABASE_URL', raising=False)
+    monkeypatch.delenv('BREVO_API_KEY', raising=False)
+
+    assert clients.supabase_client() is None
+    assert clients.brevo_transactional_api() is None
+
+
+class StatusError(Exception):
+    def __init__(self, status):
+        super().__init__(f'HTTP {status}')
+        self.status = status
+
+
+def test_only_transient_errors_are_retried(monkeypatch):
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise StatusError(503)
+        return 'ok'
+
+    assert clients.with_retries(flaky, retries=2) == 'ok'
+
+    def rejected():
+        attempts.append(1)
+        raise StatusError(400)
+
+    attempts.clear()
+    with pytest.raises(StatusError):
+        clients.with_retries(rejected, retries=2)
+    assert len(attempts) == 1
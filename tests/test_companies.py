@@ -0,0 +1,37 @@
+import pytest
+
+import index
+from test_auth import SECRET, make_token
+
+
+@pytest.fixture
+def auth_headers(monkeypatch):
+    monkeypatch.setattr(index.token_verifier, 'jwt_secret', SECRET.encode())
+    return {'Authorization': f'Bearer {make_token(sub="owner-1")}'}
+
+
+def test_creating_a_company_requires_a_token(client):
+    assert client.post('/api/companies', json={'name': 'Acme'}).status_code == 401
+
+
+def test_created_company_belongs_to_the_caller(client, auth_headers):
+    response = client.post('/api/companies', json={'name': 'Acme', 'user_id': 'someone-else'}, headers=auth_headers)
+
+    assert response.status_code == 201
+    assert response.get_json()['user_id'] == 'owner-1'
+    listed = client.get('/api/companies', headers=auth_headers).get_json()
+    assert [company['name'] for company in listed] == ['Acme']
+
+
+def test_the_bundle_is_only_served_to_the_owner(client, auth_headers):
+    company_id = client.post('/api/companies', json={'name': 'Acme'}, headers=auth_headers).get_json()['id']
+    url = f'/api/companies/{company_id}/bundle'
+    stranger = {'Authorization': f'Bearer {make_token(sub="someone-else")}'}
+
+    first = client.get(url, headers=auth_headers)
+    assert first.status_code == 200
+    assert first.get_json()['company']['name'] == 'Acme'
+    assert client.get(url).status_code == 401
+    # A cached bundle is checked against its owner too
+    assert client.get(url, headers=stranger).status_code == 404
+    assert client.get(url, headers={**auth_headers, 'If-None-Match': first.headers['ETag']}).status_code == 304
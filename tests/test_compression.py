@@ -0,0 +1,93 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response, request
+
+from compression import compress_response, compress_stream
+
+
+def compressed(body, accept='gzip', mimetype='application/json', streamed=False, min_bytes=1024):
+    app = Flask(__name__)
+    with app.test_request_context(headers={'Accept-Encoding': accept}):
+        response = Response(iter(body) if streamed else body, mimetype=mimetype)
+        response.set_etag('abc')
+        return compress_response(request, response, min_bytes=min_bytes)
+
+
+def test_large_bodies_are_gzipped_with_a_weak_etag():
+    body = json.dumps([{'name': f'holder {i}'} for i in range(200)]).encode()
+
+    response = compressed(body)
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == body
+    assert response.get_etag() == ('abc', True)
+    assert 'Accept-Encoding' in response.vary
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'body': b'{}'},
+    {'body': b'x' * 4096, 'accept': 'identity'},
+    {'body': b'x' * 4096, 'mimetype': 'image/png'},
+])
+def test_small_unaccepted_or_binary_bodies_are_sent_as_is(kwargs):
+    response = compressed(**kwargs)
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_etag() == ('abc', False)
+
+
+def test_streamed_bodies_are_compressed_chunk_by_chunk():
+    chunks = [b'id,name\n'] + [f'{i},holder {i}\n'.encode() for i in range(1000)]
+
+    response = compressed(chunks, mimetype='text/csv', streamed=True)
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert gzip.decompress(b''.join(response.response)) == b''.join(chunks)
+
+
+def test_brotli_is_preferred_when_available():
+    brotli = pytest.importorskip('brotli')
+    body = b'{"shares": 1000}' * 200
+
+    response = compressed(body, accept='gzip, br')
+
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.get_data()) == body
+
+
+def test_closing_the_compressed_stream_closes_the_source():
+    closed = []
+
+    def source():
+        try:
+            yield b'a' * 10
+            yield b'b' * 10
+        finally:
+            closed.append(True)
+
+    stream = compress_stream(source(), 'gzip')
+    next(stream, None)
+    stream.close()
+
+    assert closed == [True]
+
+
+def test_compressed_responses_still_revalidate(client, company_id):
+    url = f'/api/companies/{company_id}/cap-table'
+    first = client.get(url, headers={'Accept-Encoding': 'gzip'})
+
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(first.data))['company_id'] == company_id
+    assert first.headers['ETag'].startswith('W/')
+    revalidated = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_streamed_reports_are_compressed(client, company_id):
+    report = client.get(f'/api/companies/{company_id}/report.pdf', headers={'Accept-Encoding': 'gzip'})
+
+    assert report.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(report.data).startswith(b'%PDF-1.4')
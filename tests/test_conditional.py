@@ -0,0 +1,42 @@
+import index
+
+
+def test_reads_carry_an_etag_and_answer_304_when_it_matches(client, company_id):
+    url = f'/api/shareholders?company_id={company_id}'
+    first = client.get(url)
+    etag = first.headers['ETag']
+
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'public, no-cache'
+    revalidated = client.get(url, headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b'' and revalidated.headers['ETag'] == etag
+
+
+def test_remembered_etags_answer_without_running_the_route(client, company_id, monkeypatch):
+    url = f'/api/companies/{company_id}/holdings'
+    etag = client.get(url).headers['ETag']
+
+    def fail(*args, **kwargs):
+        raise AssertionError('the route should not run')
+
+    monkeypatch.setattr(index.holdings_store, 'get', fail)
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_a_write_retires_the_etag(client, company_id):
+    url = f'/api/shareholders?company_id={company_id}'
+    etag = client.get(url).headers['ETag']
+
+    client.post('/api/shareholders', json={'company_id': company_id, 'name': 'New', 'email': 'new@example.com'})
+
+    changed = client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_authenticated_and_health_responses_are_not_shared(client, company_id):
+    authenticated = client.get(f'/api/shareholders?company_id={company_id}', headers={'Authorization': 'Bearer x'})
+
+    assert authenticated.headers['Cache-Control'] == 'private, no-cache'
+    assert 'Authorization' in authenticated.headers['Vary']
+    assert client.get('/api/health').headers['Cache-Control'] == 'no-store'
@@ -0,0 +1,77 @@
+import io
+
+from csv_import import CSVImporter
+from repository import MemoryRepository
+
+
+class FailingRepository(MemoryRepository):
+    """Rejects any write containing a shareholder named ``bad``."""
+
+    def insert(self, table, rows):
+        if any(row.get('name') == 'bad' for row in (rows if isinstance(rows, list) else [rows])):
+            raise ValueError('rejected')
+        return super().insert(table, rows)
+
+
+def upload(client, company_id, kind, text):
+    return client.post(
+        f'/api/companies/{company_id}/import/{kind}',
+        data={'file': (io.BytesIO(text.encode()), 'import.csv')},
+        content_type='multipart/form-data'
+    )
+
+
+def test_importing_shareholders_skips_known_and_repeated_emails(client, company_id):
+    response = upload(client, company_id, 'shareholders', (
+        'Name,Email\n'
+        'Amy Angel,amy@example.com\n'
+        'John Again,JOHN@example.com\n'
+        'Amy Twice,amy@example.com\n'
+    ))
+
+    summary = response.get_json()
+    assert response.status_code == 207
+    assert (summary['created'], summary['skipped']) == (1, 2)
+    emails = [row['email'] for row in client.get(f'/api/shareholders?company_id={company_id}').get_json()]
+    assert emails.count('amy@example.com') == 1
+
+
+def test_importing_issuances_resolves_holders_and_classes(client, company_id):
+    response = upload(client, company_id, 'share-issuances', (
+        'shareholder_email,class,shares,price,date\n'
+        'jane@example.com,Ordinary Shares,"1,000",0.5,2024-02-01\n'
+        'nobody@example.com,Ordinary Shares,10,0.5,2024-02-01\n'
+    ))
+
+    summary = response.get_json()
+    assert response.status_code == 207
+    assert (summary['created'], summary['invalid']) == (1, 1)
+    assert summary['errors'][0]['line'] == 3
+
+
+def test_a_failed_insert_does_not_mark_its_email_as_taken():
+    db = FailingRepository()
+    company = db.insert('companies', {'name': 'Co'}).data[0]
+    importer = CSVImporter(db, company['id'], 'shareholders', batch_size=1)
+
+    summary = importer.run(io.StringIO('name,email\nbad,sam@example.com\nSam,sam@example.com\n'))
+
+    assert (summary['failed'], summary['created'], summary['skipped']) == (1, 1, 0)
+
+
+def test_importing_into_an_unknown_company_is_a_404(client):
+    assert upload(client, 'missing', 'shareholders', 'name,email\nA,a@example.com\n').status_code == 404
+
+
+def test_exporting_shareholders_streams_every_row(client, company_id):
+    response = client.get(f'/api/companies/{company_id}/export/shareholders.csv')
+
+    lines = response.get_data(as_text=True).splitlines()
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert len(lines) == 4
+    assert any('jane@example.com' in line for line in lines[1:])
+
+
+def test_exporting_an_unknown_company_is_a_404(client):
+    assert client.get('/api/companies/missing/export/shareholders.csv').status_code == 404
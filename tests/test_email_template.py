@@ -0,0 +1,36 @@
+from email_template import Template, render_issuances
+
+
+def test_values_are_escaped_unless_raw():
+    template = Template('<p>{{name}}</p>{{body|raw}}<p>{{name}}</p>')
+
+    assert template.render({'name': '<b>&', 'body': '<hr>'}) == '<p>&lt;b&gt;&amp;</p><hr><p>&lt;b&gt;&amp;</p>'
+
+
+def test_numeric_slots_are_formatted():
+    template = Template('{{shares:,}} at ${{price:.2f}}')
+
+    assert template.render_args(1234567, 1.5) == '1,234,567 at $1.50'
+
+
+def test_issuance_list_renders_every_issuance():
+    html = render_issuances([
+        {'share_class_name': 'Options <ESOP>', 'shares': 1000, 'price_per_share': 2.5, 'round': 'Seed'},
+        {'shares': 10},
+    ])
+
+    assert html.count('class="issuance"') == 2
+    assert 'Options &lt;ESOP&gt;' in html
+    assert '$2,500.00' in html
+
+
+def test_escaping_keeps_equal_values_of_different_types_apart():
+    template = Template('{{value}}')
+
+    assert [template.render({'value': value}) for value in (1, True, 1.0)] == ['1', 'True', '1.0']
+
+
+def test_a_round_of_zero_is_not_shown_as_missing():
+    html = render_issuances([{'shares': 10, 'price_per_share': 1, 'round': 0, 'round_description': ''}])
+
+    assert '<strong>Round:</strong> 0 ()' in html
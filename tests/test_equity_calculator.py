@@ -0,0 +1,50 @@
+def test_posting_a_cap_table_back_into_the_calculator(client, company_id):
+    cap_table = client.get(f'/api/companies/{company_id}/cap-table').get_json()
+    holder_id = next(iter(cap_table['shareholders']))
+
+    response = client.post('/api/equity-calculator', json={
+        'cap_table': cap_table,
+        'scenarios': [{'name': 'Top-up', 'issuances': [{'shareholder_id': holder_id, 'shares': 100000}]}],
+    })
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['current']['total_shares'] == cap_table['total_shares']
+    assert result['current']['shareholders'][holder_id]['name'] == cap_table['shareholders'][holder_id]['name']
+    assert result['scenarios'][0]['total_shares'] == cap_table['total_shares'] + 100000
+
+
+def test_cap_table_with_a_list_of_shareholders(client, company_id):
+    cap_table = client.get(f'/api/companies/{company_id}/cap-table').get_json()
+    cap_table['shareholders'] = [{'id': shareholder_id, **entry} for shareholder_id, entry in cap_table['shareholders'].items()]
+
+    response = client.post('/api/equity-calculator', json={
+        'cap_table': cap_table,
+        'future_issuance': {'shareholder_name': 'New Investor', 'shares': 50000},
+    })
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['current']['total_shares'] == cap_table['total_shares']
+    assert result['scenarios'][0]['total_shares'] == cap_table['total_shares'] + 50000
+
+
+def test_include_holders_false_as_a_string(client, company_id):
+    response = client.post('/api/equity-calculator', json={
+        'company_id': company_id,
+        'include_holders': 'false',
+        'future_issuance': {'shareholder_name': 'New Investor', 'shares': 50000},
+    })
+
+    assert response.status_code == 200
+    assert 'shareholders' not in response.get_json()['scenarios'][0]
+
+
+def test_infinite_amounts_are_rejected(client, company_id):
+    response = client.post('/api/equity-calculator', json={
+        'company_id': company_id,
+        'scenarios': [{'round': {'amount': 'inf', 'pre_money_valuation': 1000000}}],
+    })
+
+    assert response.status_code == 400
+    assert 'finite' in response.get_json()['error']
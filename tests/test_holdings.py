@@ -0,0 +1,90 @@
+import random
+
+import index
+from cap_table import build_cap_table
+from holdings import CompanyHoldings
+from notifications import load_recipients
+from repository import MemoryRepository
+from test_cap_table import SHARE_CLASSES, make_issuances, rounded
+
+# What a holdings cap table shares with a full build without issuance rows
+COMPARED = ('total_shares', 'outstanding_shares', 'total_invested', 'price_per_share', 'shareholders', 'by_share_class')
+
+
+def test_deltas_match_a_fresh_aggregation():
+    rng = random.Random(3)
+    rows = {issuance['id']: issuance for issuance in make_issuances(400)}
+    holdings = CompanyHoldings('co', list(rows.values()), SHARE_CLASSES)
+    replacements = iter(make_issuances(300, seed=11))
+
+    for _ in range(300):
+        action = rng.random()
+        if action < 0.3 and rows:
+            issuance_id = rng.choice(list(rows))
+            del rows[issuance_id]
+            holdings.remove(issuance_id)
+        else:
+            # Updates re-put an existing ID; creates add a new one
+            issuance_id = rng.choice(list(rows)) if action < 0.7 else f'new-{len(rows)}-{action}'
+            rows[issuance_id] = {**next(replacements), 'id': issuance_id}
+            holdings.put(rows[issuance_id])
+
+    fresh = CompanyHoldings('co', list(rows.values()), SHARE_CLASSES)
+    assert holdings.differences(fresh) == []
+    expected = build_cap_table('co', list(rows.values()), SHARE_CLASSES, keep_issuances=False)
+    actual = holdings.cap_table()
+    assert rounded({key: actual[key] for key in COMPARED}) == rounded({key: expected[key] for key in COMPARED})
+
+
+def test_cap_table_is_kept_current_by_issuance_writes(client, company_id):
+    before = client.get(f'/api/companies/{company_id}/cap-table?issuances=false').get_json()
+    assert before['backend'] == 'holdings'
+    assert 'issuances' not in before
+    holder_id, class_id = next((h, c) for h, classes in before['positions'].items() for c in classes)
+    version = index.company_versions.get(company_id)
+
+    created = client.post('/api/share-issuances', json={
+        'company_id': company_id, 'shareholder_id': holder_id, 'share_class_id': class_id,
+        'shares': 1000, 'price_per_share': 2, 'issue_date': '2020-01-01',
+    }).get_json()
+
+    # One version bump per write
+    assert index.company_versions.get(company_id) == version + 1
+    after = client.get(f'/api/companies/{company_id}/cap-table?issuances=false').get_json()
+    assert after['total_shares'] == before['total_shares'] + 1000
+    assert after['positions'][holder_id][class_id]['total_shares'] == before['positions'][holder_id][class_id]['total_shares'] + 1000
+
+    client.delete(f"/api/share-issuances/{created['id']}")
+    full = client.get(f'/api/companies/{company_id}/cap-table').get_json()
+    assert full['total_shares'] == before['total_shares']
+    assert len(full['issuances']) == before['issuance_count']
+
+
+def test_recipients_read_only_their_own_issuances():
+    class CountingRepository(MemoryRepository):
+        def select(self, table, columns='*', filters=None, **kwargs):
+            result = super().select(table, columns, filters=filters, **kwargs)
+            if table == 'share_issuances':
+                self.issuance_rows += len(result.data)
+            return result
+
+    db = CountingRepository()
+    db.issuance_rows = 0
+    db.insert('shareholders', [{'id': f'holder-{h}', 'company_id': 'co', 'name': f'Holder {h}', 'email': f'{h}@example.com'} for h in range(20)])
+    db.insert('share_classes', [{**share_class, 'company_id': 'co'} for share_class in SHARE_CLASSES])
+    db.insert('share_issuances', [{**issuance, 'company_id': 'co'} for issuance in make_issuances(500)])
+
+    shareholders, issuances = load_recipients(db, 'co', ['holder-3', 'holder-4', 'holder-from-elsewhere'])
+
+    assert sorted(shareholders) == ['holder-3', 'holder-4']
+    own = [i for i in make_issuances(500) if i['shareholder_id'] in ('holder-3', 'holder-4')]
+    assert sum(len(rows) for rows in issuances.values()) == len(own) == db.issuance_rows
+
+
+def test_cap_table_keeps_its_issuance_rows_by_default(client, company_id):
+    full = client.get(f'/api/companies/{company_id}/cap-table').get_json()
+    compact = client.get(f'/api/companies/{company_id}/cap-table?compact=true').get_json()
+
+    assert full['issuances']
+    assert sum(len(entry['issuances']) for entry in full['shareholders'].values()) == len(full['issuances'])
+    assert sum(len(entry['issuance_ids']) for entry in compact['shareholders'].values()) == len(full['issuances'])
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from jobs import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / 'jobs.sqlite3'), max_attempts=2, lease_seconds=30)
+
+
+def test_enqueueing_with_the_same_key_returns_the_first_job(queue):
+    job, created = queue.enqueue('email', ['a', 'b', 'a'], idempotency_key='campaign-1')
+    again, created_again = queue.enqueue('email', ['c'], idempotency_key='campaign-1')
+
+    assert (created, created_again) == (True, False)
+    assert again['id'] == job['id']
+    assert queue.status(job['id'])['total'] == 2
+    assert [task['idempotency_key'] for task in queue.claim(10)] == ['campaign-1:a', 'campaign-1:b']
+
+
+def test_claimed_tasks_are_leased_until_the_lease_runs_out(queue, monkeypatch):
+    queue.enqueue('email', ['a'])
+    assert len(queue.claim(10)) == 1
+    assert queue.claim(10) == [] and not queue.has_ready()
+
+    later = time.time() + 31
+    monkeypatch.setattr(time, 'time', lambda: later)
+    reclaimed = queue.claim(10)
+    assert [task['attempts'] for task in reclaimed] == [2]
+
+
+def test_a_stale_lease_cannot_complete_a_reclaimed_task(queue, monkeypatch):
+    queue.enqueue('email', ['a'])
+    stale = queue.claim(10)[0]
+    later = time.time() + 31
+    monkeypatch.setattr(time, 'time', lambda: later)
+    current = queue.claim(10)[0]
+
+    assert queue.complete(stale, 'sent') is False
+    assert queue.complete(current, 'sent') is True
+
+
+def test_failed_tasks_back_off_and_fail_once_out_of_attempts(queue, monkeypatch):
+    job, _ = queue.enqueue('email', ['a'])
+
+    assert queue.retry(queue.claim(10)[0], 'timeout') is True
+    assert queue.claim(10) == []
+    later = time.time() + 60
+    monkeypatch.setattr(time, 'time', lambda: later)
+    assert queue.retry(queue.claim(10)[0], 'timeout again') is False
+
+    status = queue.status(job['id'], include_tasks=True)
+    assert status['status'] == 'completed'
+    assert status['tasks'][0]['status'] == 'failed' and status['tasks'][0]['error'] == 'timeout again'
+
+
+def test_claims_are_filtered_by_kind(queue):
+    queue.enqueue('email', ['a'])
+    queue.enqueue('sms', ['b'])
+
+    assert [task['item'] for task in queue.claim(10, kind='sms')] == ['b']
+    assert queue.status('missing') is None
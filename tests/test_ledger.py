@@ -0,0 +1,41 @@
+import pytest
+
+from cap_table import build_cap_table
+from ledger import CapTableLedger, parse_as_of
+from test_cap_table import SHARE_CLASSES, make_issuances, rounded
+
+# Totals a snapshot shares with a full build; issuance rows are left out of snapshots
+COMPARED = ('total_shares', 'outstanding_shares', 'total_invested', 'price_per_share', 'valuation', 'by_share_class')
+
+
+def filtered_scan(issuances, as_of):
+    return build_cap_table('co', [i for i in issuances if i['issue_date'] is None or i['issue_date'][:10] <= as_of], SHARE_CLASSES, keep_issuances=False)
+
+
+@pytest.mark.parametrize('interval', [1, 7, 256])
+@pytest.mark.parametrize('as_of', ['2023-12-31', '2024-01-01', '2024-03-15', '2024-06-30', '2024-12-28', '2025-01-01'])
+def test_snapshot_matches_a_filtered_scan(interval, as_of):
+    issuances = make_issuances(600)
+    issuances[5]['issue_date'] = None
+    issuances[6]['issue_date'] = '2024-03-15T09:30:00'
+    ledger = CapTableLedger('co', issuances, SHARE_CLASSES, interval=interval)
+
+    snapshot = ledger.snapshot(as_of)
+    expected = filtered_scan(issuances, as_of)
+
+    assert snapshot['issuance_count'] == sum(1 for i in issuances if i['issue_date'] is None or i['issue_date'][:10] <= as_of)
+    assert rounded({key: snapshot[key] for key in COMPARED}) == rounded({key: expected[key] for key in COMPARED})
+    assert rounded(snapshot['shareholders']) == rounded(expected['shareholders'])
+
+
+def test_snapshot_without_a_date_is_the_current_cap_table():
+    issuances = make_issuances(300)
+    snapshot = CapTableLedger('co', issuances, SHARE_CLASSES, interval=16).snapshot()
+
+    assert rounded(snapshot['shareholders']) == rounded(build_cap_table('co', issuances, SHARE_CLASSES, keep_issuances=False)['shareholders'])
+
+
+def test_parse_as_of():
+    assert parse_as_of('2024-02-03T10:00:00Z') == '2024-02-03'
+    with pytest.raises(ValueError):
+        parse_as_of('yesterday')
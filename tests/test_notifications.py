@@ -0,0 +1,162 @@
+import importlib.util
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import HTTPServer
+
+import pytest
+
+from conftest import API_DIR
+from jobs import JobQueue
+from notifications import NOTIFY_JOB_KIND, RateLimiter, deliver_all, load_recipients, process_batch
+from repository import MemoryRepository
+
+
+def load_notify_module():
+    # The route's file name has a hyphen, so it can't be imported by name
+    spec = importlib.util.spec_from_file_location('notify_shareholders', os.path.join(API_DIR, 'notify-shareholders.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def notify(monkeypatch, tmp_path):
+    module = load_notify_module()
+    sent = []
+
+    def send(payload, shareholder, issuances, idempotency_key):
+        sent.append(idempotency_key)
+        return {'success': True, 'message_id': f'm-{len(sent)}'}
+
+    monkeypatch.setattr(module, 'IMPORTS_AVAILABLE', True)
+    monkeypatch.setattr(module, 'queue', JobQueue(str(tmp_path / 'jobs.sqlite3')))
+    monkeypatch.setattr(module, 'send_notification', send)
+    module.sent = sent
+
+    server = HTTPServer(('127.0.0.1', 0), module.handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    module.url = f'http://127.0.0.1:{server.server_port}/api/notify-shareholders'
+    yield module
+    server.shutdown()
+    server.server_close()
+
+
+def call(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def shareholder_ids(client, company_id):
+    return [row['id'] for row in client.get(f'/api/shareholders?company_id={company_id}').get_json()]
+
+
+def test_notifying_sends_once_per_shareholder_and_reports_progress(notify, client, company_id):
+    ids = shareholder_ids(client, company_id)
+    body = {'company_id': company_id, 'shareholder_ids': ids, 'idempotency_key': 'campaign-1'}
+
+    status, job = call(notify.url, body)
+    repeat_status, repeat = call(notify.url, body)
+    poll_status, progress = call(f"{notify.url}?job_id={job['job_id']}")
+
+    assert status == 200 and job['status'] == 'completed'
+    assert repeat_status == 200 and repeat['job_id'] == job['job_id'] and not repeat['created']
+    assert len(notify.sent) == len(ids)
+    assert poll_status == 200
+    assert [task['status'] for task in progress['tasks']] == ['sent'] * len(ids)
+
+
+def test_a_failed_drain_still_answers_with_the_queued_job(notify, client, company_id, monkeypatch):
+    def broken_drain():
+        raise RuntimeError('database unavailable')
+
+    monkeypatch.setattr(notify, 'drain_for_request', broken_drain)
+    status, job = call(notify.url, {'company_id': company_id, 'shareholder_ids': shareholder_ids(client, company_id)})
+
+    assert status == 202
+    assert job['job_id'] and job['status'] == 'queued'
+    assert notify.queue.status(job['job_id'])['total'] == 3
+
+
+def test_unknown_companies_and_jobs_are_404s(notify):
+    assert call(notify.url, {'company_id': 'missing', 'shareholder_ids': ['a']})[0] == 404
+    assert call(f'{notify.url}?job_id=missing')[0] == 404
+
+
+class BrokenRepository(MemoryRepository):
+    def select(self, table, *args, **kwargs):
+        raise RuntimeError('database unavailable')
+
+
+def test_tasks_are_released_when_their_recipients_cannot_be_loaded(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'))
+    job, _ = queue.enqueue(NOTIFY_JOB_KIND, ['a', 'b'], payload={'company_id': 'co'})
+
+    assert process_batch(queue, BrokenRepository(), send=None) == 2
+
+    tasks = queue.status(job['id'], include_tasks=True)['tasks']
+    assert [task['status'] for task in tasks] == ['pending', 'pending']
+    assert all('database unavailable' in task['error'] for task in tasks)
+
+
+def test_deliveries_run_on_a_bounded_pool_and_keep_their_order():
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def send(n):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        if n == 3:
+            raise RuntimeError('bounced')
+        return {'success': True, 'n': n}
+
+    outcomes = deliver_all([(n,) for n in range(10)], send, max_workers=4, rate=0)
+
+    assert [outcome.get('n') for outcome in outcomes] == [0, 1, 2, None, 4, 5, 6, 7, 8, 9]
+    assert outcomes[3] == {'success': False, 'error': 'bounced'}
+    assert 1 < peak[0] <= 4
+
+
+def test_the_rate_limiter_spaces_calls_across_threads():
+    limiter = RateLimiter(100)
+    started = time.monotonic()
+    threads = [threading.Thread(target=limiter.wait) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.monotonic() - started >= 0.045
+
+
+def test_recipients_are_restricted_to_the_company():
+    db = MemoryRepository({
+        'share_classes': [{'id': 'common', 'company_id': 'co', 'name': 'Common'}],
+        'shareholders': [
+            {'id': 'ada', 'company_id': 'co', 'email': 'ada@example.com'},
+            {'id': 'eve', 'company_id': 'other', 'email': 'eve@example.com'},
+        ],
+        'share_issuances': [
+            {'id': 'i-2', 'shareholder_id': 'ada', 'share_class_id': 'common', 'issue_date': '2024-02-01'},
+            {'id': 'i-1', 'shareholder_id': 'ada', 'share_class_id': 'gone', 'issue_date': '2024-01-01'},
+            {'id': 'i-3', 'shareholder_id': 'eve', 'share_class_id': 'common', 'issue_date': '2024-01-01'},
+        ],
+    })
+
+    shareholders, issuances = load_recipients(db, 'co', ['ada', 'eve', 'ada'], page_size=1)
+
+    assert list(shareholders) == ['ada']
+    assert [(row['id'], row['share_class_name']) for row in issuances['ada']] == [('i-1', 'Unknown'), ('i-2', 'Common')]
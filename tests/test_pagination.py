@@ -0,0 +1,75 @@
+import json
+import uuid
+
+import pytest
+
+from json_provider import dumps_bytes
+from pagination import SHAREHOLDERS, ListQueryError, decode_cursor, encode_cursor, fetch_page, parse_list_args
+from repository import MemoryRepository
+
+
+def test_uuid_ids_are_serialized_as_strings():
+    db = MemoryRepository()
+    holder_id, company_id = uuid.uuid4(), uuid.uuid4()
+    db.insert('shareholders', {'id': holder_id, 'company_id': company_id, 'name': 'Ada', 'email': 'ada@example.com'})
+
+    page = fetch_page(db, SHAREHOLDERS, parse_list_args({}, SHAREHOLDERS))
+
+    row = json.loads(dumps_bytes(page.rows))[0]
+    assert (row['id'], row['company_id']) == (str(holder_id), str(company_id))
+
+
+def test_only_column_parameters_are_filters():
+    query = parse_list_args({'_': '1718000000', 'name': 'Ada', 'created_at__gte': '2024-01-01'}, SHAREHOLDERS)
+
+    assert query.filters == [('name', 'eq', 'Ada'), ('created_at', 'gte', '2024-01-01')]
+    with pytest.raises(ListQueryError):
+        parse_list_args({'name__like': 'A%'}, SHAREHOLDERS)
+
+
+def test_list_routes_ignore_cache_busting_parameters(client, company_id):
+    response = client.get(f'/api/shareholders?company_id={company_id}&_=1718000000')
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == 3
+
+
+@pytest.mark.parametrize('values', [
+    ['2024-01-01T00:00:00', 'a1b2'],
+    [None, 'id-1'],
+    [1.5, 'id-2'],
+    ['ünïcode / + =', 'id-3'],
+])
+def test_cursor_round_trips(values):
+    order = [('created_at', True), ('id', False)]
+
+    assert decode_cursor(encode_cursor(order, values), order) == tuple(values)
+
+
+def test_cursor_is_tied_to_its_order():
+    cursor = encode_cursor([('created_at', True), ('id', False)], ['2024-01-01', 'a'])
+
+    with pytest.raises(ListQueryError):
+        decode_cursor(cursor, [('created_at', False), ('id', False)])
+    with pytest.raises(ListQueryError):
+        decode_cursor('not a cursor', [('id', False)])
+
+
+def test_pages_follow_the_cursor_to_the_end():
+    db = MemoryRepository()
+    db.insert('shareholders', [
+        {'id': f'holder-{i:02d}', 'company_id': 'co', 'name': f'Holder {i}', 'email': f'{i}@example.com', 'created_at': f'2024-01-{i % 5 + 1:02d}'}
+        for i in range(23)
+    ])
+
+    seen = []
+    args = {'limit': '5'}
+    while True:
+        page = fetch_page(db, SHAREHOLDERS, parse_list_args(args, SHAREHOLDERS))
+        seen += [row['id'] for row in page.rows]
+        if not page.next_cursor:
+            break
+        args = {'limit': '5', 'cursor': page.next_cursor}
+
+    assert sorted(seen) == sorted(f'holder-{i:02d}' for i in range(23))
+    assert len(seen) == len(set(seen))
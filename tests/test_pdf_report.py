@@ -0,0 +1,66 @@
+import re
+
+from pdf_report import iter_company_report
+from repository import MemoryRepository
+
+
+def company_with_issuances(count):
+    db = MemoryRepository({
+        'companies': [{'id': 'co', 'name': 'Acme (Holdings)'}],
+        'share_classes': [{'id': 'common', 'company_id': 'co', 'name': 'Common', 'priority': 1}],
+        'shareholders': [{'id': 'ada', 'company_id': 'co', 'name': 'Ada', 'email': 'ada@example.com'}],
+        'share_issuances': [
+            {'id': f'i-{i:05d}', 'company_id': 'co', 'shareholder_id': 'ada', 'share_class_id': 'common',
+             'shares': 100, 'price_per_share': 1.5, 'issue_date': f'2024-01-{i % 28 + 1:02d}'}
+            for i in range(count)
+        ],
+    })
+    return db, db.get('companies', 'co')
+
+
+def check_structure(pdf):
+    """Every cross-reference entry points at its object; returns the page count."""
+    assert pdf.startswith(b'%PDF-1.4') and pdf.endswith(b'%%EOF\n')
+    xref_offset = int(re.search(rb'startxref\n(\d+)', pdf).group(1))
+    assert pdf[xref_offset:].startswith(b'xref\n')
+    entries = re.findall(rb'(\d{10}) 00000 n ', pdf[xref_offset:])
+    for obj_id, offset in enumerate(entries, start=1):
+        assert pdf[int(offset):].startswith(b'%d 0 obj' % obj_id)
+    return int(re.search(rb'/Type /Pages /Kids \[[^\]]*\] /Count (\d+)', pdf).group(1))
+
+
+def test_report_is_a_well_formed_pdf():
+    db, company = company_with_issuances(3)
+
+    pdf = b''.join(iter_company_report(db, company))
+
+    assert check_structure(pdf) == 1
+    assert b'Acme \\(Holdings\\)' in pdf
+
+
+def test_long_issuance_histories_are_paged_across_pages():
+    db, company = company_with_issuances(500)
+
+    chunks = list(iter_company_report(db, company, page_size=50))
+
+    pages = check_structure(b''.join(chunks))
+    assert pages > 5
+    # The header, one chunk per page and the trailer
+    assert len(chunks) == pages + 2
+
+
+def test_reports_are_cached_until_the_company_changes(client, company_id):
+    url = f'/api/companies/{company_id}/report.pdf'
+    first = client.get(url)
+
+    assert first.status_code == 200 and first.mimetype == 'application/pdf'
+    check_structure(first.data)
+    second = client.get(url)
+    assert second.headers['X-Cache'] == 'HIT' and second.data == first.data
+
+    client.post('/api/shareholders', json={'company_id': company_id, 'name': 'New', 'email': 'new@example.com'})
+    assert client.get(url).headers['X-Cache'] == 'MISS'
+
+
+def test_unknown_companies_are_404s(client):
+    assert client.get('/api/companies/missing/report.pdf').status_code == 404
@@ -0,0 +1,64 @@
+import pytest
+
+from repository import MemoryRepository, create_repository, iter_keyset, normalize_filters
+
+
+@pytest.fixture
+def db():
+    return MemoryRepository({
+        'companies': [{'id': 'co', 'name': 'Acme'}],
+        'shareholders': [{'id': 'ada', 'company_id': 'co', 'name': 'Ada'}],
+        'share_issuances': [
+            {'id': f'i-{i:02d}', 'company_id': 'co', 'shareholder_id': 'ada' if i % 2 else None,
+             'shares': i * 100, 'issue_date': None if i == 7 else f'2024-01-{i % 10 + 1:02d}'}
+            for i in range(25)
+        ],
+    })
+
+
+def test_filters_order_and_count(db):
+    result = db.select(
+        'share_issuances',
+        'id, shares',
+        filters=[('shares', 'gte', '1000'), ('shareholder_id', 'eq', 'ada')],
+        order=[('shares', True)],
+        limit=3,
+        count='exact',
+    )
+
+    assert result.data == [{'id': 'i-23', 'shares': 2300}, {'id': 'i-21', 'shares': 2100}, {'id': 'i-19', 'shares': 1900}]
+    assert result.count == 7
+
+
+def test_embedded_rows_follow_their_foreign_key(db):
+    row = db.select('share_issuances', '*, shareholders(name)', filters={'id': 'i-01'}).data[0]
+
+    assert row['shareholders'] == {'name': 'Ada'}
+    assert db.select('share_issuances', '*, shareholders(name)', filters={'id': 'i-02'}).data[0]['shareholders'] is None
+
+
+def test_reads_are_copies(db):
+    db.get('companies', 'co')['name'] = 'Changed'
+
+    assert db.get('companies', 'co')['name'] == 'Acme'
+
+
+@pytest.mark.parametrize('order', [None, [('issue_date', False), ('id', False)], [('issue_date', True), ('id', True)]])
+def test_keyset_iteration_sees_every_row_once(db, order):
+    rows = list(iter_keyset(db, 'share_issuances', filters={'company_id': 'co'}, page_size=4, order=order))
+
+    assert sorted(row['id'] for row in rows) == [f'i-{i:02d}' for i in range(25)]
+    if order:
+        expected = db.select('share_issuances', order=order).data
+        assert [row['id'] for row in rows] == [row['id'] for row in expected]
+
+
+def test_unknown_operators_are_rejected():
+    with pytest.raises(ValueError):
+        normalize_filters([('shares', 'like', '1%')])
+
+
+def test_the_memory_backend_is_shared(monkeypatch):
+    monkeypatch.setenv('DATA_BACKEND', 'memory')
+
+    assert create_repository() is create_repository()
@@ -0,0 +1,101 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+from waterfall import WaterfallEngine, WaterfallError, parse_exit_values
+
+SHARE_CLASSES = [
+    {'id': 'common', 'name': 'Common', 'priority': 1},
+    {'id': 'seed', 'name': 'Seed Preferred', 'priority': 2},
+    {'id': 'series-a', 'name': 'Series A Preferred', 'priority': 3},
+    {'id': 'series-b', 'name': 'Series B Preferred', 'priority': 3},
+]
+
+POSITIONS = {
+    ('founder', 'common'): (6_000_000, 600),
+    ('employee', 'common'): (1_000_000, 100),
+    ('angel', 'seed'): (1_000_000, 500_000),
+    ('fund-a', 'series-a'): (2_000_000, 4_000_000),
+    ('fund-b', 'series-b'): (1_000_000, 3_000_000),
+    ('angel', 'series-a'): (250_000, 500_000),
+}
+
+TERMS = {
+    'seed': {'participating': True},
+    'series-a': {'liquidation_preference': 1.5},
+    'series-b': {'liquidation_preference': 1},
+}
+
+EXIT_VALUES = [0, 1, 250_000, 3_000_000, 8_000_000, 9_000_600, 25_000_000, 60_000_000, 1e9]
+
+
+def run(terms=TERMS, **kwargs):
+    return WaterfallEngine(SHARE_CLASSES, POSITIONS, terms=terms, **kwargs).run(EXIT_VALUES)
+
+
+@pytest.mark.parametrize('terms', [TERMS, None, {'common': {'liquidation_preference': 0}, 'series-b': {'participating': True, 'seniority': 9}}])
+def test_payouts_sum_to_the_exit_value(terms):
+    result = run(terms)
+
+    for i, exit_value in enumerate(EXIT_VALUES):
+        by_class = sum(share_class['payouts'][i] for share_class in result['share_classes'])
+        by_holder = sum(holder['payouts'][i] for holder in result['shareholders'].values())
+        assert by_class == pytest.approx(exit_value, rel=1e-9, abs=1e-6)
+        assert by_holder == pytest.approx(exit_value, rel=1e-9, abs=1e-6)
+        assert result['unallocated'][i] == pytest.approx(0, abs=1e-6)
+
+
+def test_preferences_are_paid_by_seniority():
+    result = run()
+    payouts = {share_class['id']: share_class['payouts'] for share_class in result['share_classes']}
+
+    # 3M doesn't cover the senior preferences (1.5 x 4.5M and 1 x 3M), so they split it pro rata
+    i = EXIT_VALUES.index(3_000_000)
+    assert payouts['seed'][i] == payouts['common'][i] == 0
+    assert payouts['series-a'][i] == pytest.approx(3_000_000 * 6.75 / 9.75)
+    assert payouts['series-b'][i] == pytest.approx(3_000_000 * 3 / 9.75)
+
+
+def test_non_participating_classes_convert_when_common_is_worth_more():
+    result = run()
+    series_b = next(share_class for share_class in result['share_classes'] if share_class['id'] == 'series-b')
+
+    assert series_b['converted'][EXIT_VALUES.index(3_000_000)] is False
+    assert series_b['converted'][EXIT_VALUES.index(1e9)] is True
+
+
+def test_exit_range():
+    assert parse_exit_values({'exit_range': {'min': 0, 'max': 100, 'steps': 5}}) == [0, 25, 50, 75, 100]
+    with pytest.raises(WaterfallError):
+        parse_exit_values({'exit_values': []})
+
+
+def test_participating_strings_are_parsed_as_flags():
+    engine = WaterfallEngine(SHARE_CLASSES, POSITIONS, terms={'seed': {'participating': 'false'}, 'series-a': {'participating': 'true'}})
+    participating = {class_id: term['participating'] for class_id, term in zip(engine.class_ids, engine.terms)}
+
+    assert participating['seed'] is False
+    assert participating['series-a'] is True
+
+
+def test_shares_without_a_shareholder_are_paid_out(client, company_id):
+    client.post('/api/share-issuances', json={
+        'company_id': company_id, 'shares': 500_000, 'price_per_share': 1, 'issue_date': '2024-01-01',
+    })
+
+    response = client.post(f'/api/companies/{company_id}/waterfall', json={
+        'exit_values': [1_000_000, 50_000_000], 'include_holders': 'true', 'fully_diluted': 'false',
+    })
+
+    result = response.get_json()
+    assert response.status_code == 200
+    assert result['shareholders']['unassigned']['name'] == 'Unassigned'
+    assert result['shareholders']['unassigned']['payouts'][1] > 0
+    for i, exit_value in enumerate(result['exit_values']):
+        assert sum(holder['payouts'][i] for holder in result['shareholders'].values()) == pytest.approx(exit_value)
+
+
+def test_include_holders_false_as_a_string(client, company_id):
+    response = client.post(f'/api/companies/{company_id}/waterfall', json={'exit_values': [1_000_000], 'include_holders': 'false'})
+
+    assert 'shareholders' not in response.get_json()